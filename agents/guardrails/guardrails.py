@@ -3,8 +3,8 @@ Guardrails Module
 Input and output validation for safe and relevant medical responses
 """
 import logging
+import threading
 from typing import Dict, Any, List
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from config import settings
 
@@ -19,12 +19,16 @@ class Guardrails:
     def __init__(self):
         """Initialize guardrails with LLM"""
         try:
+            from langchain_openai import AzureChatOpenAI
+            from core.health import get_llm_call_tracker
+            
             self.llm = AzureChatOpenAI(
                 azure_endpoint=settings.azure_endpoint,
                 openai_api_key=settings.openai_api_key,
                 openai_api_version=settings.openai_api_version,
                 deployment_name=settings.deployment_name or settings.model_name,
                 temperature=0.0,  # Deterministic for safety checks
+                callbacks=[get_llm_call_tracker()],
                 # max_tokens=500
             )
             
@@ -235,11 +239,14 @@ class Guardrails:
 
 # Global instance
 _guardrails = None
+_guardrails_lock = threading.Lock()
 
 
 def get_guardrails() -> Guardrails:
-    """Get or create global guardrails instance"""
+    """Get or create global guardrails instance (safe to call from worker threads)"""
     global _guardrails
     if _guardrails is None:
-        _guardrails = Guardrails()
+        with _guardrails_lock:
+            if _guardrails is None:
+                _guardrails = Guardrails()
     return _guardrails
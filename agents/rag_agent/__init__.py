@@ -3,6 +3,7 @@ from agents.rag_agent.rag_agent import RAGAgent, get_rag_agent
 from agents.rag_agent.vector_store import ChromaVectorStore, get_vector_store, get_document_processor
 from agents.rag_agent.query_expander import QueryExpander, get_query_expander
 from agents.rag_agent.reranker import DocumentReranker, get_reranker
+from agents.rag_agent.metadata_index import MetadataIndex, build_metadata_filter
 
 __all__ = [
     'RAGAgent',
@@ -13,5 +14,7 @@ __all__ = [
     'QueryExpander',
     'get_query_expander',
     'DocumentReranker',
-    'get_reranker'
+    'get_reranker',
+    'MetadataIndex',
+    'build_metadata_filter'
 ]
@@ -0,0 +1,622 @@
+"""
+ANN Snapshot Module
+Exports the collection to a memory-mapped IVF snapshot and searches it with NumPy
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+from langchain_core.documents import Document
+from config import settings
+from agents.rag_agent.metadata_index import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+FULL_VECTORS_FILE = "full_vectors.npy"
+QUANT_SCALE_FILE = "quant_scale.npy"
+QUANT_OFFSET_FILE = "quant_offset.npy"
+CENTROIDS_FILE = "centroids.npy"
+LIST_OFFSETS_FILE = "list_offsets.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+DOC_OFFSETS_FILE = "doc_offsets.npy"
+METADATA_INDEX_FILE = "metadata_index.pkl"
+# Append-only list of chunk IDs deleted since the export, shared by every process
+TOMBSTONES_FILE = "deleted_ids.txt"
+# Append-only list of chunk IDs written since the export (new or re-written chunks)
+ADDED_FILE = "added_ids.txt"
+# Export scratch files (collection order), removed before the snapshot is swapped in
+RAW_VECTORS_FILE = "raw_vectors.npy"
+RAW_RECORDS_FILE = "raw_records.jsonl"
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 8192) -> np.ndarray:
+    """Assign each vector to its nearest centroid (squared L2)"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        distances = centroid_norms[None, :] - 2.0 * block @ centroids.T
+        assignments[start:start + block_size] = distances.argmin(axis=1)
+    return assignments
+
+
+def quantize_int8(
+    vectors: np.ndarray,
+    low: Optional[np.ndarray] = None,
+    high: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-dimension scalar quantization to 8-bit codes
+    
+    Each dimension's [min, max] range is mapped onto 0..255, so a vector is
+    reconstructed as codes * scale + offset.
+    
+    Args:
+        vectors: Float32 matrix (N x D)
+        low: Per-dimension minimum (default: computed from vectors)
+        high: Per-dimension maximum (default: computed from vectors); pass
+            both to quantize a block with the range of the whole matrix
+            
+    Returns:
+        Tuple of (uint8 codes, float32 scale, float32 offset)
+    """
+    low = vectors.min(axis=0) if low is None else low
+    high = vectors.max(axis=0) if high is None else high
+    offset = low.astype(np.float32)
+    scale = ((high - offset) / 255.0).astype(np.float32)
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint((vectors - offset) / scale), 0, 255).astype(np.uint8)
+    return codes, scale, offset
+
+
+def train_ivf_centroids(
+    vectors: np.ndarray,
+    n_lists: int,
+    iterations: int = 10,
+    sample_size: int = 100000,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Train IVF coarse centroids with mini Lloyd's k-means on a sample
+    
+    Args:
+        vectors: Float32 matrix (N x D)
+        n_lists: Number of inverted lists
+        iterations: k-means iterations
+        sample_size: Maximum number of vectors used for training
+        seed: Random seed
+        
+    Returns:
+        Centroid matrix (n_lists x D)
+    """
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        sample = vectors
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].astype(np.float32)
+    
+    for _ in range(iterations):
+        assignments = _nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+    
+    return centroids
+
+
+def _append_ids(directory: str, file_name: str, ids: List[str]):
+    """
+    Append chunk IDs to one of a snapshot's change files
+    
+    The IDs are written with a single append, so concurrent writers from
+    several processes do not interleave lines.
+    
+    Args:
+        directory: Snapshot directory (nothing is written if it does not exist)
+        file_name: Change file name
+        ids: Chunk IDs
+    """
+    path = Path(directory)
+    if not ids or not (path / MANIFEST_FILE).exists():
+        return
+    data = "".join(f"{chunk_id}\n" for chunk_id in ids).encode("utf-8")
+    fd = os.open(path / file_name, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def record_deleted(directory: str, ids: List[str]):
+    """
+    Append deleted chunk IDs to a snapshot's tombstone file
+    
+    Every process serving the snapshot filters these IDs out of its results
+    once it re-reads the file.
+    
+    Args:
+        directory: Snapshot directory (nothing is written if it does not exist)
+        ids: Deleted chunk IDs
+    """
+    _append_ids(directory, TOMBSTONES_FILE, ids)
+
+
+def record_added(directory: str, ids: List[str]):
+    """
+    Append chunk IDs written after the export to a snapshot's additions file
+    
+    The snapshot does not contain these chunks (or holds an older version),
+    so serving processes search them in the live store alongside it.
+    
+    Args:
+        directory: Snapshot directory (nothing is written if it does not exist)
+        ids: Added or re-written chunk IDs
+    """
+    _append_ids(directory, ADDED_FILE, ids)
+
+
+def export_snapshot(
+    collections: List[Any],
+    output_dir: str,
+    dtype: str = None,
+    n_lists: int = None,
+    page_size: int = 5000,
+    block_size: int = 8192
+) -> Dict[str, Any]:
+    """
+    Write Chroma collections to a single memory-mappable IVF snapshot
+    
+    Pages are streamed from Chroma into a scratch memory map and a scratch
+    JSONL file, then copied in IVF list order block by block, so memory use
+    stays bounded by the page and block sizes rather than the collection.
+    
+    The snapshot is written to a temporary directory and swapped in with a
+    rename, so serving processes holding the previous files keep a valid
+    mapping until they reload.
+    
+    With a compact dtype (float16 or int8) the full-precision vectors are
+    also written, memory-mapped but only touched to rescore a shortlist.
+    
+    Args:
+        collections: Raw chromadb collections (e.g. all shards)
+        output_dir: Snapshot directory
+        dtype: Vector storage dtype ("float32", "float16" or "int8")
+        n_lists: Number of IVF lists (default: sqrt(N))
+        page_size: Documents fetched per page from Chroma
+        block_size: Rows reordered and encoded per block
+        
+    Returns:
+        Snapshot manifest
+    """
+    dtype = dtype or settings.ann_snapshot_dtype
+    if dtype not in ("float32", "float16", "int8"):
+        raise ValueError(f"Unsupported ANN snapshot dtype: {dtype}")
+    output_path = Path(output_dir)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+    
+    # Deletions recorded against the current snapshot while this export runs are carried over
+    # Changes recorded while the export runs may be missing from it, so they are carried over
+    change_starts = {
+        file_name: (output_path / file_name).stat().st_size if (output_path / file_name).exists() else 0
+        for file_name in (TOMBSTONES_FILE, ADDED_FILE)
+    }
+    
+    # Pass 1: stream pages into the scratch files (rows beyond the initial count are left for the next export)
+    total = sum(collection.count() for collection in collections)
+    raw = None
+    record_offsets = np.zeros(total + 1, dtype=np.int64)
+    low = high = None
+    row = 0
+    with open(tmp_path / RAW_RECORDS_FILE, "wb") as f:
+        for collection in collections:
+            offset = 0
+            while row < total:
+                page = collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=page_size,
+                    offset=offset
+                )
+                if not page["ids"]:
+                    break
+                offset += len(page["ids"])
+                
+                count = min(len(page["ids"]), total - row)
+                vectors = np.asarray(page["embeddings"][:count], dtype=np.float32)
+                if raw is None:
+                    raw = np.lib.format.open_memmap(
+                        tmp_path / RAW_VECTORS_FILE,
+                        mode="w+",
+                        dtype=np.float32,
+                        shape=(total, vectors.shape[1])
+                    )
+                raw[row:row + count] = vectors
+                block_low, block_high = vectors.min(axis=0), vectors.max(axis=0)
+                low = block_low if low is None else np.minimum(low, block_low)
+                high = block_high if high is None else np.maximum(high, block_high)
+                
+                for i in range(count):
+                    line = json.dumps({
+                        "id": page["ids"][i],
+                        "document": page["documents"][i],
+                        "metadata": page["metadatas"][i] or {}
+                    }).encode("utf-8") + b"\n"
+                    f.write(line)
+                    record_offsets[row + i + 1] = record_offsets[row + i] + len(line)
+                row += count
+    
+    if raw is None or row == 0:
+        shutil.rmtree(tmp_path)
+        raise ValueError("Cannot export an empty collection")
+    
+    matrix = raw[:row]
+    dimension = int(matrix.shape[1])
+    n_lists = n_lists or settings.ann_snapshot_n_lists or max(1, int(np.sqrt(row)))
+    n_lists = min(n_lists, row)
+    
+    centroids = train_ivf_centroids(matrix, n_lists)
+    assignments = _nearest_centroids(matrix, centroids)
+    
+    # Store rows grouped by list so every probe reads one contiguous slice
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=n_lists))
+    del assignments
+    
+    # Pass 2: copy rows in list order, block by block
+    stored_vectors = np.lib.format.open_memmap(
+        tmp_path / VECTORS_FILE,
+        mode="w+",
+        dtype=np.uint8 if dtype == "int8" else dtype,
+        shape=(row, dimension)
+    )
+    norms = np.lib.format.open_memmap(tmp_path / NORMS_FILE, mode="w+", dtype=np.float32, shape=(row,))
+    full_vectors = None
+    if dtype != "float32":
+        full_vectors = np.lib.format.open_memmap(
+            tmp_path / FULL_VECTORS_FILE, mode="w+", dtype=np.float32, shape=(row, dimension)
+        )
+    scale = quant_offset = None
+    for start in range(0, row, block_size):
+        ordered = np.asarray(matrix[order[start:start + block_size]], dtype=np.float32)
+        end = start + len(ordered)
+        if dtype == "int8":
+            codes, scale, quant_offset = quantize_int8(ordered, low, high)
+            stored_vectors[start:end] = codes
+            stored = codes.astype(np.float32) * scale + quant_offset
+        else:
+            stored_vectors[start:end] = ordered.astype(dtype)
+            stored = stored_vectors[start:end].astype(np.float32)
+        # Norms of the stored (reconstructed) vectors keep approximate distances consistent
+        norms[start:end] = (stored ** 2).sum(axis=1)
+        if full_vectors is not None:
+            full_vectors[start:end] = ordered
+    for array in (stored_vectors, norms, full_vectors):
+        if array is not None:
+            array.flush()
+    del stored_vectors, norms, full_vectors, matrix, raw
+    if dtype == "int8":
+        np.save(tmp_path / QUANT_SCALE_FILE, scale)
+        np.save(tmp_path / QUANT_OFFSET_FILE, quant_offset)
+    np.save(tmp_path / CENTROIDS_FILE, centroids)
+    np.save(tmp_path / LIST_OFFSETS_FILE, list_offsets)
+    
+    # Documents in list order, with a bitmap metadata index over snapshot rows for pre-filtered search
+    doc_offsets = np.zeros(row + 1, dtype=np.int64)
+    metadata_index = MetadataIndex()
+    with open(tmp_path / RAW_RECORDS_FILE, "rb") as raw_file, open(tmp_path / DOCUMENTS_FILE, "wb") as f:
+        records = mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for start in range(0, row, block_size):
+                block_ids, block_metadatas = [], []
+                for position, index in enumerate(order[start:start + block_size], start):
+                    line = records[record_offsets[index]:record_offsets[index + 1]]
+                    f.write(line)
+                    doc_offsets[position + 1] = doc_offsets[position] + len(line)
+                    record = json.loads(line)
+                    block_ids.append(record["id"])
+                    block_metadatas.append(record["metadata"])
+                metadata_index.add(block_ids, block_metadatas)
+        finally:
+            records.close()
+    np.save(tmp_path / DOC_OFFSETS_FILE, doc_offsets)
+    metadata_index.save(tmp_path / METADATA_INDEX_FILE)
+    (tmp_path / RAW_VECTORS_FILE).unlink()
+    (tmp_path / RAW_RECORDS_FILE).unlink()
+    
+    manifest = {
+        "collections": [collection.name for collection in collections],
+        "count": row,
+        "dimension": dimension,
+        "dtype": dtype,
+        "full_precision": dtype != "float32",
+        "n_lists": int(n_lists),
+        "created_at": time.time()
+    }
+    with open(tmp_path / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+    
+    for file_name, start in change_starts.items():
+        if not (output_path / file_name).exists():
+            continue
+        with open(output_path / file_name, "rb") as f:
+            f.seek(start)
+            carried = f.read()
+        if carried:
+            with open(tmp_path / file_name, "wb") as f:
+                f.write(carried)
+    
+    old_path = output_path.with_name(output_path.name + ".old")
+    if old_path.exists():
+        shutil.rmtree(old_path)
+    if output_path.exists():
+        output_path.rename(old_path)
+    tmp_path.rename(output_path)
+    if old_path.exists():
+        shutil.rmtree(old_path, ignore_errors=True)
+    
+    logger.info(
+        f"Exported ANN snapshot to {output_path}: {manifest['count']} vectors, "
+        f"{manifest['n_lists']} lists, {dtype}"
+    )
+    return manifest
+
+
+class AnnSnapshot:
+    """
+    Read-only IVF index over memory-mapped snapshot files
+    
+    Vectors, norms and documents are opened with mmap, so every worker on
+    a host shares the same physical pages through the OS page cache.
+    Compact (float16/int8) vectors are scanned, and a shortlist of
+    ANN_SNAPSHOT_RESCORE_FACTOR * k rows is rescored against the
+    full-precision copy.
+    
+    Chunks deleted after the export are listed in the snapshot's tombstone
+    file and chunks written after it in its additions file; refresh_deleted()
+    picks up new entries of both, so every process can filter deleted rows
+    out of its results and search the added chunks in the live store.
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Open a snapshot directory
+        
+        Args:
+            directory: Directory written by export_snapshot
+        """
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST_FILE) as f:
+            self.manifest = json.load(f)
+        self.manifest_mtime = os.stat(self.directory / MANIFEST_FILE).st_mtime
+        
+        self.vectors = np.load(self.directory / VECTORS_FILE, mmap_mode="r")
+        self.norms = np.load(self.directory / NORMS_FILE, mmap_mode="r")
+        
+        # int8 codes decode as codes * scale + offset; distances are computed
+        # against the shifted query so blocks are never fully decoded
+        self.scale: Optional[np.ndarray] = None
+        self.offset: Optional[np.ndarray] = None
+        if self.manifest["dtype"] == "int8":
+            self.scale = np.load(self.directory / QUANT_SCALE_FILE)
+            self.offset = np.load(self.directory / QUANT_OFFSET_FILE)
+        
+        self.full_vectors: Optional[np.ndarray] = None
+        if self.manifest.get("full_precision") and (self.directory / FULL_VECTORS_FILE).exists():
+            self.full_vectors = np.load(self.directory / FULL_VECTORS_FILE, mmap_mode="r")
+        self.doc_offsets = np.load(self.directory / DOC_OFFSETS_FILE, mmap_mode="r")
+        self.centroids = np.load(self.directory / CENTROIDS_FILE)
+        self.centroid_norms = (self.centroids ** 2).sum(axis=1)
+        self.list_offsets = np.load(self.directory / LIST_OFFSETS_FILE)
+        
+        self.metadata_index: Optional[MetadataIndex] = None
+        if (self.directory / METADATA_INDEX_FILE).exists():
+            self.metadata_index = MetadataIndex(self.directory / METADATA_INDEX_FILE)
+        
+        self._documents_file = open(self.directory / DOCUMENTS_FILE, "rb")
+        self._documents = mmap.mmap(self._documents_file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        self.deleted: set = set()
+        self.added: set = set()
+        self._read_offsets = {TOMBSTONES_FILE: 0, ADDED_FILE: 0}
+        self.refresh_deleted()
+        
+        logger.info(
+            f"Opened ANN snapshot {self.directory} ({self.manifest['count']} vectors, "
+            f"{self.manifest['dtype']})"
+        )
+    
+    def __len__(self) -> int:
+        return int(self.manifest["count"])
+    
+    def is_stale(self) -> bool:
+        """Check whether a newer snapshot has been exported to the same directory, or it was removed"""
+        try:
+            return os.stat(self.directory / MANIFEST_FILE).st_mtime != self.manifest_mtime
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+    
+    def refresh_deleted(self) -> int:
+        """
+        Read tombstones and additions appended since the last call
+        
+        Returns:
+            Number of newly deleted chunk IDs
+        """
+        self.added.update(self._read_appended(ADDED_FILE))
+        before = len(self.deleted)
+        self.deleted.update(self._read_appended(TOMBSTONES_FILE))
+        return len(self.deleted) - before
+    
+    def _read_appended(self, file_name: str) -> List[str]:
+        """Chunk IDs appended to a change file since it was last read"""
+        try:
+            with open(self.directory / file_name, "rb") as f:
+                f.seek(self._read_offsets[file_name])
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # Only consume complete lines; a concurrent append is picked up next time
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        self._read_offsets[file_name] += end
+        return [line for line in data[:end].decode("utf-8").split("\n") if line]
+    
+    def stale_fraction(self) -> float:
+        """Share of the snapshot made out of date by deletions and later writes"""
+        return (len(self.deleted) + len(self.added)) / max(1, len(self))
+    
+    def memory_bytes(self) -> Dict[str, int]:
+        """
+        Size of the scanned index structures and of the rescoring copy
+        
+        Returns:
+            Dictionary with index_bytes (vectors, norms, centroids) and full_precision_bytes
+        """
+        return {
+            "index_bytes": int(self.vectors.nbytes + self.norms.nbytes + self.centroids.nbytes),
+            "full_precision_bytes": int(self.full_vectors.nbytes) if self.full_vectors is not None else 0
+        }
+    
+    def _block_distances(self, rows, query: np.ndarray, query_norm: float) -> np.ndarray:
+        """Approximate squared L2 distances from the query to stored rows"""
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scale is not None:
+            # q.x = c.(s*q) + o.q for x = c*s + o
+            return self.norms[rows] + query_norm - 2.0 * (block @ (self.scale * query) + float(self.offset @ query))
+        return self.norms[rows] + query_norm - 2.0 * (block @ query)
+    
+    def _rescore(self, hits: List[Tuple[int, float]], query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Re-rank a shortlist with exact full-precision distances"""
+        if self.full_vectors is None or not hits:
+            return hits[:k]
+        rows = np.sort(np.fromiter((row for row, _ in hits), dtype=np.int64, count=len(hits)))
+        block = np.asarray(self.full_vectors[rows], dtype=np.float32)
+        distances = ((block - query) ** 2).sum(axis=1)
+        return self._top_k(rows, distances, k)
+    
+    def can_filter(self, filter: Optional[Dict[str, Any]]) -> bool:
+        """
+        Check whether a metadata filter can be applied inside the snapshot
+        
+        Args:
+            filter: ChromaDB-style metadata filter
+            
+        Returns:
+            True if search() can pre-filter with it
+        """
+        return self.metadata_index is not None and self.metadata_index.can_resolve(filter)
+    
+    def search(
+        self,
+        embedding: List[float],
+        k: int,
+        nprobe: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Approximate nearest neighbour search
+        
+        With a filter, small candidate sets are scanned exactly; larger ones
+        are searched through IVF with a row mask and proportionally more probes.
+        Compact snapshots are rescored at full precision before the top k is cut.
+        
+        Args:
+            embedding: Query embedding
+            k: Number of results
+            nprobe: Number of inverted lists scanned
+            filter: Optional metadata filter (must satisfy can_filter)
+            
+        Returns:
+            List of (row, squared_l2_distance) sorted by distance
+        """
+        nprobe = nprobe or settings.ann_snapshot_nprobe
+        query = np.asarray(embedding, dtype=np.float32)
+        query_norm = float(query @ query)
+        shortlist = k * settings.ann_snapshot_rescore_factor if self.full_vectors is not None else k
+        shortlist = max(k, shortlist)
+        
+        allowed = None
+        if filter:
+            candidate_rows = self.metadata_index.rows(self.metadata_index.resolve(filter))
+            if len(candidate_rows) == 0:
+                return []
+            if len(candidate_rows) <= max(k, settings.metadata_filter_exact_max):
+                distances = self._block_distances(candidate_rows, query, query_norm)
+                return self._rescore(self._top_k(candidate_rows, distances, shortlist), query, k)
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[candidate_rows] = True
+            nprobe = int(np.ceil(nprobe * len(self) / len(candidate_rows)))
+        
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_distances = self.centroid_norms - 2.0 * self.centroids @ query
+        if nprobe < len(self.centroids):
+            probes = np.argpartition(centroid_distances, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(len(self.centroids))
+        
+        rows, distances = [], []
+        for probe in probes:
+            start, end = int(self.list_offsets[probe]), int(self.list_offsets[probe + 1])
+            if start == end:
+                continue
+            block_rows = np.arange(start, end)
+            block_distances = self._block_distances(slice(start, end), query, query_norm)
+            if allowed is not None:
+                keep = allowed[start:end]
+                block_rows, block_distances = block_rows[keep], block_distances[keep]
+            rows.append(block_rows)
+            distances.append(block_distances)
+        
+        if not rows:
+            return []
+        hits = self._top_k(np.concatenate(rows), np.concatenate(distances), shortlist)
+        return self._rescore(hits, query, k)
+    
+    @staticmethod
+    def _top_k(rows: np.ndarray, distances: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Select the k closest rows, sorted by distance"""
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[top], distances[top]
+        order = np.argsort(distances)
+        return [(int(rows[i]), float(max(distances[i], 0.0))) for i in order]
+    
+    def get_document(self, row: int) -> Document:
+        """
+        Load the stored chunk for a snapshot row
+        
+        Args:
+            row: Snapshot row
+            
+        Returns:
+            Document with metadata["chunk_id"] set
+        """
+        record = json.loads(self._documents[int(self.doc_offsets[row]):int(self.doc_offsets[row + 1])])
+        metadata = dict(record["metadata"])
+        metadata["chunk_id"] = record["id"]
+        return Document(page_content=record["document"], metadata=metadata)
+    
+    def close(self):
+        """Release the document mapping"""
+        try:
+            self._documents.close()
+            self._documents_file.close()
+        except Exception:
+            pass
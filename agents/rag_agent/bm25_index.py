@@ -0,0 +1,247 @@
+"""
+BM25 Index Module
+Sparse lexical index kept alongside the ChromaDB collection
+"""
+import logging
+import math
+import pickle
+import re
+from array import array
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "to", "was", "were",
+    "what", "when", "which", "who", "will", "with"
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase and split text into alphanumeric terms
+    
+    Drug names, dosages and abbreviations (e.g. "hba1c", "ace", "500mg")
+    are kept intact as single terms.
+    
+    Args:
+        text: Raw text
+        
+    Returns:
+        List of terms
+    """
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index with array-backed postings
+    
+    Each term maps to two parallel typed arrays (row numbers and term
+    frequencies), so postings stay compact and can be scored with NumPy
+    without materializing Python objects per posting.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, k1: float = None, b: float = None):
+        """
+        Initialize BM25 index, loading it from disk when present
+        
+        Args:
+            path: Optional file the index is persisted to
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.path = Path(path) if path else None
+        self.k1 = k1 if k1 is not None else settings.bm25_k1
+        self.b = b if b is not None else settings.bm25_b
+        self._reset()
+        
+        if self.path and self.path.exists():
+            self.load()
+    
+    def _reset(self):
+        """Clear all index state"""
+        self.doc_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.doc_lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_length = 0
+        self.deleted = 0
+    
+    def __len__(self) -> int:
+        return len(self.row_of)
+    
+    def add(self, ids: List[str], texts: List[str]):
+        """
+        Index documents
+        
+        Args:
+            ids: Chunk IDs (same IDs as in the vector store)
+            texts: Chunk texts
+        """
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self.row_of:
+                continue
+            
+            row = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.row_of[doc_id] = row
+            
+            terms = tokenize(text)
+            self.doc_lengths.append(len(terms))
+            self.total_length += len(terms)
+            
+            frequencies: Dict[str, int] = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            
+            for term, tf in frequencies.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = (array("I"), array("H"))
+                    self.postings[term] = posting
+                posting[0].append(row)
+                posting[1].append(min(tf, 65535))
+    
+    def remove(self, ids: List[str]):
+        """
+        Remove documents from the index
+        
+        Rows are tombstoned (zero length, excluded from scoring) and the
+        postings are compacted once tombstones make up a quarter of the rows.
+        
+        Args:
+            ids: Chunk IDs to remove
+        """
+        for doc_id in ids:
+            row = self.row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            self.total_length -= self.doc_lengths[row]
+            self.doc_lengths[row] = 0
+            self.doc_ids[row] = None
+            self.deleted += 1
+        
+        if self.deleted and self.deleted * 4 >= len(self.doc_ids):
+            self._compact()
+    
+    def _compact(self):
+        """Drop tombstoned rows and renumber the postings"""
+        live = np.array([doc_id is not None for doc_id in self.doc_ids], dtype=bool)
+        new_row = np.cumsum(live, dtype=np.int64) - 1
+        
+        postings = {}
+        for term, (rows, tfs) in self.postings.items():
+            rows_np = np.frombuffer(rows, dtype=np.uint32)
+            keep = live[rows_np]
+            if not keep.any():
+                continue
+            postings[term] = (
+                array("I", new_row[rows_np[keep]].astype(np.uint32).tobytes()),
+                array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes())
+            )
+        
+        self.doc_lengths = array("I", np.frombuffer(self.doc_lengths, dtype=np.uint32)[live].tobytes())
+        self.doc_ids = [doc_id for doc_id in self.doc_ids if doc_id is not None]
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self.postings = postings
+        self.deleted = 0
+    
+    def search(
+        self,
+        query: str,
+        k: int = None,
+        allowed_ids: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Score documents against a query
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            allowed_ids: Optional chunk IDs to restrict results to
+            
+        Returns:
+            List of (chunk_id, bm25_score) sorted by score
+        """
+        k = k or settings.top_k_retrieval
+        n_docs = len(self.doc_ids)
+        if len(self.row_of) == 0:
+            return []
+        
+        avg_length = self.total_length / len(self.row_of) if self.total_length else 1.0
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float32)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows = np.frombuffer(posting[0], dtype=np.uint32)
+            tfs = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float32)
+            
+            df = len(rows)
+            idf = math.log(1.0 + (n_docs - self.deleted - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[rows] / avg_length)
+            scores[rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+        
+        if allowed_ids is not None:
+            mask = np.zeros(n_docs, dtype=bool)
+            allowed_rows = [self.row_of[i] for i in allowed_ids if i in self.row_of]
+            mask[allowed_rows] = True
+            scores[~mask] = 0.0
+        elif self.deleted:
+            # Tombstoned rows have zero length (as do empty texts, which never score)
+            scores[doc_lengths == 0] = 0.0
+        
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) == 0:
+            return []
+        if len(candidates) > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates])]
+        
+        return [(self.doc_ids[row], float(scores[row])) for row in order]
+    
+    def clear(self):
+        """Remove all documents and delete the persisted file"""
+        self._reset()
+        if self.path and self.path.exists():
+            self.path.unlink()
+    
+    def save(self):
+        """Persist index to disk"""
+        if not self.path:
+            return
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "doc_ids": self.doc_ids,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+                "total_length": self.total_length
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(self.path)
+    
+    def load(self):
+        """Load index from disk"""
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            self.doc_ids = state["doc_ids"]
+            self.row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids) if doc_id is not None}
+            self.deleted = len(self.doc_ids) - len(self.row_of)
+            self.doc_lengths = state["doc_lengths"]
+            self.postings = state["postings"]
+            self.total_length = state["total_length"]
+            logger.info(f"Loaded BM25 index with {len(self.doc_ids)} documents from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading BM25 index, starting empty: {e}")
+            self._reset()
@@ -0,0 +1,201 @@
+"""
+Collection Dump Module
+Bulk export/import of a collection (IDs, texts, metadata, embeddings) for new replicas
+"""
+import hashlib
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Iterator
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.jsonl"
+
+
+def file_checksum(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_dump(
+    collections: List[Any],
+    output_dir: str,
+    page_size: int = 5000
+) -> Dict[str, Any]:
+    """
+    Write Chroma collections to a portable dump
+    
+    Embeddings go to a float32 .npy matrix (streamed page by page through a
+    memory map), texts and metadata to JSONL with one line per row, and a
+    manifest records counts, the embedding model and file checksums.
+    
+    The matrix is sized from the record count taken before paging; rows
+    added by a concurrent ingest are left for the next export, and if
+    rows were deleted meanwhile the matrix is shrunk to the rows written.
+    
+    Args:
+        collections: Raw chromadb collections (e.g. all shards)
+        output_dir: Dump directory
+        page_size: Number of records fetched from Chroma per page
+        
+    Returns:
+        Dump manifest
+    """
+    output_path = Path(output_dir)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+    
+    total = sum(collection.count() for collection in collections)
+    embeddings = None
+    row = 0
+    
+    with open(tmp_path / RECORDS_FILE, "w", encoding="utf-8") as f:
+        for collection in collections:
+            offset = 0
+            while row < total:
+                page = collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=page_size,
+                    offset=offset
+                )
+                if not page["ids"]:
+                    break
+                offset += len(page["ids"])
+                
+                count = min(len(page["ids"]), total - row)
+                vectors = np.asarray(page["embeddings"][:count], dtype=np.float32)
+                if embeddings is None:
+                    embeddings = np.lib.format.open_memmap(
+                        tmp_path / EMBEDDINGS_FILE,
+                        mode="w+",
+                        dtype=np.float32,
+                        shape=(total, vectors.shape[1])
+                    )
+                embeddings[row:row + len(vectors)] = vectors
+                
+                for chunk_id, text, metadata in zip(
+                    page["ids"][:count], page["documents"][:count], page["metadatas"][:count]
+                ):
+                    f.write(json.dumps({"id": chunk_id, "document": text, "metadata": metadata or {}}) + "\n")
+                
+                row += count
+    
+    if embeddings is None or row == 0:
+        shutil.rmtree(tmp_path)
+        raise ValueError("Cannot export an empty collection")
+    dimension = int(embeddings.shape[1])
+    if row < total:
+        # Chunks were deleted while paging: copy the written rows into a matrix of the real size
+        trimmed = np.lib.format.open_memmap(
+            tmp_path / (EMBEDDINGS_FILE + ".trim"), mode="w+", dtype=np.float32, shape=(row, dimension)
+        )
+        for start in range(0, row, page_size):
+            trimmed[start:start + page_size] = embeddings[start:min(start + page_size, row)]
+        trimmed.flush()
+        del trimmed, embeddings
+        (tmp_path / (EMBEDDINGS_FILE + ".trim")).replace(tmp_path / EMBEDDINGS_FILE)
+    else:
+        embeddings.flush()
+        del embeddings
+    
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "collections": [collection.name for collection in collections],
+        "count": row,
+        "dimension": dimension,
+        "embedding_model": settings.embedding_model_name,
+        "created_at": time.time(),
+        "checksums": {
+            name: file_checksum(tmp_path / name)
+            for name in (EMBEDDINGS_FILE, RECORDS_FILE)
+        }
+    }
+    with open(tmp_path / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+    
+    if output_path.exists():
+        shutil.rmtree(output_path)
+    tmp_path.rename(output_path)
+    
+    logger.info(f"Exported {row} records ({dimension}-d) to {output_path}")
+    return manifest
+
+
+def read_manifest(input_dir: str, verify: bool = True) -> Dict[str, Any]:
+    """
+    Load and validate a dump manifest
+    
+    Args:
+        input_dir: Dump directory
+        verify: Recompute file checksums and compare with the manifest
+        
+    Returns:
+        Dump manifest
+        
+    Raises:
+        ValueError: If the dump is incompatible or corrupted
+    """
+    input_path = Path(input_dir)
+    with open(input_path / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported dump format version: {manifest.get('format_version')}")
+    if manifest.get("embedding_model") != settings.embedding_model_name:
+        raise ValueError(
+            f"Dump was embedded with {manifest.get('embedding_model')}, "
+            f"but this node uses {settings.embedding_model_name}"
+        )
+    
+    if verify:
+        for name, expected in manifest["checksums"].items():
+            if file_checksum(input_path / name) != expected:
+                raise ValueError(f"Checksum mismatch for {name}, dump is corrupted")
+    
+    return manifest
+
+
+def iter_dump(input_dir: str, page_size: int = 5000) -> Iterator[Dict[str, list]]:
+    """
+    Stream a dump in pages
+    
+    Args:
+        input_dir: Dump directory
+        page_size: Number of records per page
+        
+    Yields:
+        Pages with keys "ids", "embeddings", "metadatas", "documents"
+    """
+    input_path = Path(input_dir)
+    embeddings = np.load(input_path / EMBEDDINGS_FILE, mmap_mode="r")
+    
+    page = {"ids": [], "metadatas": [], "documents": []}
+    start = 0
+    with open(input_path / RECORDS_FILE, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            page["ids"].append(record["id"])
+            page["metadatas"].append(record["metadata"])
+            page["documents"].append(record["document"])
+            if len(page["ids"]) >= page_size:
+                end = start + len(page["ids"])
+                yield dict(page, embeddings=embeddings[start:end].tolist())
+                start = end
+                page = {"ids": [], "metadatas": [], "documents": []}
+    
+    if page["ids"]:
+        yield dict(page, embeddings=embeddings[start:start + len(page["ids"])].tolist())
@@ -0,0 +1,237 @@
+"""
+Embedding Scheduler Module
+Batches, rate-limits and parallelizes embedding calls during ingestion
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Callable, Dict, Any, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting requests and tokens per minute
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Initialize rate limiter
+        
+        Args:
+            requests_per_minute: Maximum API requests per minute
+            tokens_per_minute: Maximum input tokens per minute
+        """
+        self.request_capacity = float(max(1, requests_per_minute))
+        self.token_capacity = float(max(1, tokens_per_minute))
+        self.request_allowance = self.request_capacity
+        self.token_allowance = self.token_capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        """Refill both buckets based on elapsed time"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.request_allowance = min(
+            self.request_capacity,
+            self.request_allowance + elapsed * self.request_capacity / 60.0
+        )
+        self.token_allowance = min(
+            self.token_capacity,
+            self.token_allowance + elapsed * self.token_capacity / 60.0
+        )
+    
+    def acquire(self, tokens: int):
+        """
+        Block until one request carrying `tokens` tokens may be sent
+        
+        Args:
+            tokens: Number of input tokens in the request
+        """
+        # A single batch larger than the whole bucket would otherwise wait forever
+        tokens = min(float(tokens), self.token_capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.request_allowance >= 1 and self.token_allowance >= tokens:
+                    self.request_allowance -= 1
+                    self.token_allowance -= tokens
+                    return
+                request_wait = (1 - self.request_allowance) * 60.0 / self.request_capacity
+                token_wait = (tokens - self.token_allowance) * 60.0 / self.token_capacity
+                sleep_for = max(request_wait, token_wait, 0.01)
+            time.sleep(sleep_for)
+
+
+class EmbeddingScheduler:
+    """
+    Embeds large text collections with token-aware batching and bounded concurrency
+    """
+    
+    def __init__(
+        self,
+        embeddings,
+        batch_size: int = None,
+        max_batch_tokens: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        """
+        Initialize embedding scheduler
+        
+        Args:
+            embeddings: LangChain embeddings client exposing embed_documents
+            batch_size: Maximum number of inputs per API request
+            max_batch_tokens: Maximum number of input tokens per API request
+            max_concurrency: Number of batches kept in flight
+            max_retries: Retry attempts per failed batch
+            rate_limiter: Optional shared rate limiter
+        """
+        self.embeddings = embeddings
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.max_batch_tokens = max_batch_tokens or settings.embedding_batch_max_tokens
+        self.max_concurrency = max_concurrency or settings.embedding_max_concurrency
+        self.max_retries = settings.embedding_max_retries if max_retries is None else max_retries
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=settings.embedding_requests_per_minute,
+            tokens_per_minute=settings.embedding_tokens_per_minute
+        )
+        self._encoding = None
+        self._encoding_loaded = False
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count input tokens for a text (tiktoken when available, estimate otherwise)
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Number of tokens
+        """
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(settings.embedding_model_name)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+        
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return max(1, len(text) // 4)
+    
+    def build_batches(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Group texts into batches bounded by item count and token count
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            List of batches with keys "indices" and "tokens"
+        """
+        batches = []
+        indices: List[int] = []
+        batch_tokens = 0
+        
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if indices and (
+                len(indices) >= self.batch_size
+                or batch_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append({"indices": indices, "tokens": batch_tokens})
+                indices = []
+                batch_tokens = 0
+            indices.append(i)
+            batch_tokens += tokens
+        
+        if indices:
+            batches.append({"indices": indices, "tokens": batch_tokens})
+        
+        return batches
+    
+    def _embed_batch(self, texts: List[str], batch: Dict[str, Any], attempt: int) -> List[List[float]]:
+        """Embed a single batch, backing off first when it is a retry"""
+        if attempt > 0:
+            backoff = min(2 ** attempt, 30) + random.uniform(0, 1)
+            time.sleep(backoff)
+        self.rate_limiter.acquire(batch["tokens"])
+        return self.embeddings.embed_documents([texts[i] for i in batch["indices"]])
+    
+    def run(
+        self,
+        texts: List[str],
+        on_batch_done: Callable[[List[int], List[List[float]]], None]
+    ) -> Dict[str, Any]:
+        """
+        Embed all texts, handing each finished batch to a callback
+        
+        The callback runs on the calling thread, so it can safely write to
+        the vector store. Failed batches are retried individually; batches
+        that still fail after max_retries are reported in the stats.
+        
+        Args:
+            texts: Texts to embed
+            on_batch_done: Callback receiving (indices, vectors) per batch
+            
+        Returns:
+            Stats dictionary (embedded, batches, retries, failed, seconds, embeddings_per_second)
+        """
+        start_time = time.time()
+        batches = self.build_batches(texts)
+        pending = list(batches)
+        attempts = {id(batch): 0 for batch in batches}
+        stats = {"embedded": 0, "batches": len(batches), "retries": 0, "failed": 0}
+        
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="embedding"
+        ) as executor:
+            in_flight = {}
+            while pending or in_flight:
+                while pending and len(in_flight) < self.max_concurrency:
+                    batch = pending.pop(0)
+                    future = executor.submit(self._embed_batch, texts, batch, attempts[id(batch)])
+                    in_flight[future] = batch
+                
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        attempts[id(batch)] += 1
+                        if attempts[id(batch)] <= self.max_retries:
+                            stats["retries"] += 1
+                            logger.warning(
+                                f"Embedding batch of {len(batch['indices'])} failed "
+                                f"(attempt {attempts[id(batch)]}), retrying: {e}"
+                            )
+                            pending.append(batch)
+                        else:
+                            stats["failed"] += len(batch["indices"])
+                            logger.error(f"Embedding batch of {len(batch['indices'])} failed permanently: {e}")
+                        continue
+                    
+                    on_batch_done(batch["indices"], vectors)
+                    stats["embedded"] += len(vectors)
+        
+        stats["seconds"] = time.time() - start_time
+        stats["embeddings_per_second"] = stats["embedded"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        logger.info(
+            f"Embedded {stats['embedded']} texts in {stats['batches']} batches "
+            f"({stats['embeddings_per_second']:.1f}/s, {stats['retries']} retries, {stats['failed']} failed)"
+        )
+        return stats
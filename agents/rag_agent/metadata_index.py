@@ -0,0 +1,300 @@
+"""
+Metadata Index Module
+Bitmap inverted indexes over selected metadata fields for cheap filtering
+"""
+import logging
+import pickle
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_metadata_filter(
+    specialty: Optional[str] = None,
+    sources: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a ChromaDB-style metadata filter from a retrieval scope
+    
+    Args:
+        specialty: Medical specialty, matched against the "category" field
+        sources: Source file names to restrict retrieval to
+        
+    Returns:
+        Filter dictionary, or None when the scope is empty
+    """
+    clauses = []
+    if specialty:
+        clauses.append({"category": specialty.strip().lower()})
+    if sources:
+        clauses.append({"source": {"$in": list(sources)}})
+    
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+class MetadataIndex:
+    """
+    Bitmap inverted index: field -> value -> bitmap of rows
+    
+    Bitmaps are Python integers (bit i set = row i matches), so AND/OR of
+    filter clauses are single big-integer operations. A reverse map keeps the
+    indexed (field, value) pairs of every document, so removals only touch
+    the bitmaps those documents are in.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, fields: Iterable[str] = None):
+        """
+        Initialize metadata index, loading it from disk when present
+        
+        Args:
+            path: Optional file the index is persisted to
+            fields: Metadata fields to index (default from settings)
+        """
+        self.path = Path(path) if path else None
+        if fields is None:
+            fields = [f.strip() for f in settings.metadata_index_fields.split(",") if f.strip()]
+        self.fields = list(fields)
+        self._reset()
+        
+        if self.path and self.path.exists():
+            self.load()
+    
+    def _reset(self):
+        """Clear all index state"""
+        self.doc_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.values_of: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+        self.bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in self.fields}
+        self.all_rows = 0
+    
+    def __len__(self) -> int:
+        return len(self.row_of)
+    
+    def add(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Index document metadata
+        
+        Args:
+            ids: Chunk IDs
+            metadatas: Metadata dictionaries
+        """
+        start = len(self.doc_ids)
+        new_rows: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.fields}
+        
+        for doc_id, metadata in zip(ids, metadatas):
+            if doc_id in self.row_of:
+                continue
+            row = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.row_of[doc_id] = row
+            
+            metadata = metadata or {}
+            pairs = tuple((field, metadata[field]) for field in self.fields if field in metadata)
+            self.values_of[doc_id] = pairs
+            for field, value in pairs:
+                new_rows[field].setdefault(value, []).append(row)
+        
+        # Merge the whole batch with one big-integer OR per touched value
+        end = len(self.doc_ids)
+        if end == start:
+            return
+        self.all_rows |= ((1 << end) - 1) ^ ((1 << start) - 1)
+        for field, values in new_rows.items():
+            bitmaps = self.bitmaps[field]
+            for value, rows in values.items():
+                bitmaps[value] = bitmaps.get(value, 0) | self._bitmap_from_rows(rows, end)
+    
+    def remove(self, ids: List[str]):
+        """
+        Remove documents from the index
+        
+        Their rows are cleared from the bitmaps of the values they carry
+        (found through the reverse map); row numbers of other documents are
+        left untouched.
+        
+        Args:
+            ids: Chunk IDs to remove
+        """
+        rows = []
+        touched: Dict[Tuple[str, Any], List[int]] = {}
+        for doc_id in ids:
+            row = self.row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            rows.append(row)
+            for pair in self.values_of.pop(doc_id, ()):
+                touched.setdefault(pair, []).append(row)
+        if not rows:
+            return
+        size = len(self.doc_ids)
+        self.all_rows &= ~self._bitmap_from_rows(rows, size)
+        for (field, value), value_rows in touched.items():
+            values = self.bitmaps[field]
+            values[value] &= ~self._bitmap_from_rows(value_rows, size)
+            if not values[value]:
+                del values[value]
+        for row in rows:
+            self.doc_ids[row] = None
+    
+    @staticmethod
+    def _bitmap_from_rows(rows: List[int], size: int) -> int:
+        """Pack row numbers into a bitmap"""
+        bits = np.zeros(size, dtype=np.uint8)
+        bits[rows] = 1
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+    
+    def can_resolve(self, filter: Optional[Dict[str, Any]]) -> bool:
+        """
+        Check whether a filter only uses indexed fields and supported operators
+        
+        Args:
+            filter: ChromaDB-style metadata filter
+            
+        Returns:
+            True if resolve() can answer the filter
+        """
+        if not filter:
+            return False
+        for key, condition in filter.items():
+            if key in ("$and", "$or"):
+                if not all(self.can_resolve(clause) for clause in condition):
+                    return False
+            elif key not in self.bitmaps:
+                return False
+            elif isinstance(condition, dict):
+                if not set(condition) <= {"$eq", "$in"}:
+                    return False
+        return True
+    
+    def resolve(self, filter: Dict[str, Any]) -> Optional[int]:
+        """
+        Evaluate a filter to a row bitmap
+        
+        Args:
+            filter: ChromaDB-style metadata filter
+            
+        Returns:
+            Bitmap of matching rows, or None if the filter is not supported
+        """
+        if not self.can_resolve(filter):
+            return None
+        return self._resolve(filter)
+    
+    def _resolve(self, filter: Dict[str, Any]) -> int:
+        """Evaluate an already validated filter (implicit AND across keys)"""
+        result = self.all_rows
+        for key, condition in filter.items():
+            if key == "$and":
+                for clause in condition:
+                    result &= self._resolve(clause)
+            elif key == "$or":
+                union = 0
+                for clause in condition:
+                    union |= self._resolve(clause)
+                result &= union
+            else:
+                values = self.bitmaps[key]
+                if isinstance(condition, dict):
+                    if "$eq" in condition:
+                        result &= values.get(condition["$eq"], 0)
+                    if "$in" in condition:
+                        union = 0
+                        for value in condition["$in"]:
+                            union |= values.get(value, 0)
+                        result &= union
+                else:
+                    result &= values.get(condition, 0)
+        return result
+    
+    def rows(self, bitmap: int) -> np.ndarray:
+        """
+        Expand a bitmap into sorted row numbers
+        
+        Args:
+            bitmap: Row bitmap
+            
+        Returns:
+            Array of row numbers
+        """
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        n_bytes = (len(self.doc_ids) + 7) // 8
+        bits = np.unpackbits(
+            np.frombuffer(bitmap.to_bytes(n_bytes, "little"), dtype=np.uint8),
+            bitorder="little"
+        )
+        return np.flatnonzero(bits)
+    
+    def ids(self, bitmap: int) -> List[str]:
+        """
+        Expand a bitmap into chunk IDs
+        
+        Args:
+            bitmap: Row bitmap
+            
+        Returns:
+            List of chunk IDs
+        """
+        return [self.doc_ids[row] for row in self.rows(bitmap)]
+    
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """Number of rows set in a bitmap"""
+        return bitmap.bit_count()
+    
+    def clear(self):
+        """Remove all documents and delete the persisted file"""
+        self._reset()
+        if self.path and self.path.exists():
+            self.path.unlink()
+    
+    def save(self, path: Optional[Path] = None):
+        """Persist index to disk"""
+        path = Path(path) if path else self.path
+        if not path:
+            return
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "fields": self.fields,
+                "doc_ids": self.doc_ids,
+                "bitmaps": self.bitmaps,
+                "values_of": self.values_of,
+                "all_rows": self.all_rows
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+    
+    def _values_from_bitmaps(self) -> Dict[str, Tuple[Tuple[str, Any], ...]]:
+        """Rebuild the reverse map from the bitmaps (index files saved before it existed)"""
+        pairs: Dict[str, List[Tuple[str, Any]]] = {doc_id: [] for doc_id in self.row_of}
+        for field, values in self.bitmaps.items():
+            for value, bitmap in values.items():
+                for doc_id in self.ids(bitmap):
+                    pairs[doc_id].append((field, value))
+        return {doc_id: tuple(doc_pairs) for doc_id, doc_pairs in pairs.items()}
+    
+    def load(self):
+        """Load index from disk"""
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state["fields"] != self.fields:
+                logger.warning("Metadata index fields changed, index will be rebuilt")
+                self._reset()
+                return
+            self.doc_ids = state["doc_ids"]
+            self.row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids) if doc_id is not None}
+            self.bitmaps = state["bitmaps"]
+            self.all_rows = state["all_rows"]
+            self.values_of = state.get("values_of") or self._values_from_bitmaps()
+            logger.info(f"Loaded metadata index with {len(self.doc_ids)} documents from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading metadata index, starting empty: {e}")
+            self._reset()
@@ -0,0 +1,273 @@
+"""
+Near-Duplicate Detection Module
+MinHash signatures with an LSH index to spot boilerplate chunks across the corpus
+"""
+import logging
+import pickle
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^31 - 1 keeps (a * x + b) inside uint64 for 31-bit inputs
+MERSENNE_PRIME = (1 << 31) - 1
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + banded LSH index over chunk texts
+    
+    Each chunk is reduced to a MinHash signature of its word shingles; the
+    signature is split into bands, and chunks sharing any band bucket are
+    compared on their estimated Jaccard similarity.
+    
+    The index is shared by request threads (chunking) and the vector store
+    (commit, delete, save), so every public method holds its own lock.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        num_perm: int = None,
+        bands: int = None,
+        threshold: float = None,
+        shingle_size: int = None,
+        seed: int = 1
+    ):
+        """
+        Initialize index, loading committed signatures from disk when present
+        
+        Args:
+            path: Optional file the index is persisted to
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands (must divide num_perm)
+            threshold: Estimated Jaccard similarity at which chunks are duplicates
+            shingle_size: Words per shingle
+            seed: Seed for the permutation coefficients
+        """
+        self.path = Path(path) if path else None
+        self.num_perm = num_perm or settings.dedup_num_perm
+        self.bands = bands or settings.dedup_bands
+        self.threshold = threshold if threshold is not None else settings.dedup_threshold
+        self.shingle_size = shingle_size or settings.dedup_shingle_size
+        if self.num_perm % self.bands:
+            raise ValueError(f"dedup bands ({self.bands}) must divide num_perm ({self.num_perm})")
+        self.rows_per_band = self.num_perm // self.bands
+        self._lock = threading.RLock()
+        
+        rng = np.random.default_rng(seed)
+        self.coef_a = rng.integers(1, MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self.coef_b = rng.integers(0, MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._reset()
+        
+        if self.path and self.path.exists():
+            self.load()
+    
+    def _reset(self):
+        """Clear all index state"""
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.sources: Dict[str, str] = {}
+        self.buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self.pending: set = set()
+    
+    def __len__(self) -> int:
+        return len(self.signatures) - len(self.pending)
+    
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text's word shingles
+        
+        Args:
+            text: Chunk text
+            
+        Returns:
+            uint32 array of length num_perm
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {
+                " ".join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        ) % np.uint64(MERSENNE_PRIME)
+        
+        permuted = (self.coef_a[:, None] * hashes[None, :] + self.coef_b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1).astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray) -> Iterable[bytes]:
+        """Bucket key of each band"""
+        for band in range(self.bands):
+            yield signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+    
+    def find(self, signature: np.ndarray, source: Optional[str] = None) -> Optional[str]:
+        """
+        Find an indexed chunk that is a near-duplicate of a signature
+        
+        Committed chunks from the same source are ignored: they are the
+        previous version of the document being re-ingested.
+        
+        Args:
+            signature: MinHash signature
+            source: Source document of the chunk being checked
+            
+        Returns:
+            Chunk ID of the duplicate, or None
+        """
+        checked = set()
+        with self._lock:
+            for band, key in enumerate(self._band_keys(signature)):
+                for chunk_id in self.buckets[band].get(key, ()):
+                    if chunk_id in checked:
+                        continue
+                    checked.add(chunk_id)
+                    if source is not None and self.sources.get(chunk_id) == source and chunk_id not in self.pending:
+                        continue
+                    if np.mean(self.signatures[chunk_id] == signature) >= self.threshold:
+                        return chunk_id
+        return None
+    
+    def add(self, chunk_id: str, signature: np.ndarray, source: Optional[str] = None, pending: bool = False):
+        """
+        Index a chunk signature
+        
+        Args:
+            chunk_id: Chunk ID
+            signature: MinHash signature
+            source: Source document name
+            pending: Chunk is not stored yet (kept in memory until commit or discard_pending)
+        """
+        with self._lock:
+            if chunk_id in self.signatures:
+                if not pending:
+                    self.pending.discard(chunk_id)
+                return
+            self.signatures[chunk_id] = signature
+            self.sources[chunk_id] = source
+            for band, key in enumerate(self._band_keys(signature)):
+                self.buckets[band].setdefault(key, []).append(chunk_id)
+            if pending:
+                self.pending.add(chunk_id)
+    
+    def commit(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Mark chunks as stored, computing signatures for ones not seen before
+        
+        Args:
+            ids: Chunk IDs written to the vector store
+            texts: Chunk texts
+            metadatas: Chunk metadata
+        """
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            metadata = metadata or {}
+            if metadata.get("duplicate_of"):
+                continue
+            with self._lock:
+                if chunk_id in self.signatures:
+                    self.pending.discard(chunk_id)
+                    continue
+            self.add(chunk_id, self.signature(text), metadata.get("source"))
+    
+    def discard_pending(self, ids: List[str]):
+        """
+        Drop chunks that were registered as pending but never stored
+        
+        Called when a write fails, so later chunks are not skipped as
+        duplicates of content that is not in the store. Committed chunks
+        are left alone.
+        
+        Args:
+            ids: Chunk IDs of the failed write
+        """
+        with self._lock:
+            self.remove([chunk_id for chunk_id in ids if chunk_id in self.pending])
+    
+    def remove(self, ids: List[str]):
+        """
+        Remove chunks from the index
+        
+        Args:
+            ids: Chunk IDs
+        """
+        with self._lock:
+            for chunk_id in ids:
+                signature = self.signatures.pop(chunk_id, None)
+                if signature is None:
+                    continue
+                self.sources.pop(chunk_id, None)
+                self.pending.discard(chunk_id)
+                for band, key in enumerate(self._band_keys(signature)):
+                    bucket = self.buckets[band].get(key)
+                    if bucket and chunk_id in bucket:
+                        bucket.remove(chunk_id)
+                        if not bucket:
+                            del self.buckets[band][key]
+    
+    def clear(self):
+        """Remove all signatures and delete the persisted file"""
+        with self._lock:
+            self._reset()
+            if self.path and self.path.exists():
+                self.path.unlink()
+    
+    def save(self):
+        """Persist committed signatures to disk"""
+        if not self.path:
+            return
+        with self._lock:
+            committed = [chunk_id for chunk_id in self.signatures if chunk_id not in self.pending]
+            sources = [self.sources[chunk_id] for chunk_id in committed]
+            signatures = [self.signatures[chunk_id] for chunk_id in committed]
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "params": [self.num_perm, self.bands, self.shingle_size],
+                "ids": committed,
+                "sources": sources,
+                "signatures": np.stack(signatures) if committed else np.empty((0, self.num_perm), dtype=np.uint32)
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(self.path)
+    
+    def load(self):
+        """Load committed signatures from disk"""
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state["params"] != [self.num_perm, self.bands, self.shingle_size]:
+                logger.warning("Near-duplicate index parameters changed, index will be rebuilt")
+                return
+            with self._lock:
+                for chunk_id, source, signature in zip(state["ids"], state["sources"], state["signatures"]):
+                    self.add(chunk_id, signature, source)
+            logger.info(f"Loaded near-duplicate index with {len(self.signatures)} chunks from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading near-duplicate index, starting empty: {e}")
+            self._reset()
+
+
+# Global instance
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Get or create global near-duplicate index (shared by ingestion and the vector store, safe to call from worker threads)"""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        with _near_duplicate_index_lock:
+            if _near_duplicate_index is None:
+                _near_duplicate_index = NearDuplicateIndex(
+                    settings.get_chroma_path() / f"{settings.chroma_collection_name}.minhash.pkl"
+                )
+    return _near_duplicate_index
@@ -0,0 +1,162 @@
+"""
+Embedding Projection Module
+PCA or Matryoshka dimension reduction for the first search stage
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("pca", "matryoshka")
+
+
+class EmbeddingProjection:
+    """
+    Linear map from full embeddings to a reduced search space
+    
+    "pca" centers vectors on the corpus mean and projects them on the top
+    principal components. "matryoshka" keeps the leading dimensions of
+    models trained for truncation (e.g. text-embedding-3) and renormalizes.
+    Squared L2 distances in the reduced space approximate the full ones, so
+    reduced results only need a short full-precision rescoring pass.
+    """
+    
+    def __init__(
+        self,
+        method: str,
+        mean: np.ndarray,
+        components: Optional[np.ndarray],
+        input_dimension: int,
+        dimension: int,
+        explained_variance: float = 1.0
+    ):
+        """
+        Initialize projection
+        
+        Args:
+            method: "pca" or "matryoshka"
+            mean: Centering vector (D,)
+            components: Projection matrix (D x d), None for matryoshka
+            input_dimension: Full embedding dimension D
+            dimension: Reduced dimension d
+            explained_variance: Fraction of corpus variance kept (PCA only)
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        self.method = method
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32) if components is not None else None
+        self.input_dimension = input_dimension
+        self.dimension = dimension
+        self.explained_variance = explained_variance
+    
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dimension: int) -> "EmbeddingProjection":
+        """
+        Fit a PCA projection on a sample of corpus embeddings
+        
+        Args:
+            vectors: Float32 matrix (N x D)
+            dimension: Number of components to keep
+            
+        Returns:
+            Fitted projection
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dimension = min(dimension, vectors.shape[1], len(vectors))
+        mean = vectors.mean(axis=0)
+        centered = vectors - mean
+        
+        # Eigen-decomposition of the D x D covariance is cheaper than an SVD of the N x D sample
+        covariance = (centered.T @ centered).astype(np.float64) / max(1, len(vectors) - 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues, eigenvectors = eigenvalues[order], eigenvectors[:, order]
+        
+        total = float(eigenvalues.sum())
+        explained = float(eigenvalues[:dimension].sum() / total) if total > 0 else 1.0
+        return cls(
+            "pca",
+            mean,
+            eigenvectors[:, :dimension],
+            input_dimension=vectors.shape[1],
+            dimension=dimension,
+            explained_variance=explained
+        )
+    
+    @classmethod
+    def matryoshka(cls, input_dimension: int, dimension: int) -> "EmbeddingProjection":
+        """
+        Truncation projection for Matryoshka-trained embedding models
+        
+        Args:
+            input_dimension: Full embedding dimension
+            dimension: Number of leading dimensions to keep
+            
+        Returns:
+            Projection
+        """
+        dimension = min(dimension, input_dimension)
+        return cls(
+            "matryoshka",
+            np.zeros(input_dimension, dtype=np.float32),
+            None,
+            input_dimension=input_dimension,
+            dimension=dimension
+        )
+    
+    def transform(self, vectors) -> np.ndarray:
+        """
+        Project embeddings into the reduced space
+        
+        Args:
+            vectors: Embedding or matrix of embeddings (... x D)
+            
+        Returns:
+            Float32 array (... x d)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "matryoshka":
+            reduced = vectors[..., :self.dimension]
+            norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+            return reduced / np.where(norms > 0, norms, 1.0)
+        return (vectors - self.mean) @ self.components
+    
+    def info(self) -> Dict[str, Any]:
+        """Projection parameters for logging"""
+        return {
+            "method": self.method,
+            "input_dimension": self.input_dimension,
+            "dimension": self.dimension,
+            "explained_variance": round(self.explained_variance, 4)
+        }
+    
+    def save(self, path: Path):
+        """Persist the projection next to the collection"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            mean=self.mean,
+            components=self.components if self.components is not None else np.empty((0, 0), dtype=np.float32),
+            info=np.array(json.dumps(self.info()))
+        )
+        tmp_path.replace(path)
+    
+    @classmethod
+    def load(cls, path: Path) -> "EmbeddingProjection":
+        """Load a persisted projection"""
+        with np.load(Path(path)) as state:
+            info = json.loads(str(state["info"]))
+            components = state["components"] if state["components"].size else None
+            return cls(
+                info["method"],
+                state["mean"],
+                components,
+                input_dimension=info["input_dimension"],
+                dimension=info["dimension"],
+                explained_variance=info["explained_variance"]
+            )
@@ -3,8 +3,8 @@ Query Expansion Module
 Expands user queries with medical domain terms for better retrieval
 """
 import logging
+import threading
 from typing import List
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from config import settings
 
@@ -18,13 +18,17 @@ class QueryExpander:
     
     def __init__(self):
         """Initialize query expander with LLM"""
+        from langchain_openai import AzureChatOpenAI
+        from core.health import get_llm_call_tracker
+        
         self.llm = AzureChatOpenAI(
             azure_endpoint=settings.azure_endpoint,
             openai_api_key=settings.openai_api_key,
             openai_api_version=settings.openai_api_version,
             deployment_name=settings.deployment_name or settings.model_name,
             temperature=0.3,
-            max_tokens=500
+            max_tokens=500,
+            callbacks=[get_llm_call_tracker()]
         )
         
         self.expansion_prompt = ChatPromptTemplate.from_messages([
@@ -88,11 +92,14 @@ class QueryExpander:
 
 # Global instance
 _query_expander = None
+_query_expander_lock = threading.Lock()
 
 
 def get_query_expander() -> QueryExpander:
-    """Get or create global query expander instance"""
+    """Get or create global query expander instance (safe to call from worker threads)"""
     global _query_expander
     if _query_expander is None:
-        _query_expander = QueryExpander()
+        with _query_expander_lock:
+            if _query_expander is None:
+                _query_expander = QueryExpander()
     return _query_expander
@@ -3,14 +3,17 @@ RAG Agent Module
 Main RAG agent with advanced retrieval, query expansion, and reranking
 """
 import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.documents import Document
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from config import settings
 from agents.rag_agent.vector_store import get_vector_store
 from agents.rag_agent.query_expander import get_query_expander
 from agents.rag_agent.reranker import get_reranker
+from agents.rag_agent.retrieval_cache import RetrievalCache
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +26,9 @@ class RAGAgent:
     def __init__(self):
         """Initialize RAG Agent with all components"""
         try:
+            from langchain_openai import AzureChatOpenAI
+            from core.health import get_llm_call_tracker
+            
             # Initialize LLM
             self.llm = AzureChatOpenAI(
                 azure_endpoint=settings.azure_endpoint,
@@ -30,6 +36,7 @@ class RAGAgent:
                 openai_api_version=settings.openai_api_version,
                 deployment_name=settings.deployment_name or settings.model_name,
                 temperature=settings.temperature,
+                callbacks=[get_llm_call_tracker()],
                 # max_tokens=settings.max_tokens
             )
             
@@ -38,6 +45,15 @@ class RAGAgent:
             self.query_expander = get_query_expander()
             self.reranker = get_reranker()
             
+            # Runs the dense and sparse searches of hybrid retrieval side by side
+            self.search_executor = ThreadPoolExecutor(
+                max_workers=max(2, settings.hybrid_search_max_workers),
+                thread_name_prefix="hybrid-search"
+            )
+            
+            # Retrieval results (chunk IDs + scores) for near-identical queries
+            self.retrieval_cache = RetrievalCache() if settings.retrieval_cache_enabled else None
+            
             # Create response generation prompt
             self.response_prompt = ChatPromptTemplate.from_messages([
                 ("system", """You are a highly knowledgeable medical assistant. Use the provided context to answer the user's question accurately and professionally.
@@ -69,55 +85,118 @@ Source References:
         query: str, 
         use_expansion: bool = True,
         use_reranking: bool = True,
-        top_k: int = None
+        top_k: int = None,
+        use_hybrid: bool = None,
+        filter: Optional[Dict[str, Any]] = None,
+        use_mmr: bool = None
     ) -> Tuple[List[Document], List[float]]:
         """
         Retrieve relevant documents using advanced retrieval pipeline
         
+        Vector distances are kept with every candidate: they size the
+        candidate pool sent to the cross-encoder, and when the top hit wins
+        by a clear distance margin reranking is skipped altogether. Results
+        are cached on the query text (checked before expansion and embedding)
+        and on a hash of the query embedding, together with the persisted
+        collection version, so repeated queries skip search and reranking.
+        
         Args:
             query: User query
             use_expansion: Whether to use query expansion
             use_reranking: Whether to use document reranking
             top_k: Number of documents to return
+            use_hybrid: Fuse BM25 and vector search (default from settings)
+            filter: Optional metadata filter scoping the search
+            use_mmr: Diversify dense results with MMR (default from settings)
             
         Returns:
             Tuple of (documents, relevance_scores)
         """
         try:
-            # Step 1: Query expansion
+            if use_reranking:
+                final_k = top_k or settings.rerank_top_k
+                k_retrieval = final_k * settings.rerank_candidate_multiplier
+            else:
+                final_k = top_k or settings.top_k_retrieval
+                k_retrieval = final_k
+            
+            if use_hybrid is None:
+                use_hybrid = settings.hybrid_search_enabled
+            
+            if use_mmr is None:
+                use_mmr = settings.mmr_search_enabled
+            
+            # Step 1: Cache lookup on the query text, before any LLM or embedding call
+            text_key = cache_key = version = None
+            cache_params = dict(
+                top_k=final_k,
+                use_reranking=use_reranking,
+                use_hybrid=use_hybrid,
+                use_mmr=use_mmr,
+                filter=filter
+            )
+            if self.retrieval_cache is not None:
+                version = self.vector_store.persisted_version()
+                text_key = self.retrieval_cache.text_key(query, version, use_expansion=use_expansion, **cache_params)
+                cached = self._cached_retrieval(text_key)
+                if cached is not None:
+                    return cached
+            
+            # Step 2: Query expansion
             search_query = query
             if use_expansion:
                 expanded_query = self.query_expander.create_expanded_query(query)
                 search_query = expanded_query
                 logger.info(f"Expanded query: {search_query}")
             
-            # Step 2: Initial retrieval from vector store
-            k_retrieval = (top_k or settings.rerank_top_k) * 3 if use_reranking else (top_k or settings.top_k_retrieval)
-            
-            retrieved_docs = self.vector_store.similarity_search(
-                query=search_query,
-                k=k_retrieval
-            )
+            # Step 3: Initial retrieval from vector store
+            embedding = self.vector_store.embed_query(search_query)
+            if self.retrieval_cache is not None:
+                cache_key = self.retrieval_cache.key(embedding, version, **cache_params)
+                cached = self._cached_retrieval(cache_key)
+                if cached is not None:
+                    self.retrieval_cache.put(text_key, list(zip(
+                        [doc.metadata.get("chunk_id") for doc in cached[0]], cached[1]
+                    )))
+                    return cached
+            
+            if use_hybrid:
+                retrieved = self.hybrid_search(
+                    search_query, k=k_retrieval, filter=filter, use_mmr=use_mmr, embedding=embedding
+                )
+            else:
+                retrieved = self.dense_search(
+                    search_query, k=k_retrieval, filter=filter, use_mmr=use_mmr, embedding=embedding
+                )
             
-            if not retrieved_docs:
+            if not retrieved:
                 logger.warning("No documents retrieved from vector store")
                 return [], []
             
-            logger.info(f"Retrieved {len(retrieved_docs)} documents from vector store")
+            logger.info(f"Retrieved {len(retrieved)} documents from vector store")
             
-            # Step 3: Reranking
-            if use_reranking and len(retrieved_docs) > 0:
-                reranked_results = self.reranker.rerank(
+            # Step 4: Reranking (skipped when the vector distances already decide)
+            if use_reranking and not self.is_clear_winner(retrieved):
+                candidates = self.candidate_pool(retrieved, final_k)
+                rerank = self.reranker.cascade_rerank if settings.rerank_cascade_enabled else self.reranker.rerank
+                reranked_results = rerank(
                     query=query,
-                    documents=retrieved_docs,
-                    top_k=top_k or settings.rerank_top_k
+                    documents=[doc for doc, _ in candidates],
+                    top_k=final_k
                 )
                 documents = [doc for doc, score in reranked_results]
                 scores = [float(score) for doc, score in reranked_results]
-                logger.info(f"Reranked to top {len(documents)} documents")
+                logger.info(f"Reranked {len(candidates)} candidates to top {len(documents)} documents")
             else:
-                documents = retrieved_docs[:top_k or settings.top_k_retrieval]
-                scores = [1.0] * len(documents)
+                if use_reranking:
+                    logger.info("Top hit wins by distance margin, skipping reranking")
+                documents = [doc for doc, _ in retrieved[:final_k]]
+                scores = [self.distance_to_score(distance) for _, distance in retrieved[:final_k]]
+            
+            chunk_ids = [doc.metadata.get("chunk_id") for doc in documents]
+            if cache_key is not None and all(chunk_ids):
+                self.retrieval_cache.put(text_key, list(zip(chunk_ids, scores)))
+                self.retrieval_cache.put(cache_key, list(zip(chunk_ids, scores)))
             
             return documents, scores
             
@@ -125,6 +204,198 @@ Source References:
             logger.error(f"Error retrieving documents: {e}")
             return [], []
     
+    def _cached_retrieval(self, key) -> Optional[Tuple[List[Document], List[float]]]:
+        """
+        Documents and scores cached under a retrieval cache key
+        
+        Args:
+            key: Retrieval cache key
+            
+        Returns:
+            Tuple of (documents, relevance_scores), or None on a miss or when
+            a cached chunk no longer exists
+        """
+        cached = self.retrieval_cache.get(key)
+        if cached is None:
+            return None
+        documents_by_id = self.vector_store.get_documents_by_ids([chunk_id for chunk_id, _ in cached])
+        if len(documents_by_id) != len(cached):
+            return None
+        logger.info(f"Retrieval cache hit ({len(cached)} documents)")
+        return [documents_by_id[chunk_id] for chunk_id, _ in cached], [score for _, score in cached]
+    
+    def distance_confidence(self, distance: Optional[float]) -> float:
+        """
+        Calibrate a vector distance into a 0-1 relevance confidence
+        
+        A logistic curve centered on the configured midpoint distance;
+        candidates found only by keyword search (no distance) get 0.5.
+        
+        Args:
+            distance: Vector distance (lower is more similar)
+            
+        Returns:
+            Confidence between 0 and 1
+        """
+        if distance is None:
+            return 0.5
+        z = (distance - settings.distance_confidence_midpoint) / settings.distance_confidence_scale
+        return 1.0 / (1.0 + math.exp(max(-50.0, min(50.0, z))))
+    
+    def distance_to_score(self, distance: Optional[float]) -> float:
+        """Map a calibrated distance confidence onto the cross-encoder score scale (-10 to 10)"""
+        return self.distance_confidence(distance) * 20.0 - 10.0
+    
+    def is_clear_winner(self, retrieved: List[Tuple[Document, Optional[float]]]) -> bool:
+        """
+        Check whether the closest hit beats the runner-up by the skip margin
+        
+        Args:
+            retrieved: Candidates with their vector distances
+            
+        Returns:
+            True if reranking can be skipped
+        """
+        if not settings.rerank_skip_enabled:
+            return False
+        distances = sorted(distance for _, distance in retrieved if distance is not None)
+        if not distances or distances[0] > settings.rerank_skip_max_distance:
+            return False
+        if len(distances) == 1:
+            return True
+        return distances[1] - distances[0] >= settings.rerank_skip_distance_margin
+    
+    def candidate_pool(
+        self,
+        retrieved: List[Tuple[Document, Optional[float]]],
+        top_k: int
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """
+        Candidates worth sending to the cross-encoder for this query
+        
+        Dense hits farther than the distance window from the best hit are
+        unlikely to be promoted by reranking and are dropped, so the pool
+        shrinks when distances are spread out and grows when they are
+        bunched together. Sparse-only hits (no vector distance) are always
+        kept, since the window says nothing about them. When fewer than
+        top_k candidates remain, out-of-window hits are added back in
+        retrieval order.
+        
+        Args:
+            retrieved: Candidates with their vector distances, in retrieval order
+            top_k: Number of documents the reranker must return
+            
+        Returns:
+            Candidates in retrieval order (at least min(top_k, len(retrieved)))
+        """
+        distances = [distance for _, distance in retrieved if distance is not None]
+        if not distances:
+            return list(retrieved)
+        cutoff = min(distances) + settings.rerank_candidate_distance_window
+        keep = [distance is None or distance <= cutoff for _, distance in retrieved]
+        shortfall = min(top_k, len(retrieved)) - sum(keep)
+        for i in range(len(retrieved)):
+            if shortfall <= 0:
+                break
+            if not keep[i]:
+                keep[i] = True
+                shortfall -= 1
+        return [pair for pair, kept in zip(retrieved, keep) if kept]
+    
+    def dense_search(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        use_mmr: bool = False,
+        embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Vector search, optionally diversified with Maximal Marginal Relevance
+        
+        Args:
+            query: Search query
+            k: Number of documents to return
+            filter: Optional metadata filter
+            use_mmr: Select a diverse top-k from a larger candidate set
+            embedding: Precomputed query embedding (embedded from query if omitted)
+            
+        Returns:
+            List of (document, vector_distance)
+        """
+        if embedding is None:
+            embedding = self.vector_store.embed_query(query)
+        if use_mmr:
+            return self.vector_store.max_marginal_relevance_search_with_score(
+                query=query,
+                k=k,
+                fetch_k=k * settings.mmr_fetch_k_multiplier,
+                lambda_mult=settings.mmr_lambda,
+                filter=filter,
+                embedding=embedding
+            )
+        return self.vector_store.similarity_search_by_vector_with_score(
+            embedding=embedding,
+            k=k,
+            filter=filter,
+            query_text=query
+        )
+    
+    def hybrid_search(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        use_mmr: bool = False,
+        embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """
+        Run dense and BM25 searches concurrently and fuse them with Reciprocal Rank Fusion
+        
+        Args:
+            query: Search query
+            k: Number of documents to return
+            filter: Optional metadata filter applied to both searches
+            use_mmr: Diversify the dense side with MMR
+            embedding: Precomputed query embedding for the dense side
+            
+        Returns:
+            Fused list of (document, vector_distance), best first; the distance
+            is None for documents found only by keyword search
+        """
+        dense_future = self.search_executor.submit(self.dense_search, query, k, filter, use_mmr, embedding)
+        sparse_future = self.search_executor.submit(
+            self.vector_store.keyword_search, query, k, filter
+        )
+        
+        ranked_lists = []
+        distances: Dict[str, float] = {}
+        for future, weight, name in (
+            (dense_future, settings.hybrid_dense_weight, "dense"),
+            (sparse_future, settings.hybrid_sparse_weight, "sparse")
+        ):
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.warning(f"Hybrid search: {name} retrieval failed: {e}")
+                continue
+            if name == "dense":
+                for doc, distance in results:
+                    distances[doc.metadata.get("chunk_id") or doc.page_content] = float(distance)
+            ranked_lists.append(([doc for doc, _ in results], weight))
+        
+        fused_scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for docs, weight in ranked_lists:
+            for rank, doc in enumerate(docs):
+                key = doc.metadata.get("chunk_id") or doc.page_content
+                fused_scores[key] = fused_scores.get(key, 0.0) + weight / (settings.hybrid_rrf_k + rank + 1)
+                documents.setdefault(key, doc)
+        
+        ranked_keys = sorted(fused_scores, key=fused_scores.get, reverse=True)[:k]
+        logger.info(f"Hybrid search fused {len(documents)} candidates into {len(ranked_keys)}")
+        return [(documents[key], distances.get(key)) for key in ranked_keys]
+    
     def calculate_confidence(self, documents: List[Document], scores: List[float]) -> float:
         """
         Calculate confidence score based on retrieval quality
@@ -233,7 +504,8 @@ Source References:
         question: str,
         use_expansion: bool = True,
         use_reranking: bool = True,
-        include_sources: bool = True
+        include_sources: bool = True,
+        filter: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Main query method - complete RAG pipeline
@@ -243,6 +515,7 @@ Source References:
             use_expansion: Enable query expansion
             use_reranking: Enable document reranking
             include_sources: Include source references
+            filter: Optional metadata filter scoping retrieval
             
         Returns:
             Complete response with answer, sources, and confidence
@@ -254,7 +527,8 @@ Source References:
             documents, scores = self.retrieve_documents(
                 query=question,
                 use_expansion=use_expansion,
-                use_reranking=use_reranking
+                use_reranking=use_reranking,
+                filter=filter
             )
             
             # Step 2: Calculate confidence
@@ -289,11 +563,14 @@ Source References:
 
 # Global instance
 _rag_agent = None
+_rag_agent_lock = threading.Lock()
 
 
 def get_rag_agent() -> RAGAgent:
-    """Get or create global RAG agent instance"""
+    """Get or create global RAG agent instance (safe to call from worker threads)"""
     global _rag_agent
     if _rag_agent is None:
-        _rag_agent = RAGAgent()
+        with _rag_agent_lock:
+            if _rag_agent is None:
+                _rag_agent = RAGAgent()
     return _rag_agent
@@ -0,0 +1,208 @@
+"""
+Rerank Batcher Module
+Dynamic micro-batching of cross-encoder pairs across concurrent requests
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EncodedPair = Dict[str, List[int]]
+
+
+def length_buckets(lengths: List[int], max_padding: float, max_pairs: int) -> List[List[int]]:
+    """
+    Group pairs of similar length so each forward pass pads little
+    
+    Pairs are taken in length order; a bucket is closed when adding the
+    next (longer) pair would make padding exceed max_padding of the
+    bucket's padded tokens, or when it holds max_pairs pairs.
+    
+    Args:
+        lengths: Token length of each pair
+        max_padding: Maximum fraction of padded positions per bucket
+        max_pairs: Maximum pairs per bucket
+        
+    Returns:
+        Buckets of indices into lengths
+    """
+    buckets, current, tokens = [], [], 0
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        length = lengths[index]
+        padded = (len(current) + 1) * length
+        if current and (len(current) >= max_pairs or tokens + length < (1.0 - max_padding) * padded):
+            buckets.append(current)
+            current, tokens = [], 0
+        current.append(index)
+        tokens += length
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class _Job:
+    """Pairs submitted by one caller and the future its scores go to"""
+    
+    __slots__ = ("encoded", "future")
+    
+    def __init__(self, encoded: List[EncodedPair]):
+        self.encoded = encoded
+        self.future: Future = Future()
+
+
+class RerankBatcher:
+    """
+    In-process reranker service shared by all request threads
+    
+    Callers submit their encoded query/passage pairs and block on a future.
+    A single worker thread collects pairs for up to RERANK_BATCH_MAX_WAIT_MS
+    (or until RERANK_BATCH_MAX_PAIRS are queued), runs length-bucketed
+    forward passes over the combined set, and resolves each caller's future
+    with its own scores. Under concurrency this replaces many tiny forward
+    passes competing for the same cores with a few larger ones.
+    """
+    
+    def __init__(
+        self,
+        forward: Callable[[List[EncodedPair]], np.ndarray],
+        max_wait_ms: float = None,
+        max_pairs: int = None,
+        max_padding: float = None,
+        parallelism: int = 1
+    ):
+        """
+        Initialize batcher and start its worker thread
+        
+        Args:
+            forward: Scores one bucket of encoded pairs (called from the worker thread or its bucket pool)
+            max_wait_ms: How long to wait for more pairs after the first arrives
+            max_pairs: Pairs that trigger a forward pass without waiting further
+            max_padding: Maximum padded fraction per length bucket
+            parallelism: Buckets scored concurrently (for backends that run out of process)
+        """
+        self.forward = forward
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.rerank_batch_max_wait_ms) / 1000.0
+        self.max_pairs = max_pairs or settings.rerank_batch_max_pairs
+        self.max_padding = max_padding if max_padding is not None else settings.rerank_batch_max_padding
+        
+        self._executor = (
+            ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="rerank-bucket")
+            if parallelism > 1 else None
+        )
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.forward_passes = 0
+        self.pairs = 0
+        self.jobs = 0
+        
+        self._thread = threading.Thread(target=self._run, name="rerank-batcher", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"RerankBatcher started (max wait {self.max_wait * 1000:.1f}ms, "
+            f"max {self.max_pairs} pairs, max padding {self.max_padding:.0%})"
+        )
+    
+    def submit(self, encoded: List[EncodedPair]) -> Future:
+        """
+        Queue a caller's encoded pairs
+        
+        Args:
+            encoded: Encoded query/passage pairs
+            
+        Returns:
+            Future resolving to a float32 score array aligned with encoded
+        """
+        job = _Job(encoded)
+        if not encoded:
+            job.future.set_result(np.empty(0, dtype=np.float32))
+        else:
+            self._queue.put(job)
+        return job.future
+    
+    def score(self, encoded: List[EncodedPair]) -> np.ndarray:
+        """Submit pairs and wait for their scores"""
+        return self.submit(encoded).result()
+    
+    def _collect(self) -> List[_Job]:
+        """Block for the first job, then gather more until the wait or pair budget runs out"""
+        jobs = [self._queue.get()]
+        pairs = len(jobs[0].encoded)
+        deadline = time.monotonic() + self.max_wait
+        while pairs < self.max_pairs:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            pairs += len(job.encoded)
+        return jobs
+    
+    def _run(self):
+        """Worker loop"""
+        while True:
+            jobs = self._collect()
+            try:
+                self._process(jobs)
+            except Exception as e:
+                logger.error(f"Error in rerank batch of {len(jobs)} requests: {e}")
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+    
+    def _process(self, jobs: List[_Job]):
+        """Score the pairs of several jobs in shared, length-bucketed forward passes"""
+        flat = [(job_index, pair) for job_index, job in enumerate(jobs) for pair in job.encoded]
+        results = [np.empty(len(job.encoded), dtype=np.float32) for job in jobs]
+        offsets = np.cumsum([0] + [len(job.encoded) for job in jobs])
+        
+        buckets = length_buckets(
+            [len(pair["input_ids"]) for _, pair in flat],
+            self.max_padding,
+            self.max_pairs
+        )
+        bucket_pairs = [[flat[i][1] for i in bucket] for bucket in buckets]
+        if self._executor is not None and len(buckets) > 1:
+            bucket_scores = list(self._executor.map(self.forward, bucket_pairs))
+        else:
+            bucket_scores = [self.forward(pairs) for pairs in bucket_pairs]
+        for bucket, scores in zip(buckets, bucket_scores):
+            for i, score in zip(bucket, scores):
+                job_index = flat[i][0]
+                results[job_index][i - offsets[job_index]] = score
+        
+        for job, scores in zip(jobs, results):
+            job.future.set_result(scores)
+        
+        with self._stats_lock:
+            self.batches += 1
+            self.forward_passes += len(buckets)
+            self.pairs += len(flat)
+            self.jobs += len(jobs)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Batching statistics
+        
+        Returns:
+            Dictionary with batches, forward passes, pairs, requests and averages
+        """
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "forward_passes": self.forward_passes,
+                "pairs": self.pairs,
+                "requests": self.jobs,
+                "requests_per_batch": self.jobs / self.batches if self.batches else 0.0,
+                "pairs_per_forward": self.pairs / self.forward_passes if self.forward_passes else 0.0,
+                "queued": self._queue.qsize()
+            }
@@ -0,0 +1,355 @@
+"""
+Rerank Worker Pool Module
+Cross-encoder forward passes in dedicated worker processes over shared memory
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import List, Dict, Any
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Token IDs travel as int32 (vocabularies fit comfortably), scores as float32
+INPUT_DTYPE = np.int32
+SCORE_DTYPE = np.float32
+
+# Each block starts with a status byte (padded to 8 bytes) the API process
+# sets when it stops waiting for the job, so workers skip abandoned jobs
+HEADER_BYTES = 8
+JOB_ABANDONED = 1
+
+
+def parse_core_groups(spec: str) -> List[List[int]]:
+    """
+    Parse a core pinning spec such as "0-3;4-7" or "0,1;2,3"
+    
+    Args:
+        spec: Semicolon-separated groups of comma-separated cores or ranges
+        
+    Returns:
+        One list of core IDs per group (empty list for an empty spec)
+    """
+    groups = []
+    for group in filter(None, (part.strip() for part in spec.split(";"))):
+        cores = []
+        for item in filter(None, (part.strip() for part in group.split(","))):
+            if "-" in item:
+                start, end = item.split("-", 1)
+                cores.extend(range(int(start), int(end) + 1))
+            else:
+                cores.append(int(item))
+        groups.append(cores)
+    return groups
+
+
+def _worker_main(index: int, model_name: str, cores: List[int], requests, responses):
+    """
+    Worker process entry point: load one model copy and serve forward passes
+    
+    Args:
+        index: Worker index (for logging)
+        model_name: Cross-encoder model name
+        cores: Cores to pin the process to (empty = no pinning)
+        requests: Queue of (job_id, block_name, input_names, batch, length) or None to stop
+        responses: Queue the worker reports readiness and job outcomes on; every
+            job is acknowledged, and the API process unlinks its block only then
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            logger.warning(f"Could not pin rerank worker {index} to cores {cores}, running unpinned: {e}")
+            cores = []
+    
+    from config import settings as worker_settings
+    # The worker only runs the backend: tokenization, caching and batching stay in the API process
+    worker_settings.rerank_worker_processes = 0
+    worker_settings.rerank_batching_enabled = False
+    worker_settings.rerank_token_cache_enabled = False
+    worker_settings.rerank_score_cache_enabled = False
+    if cores:
+        worker_settings.reranker_intra_op_threads = len(cores)
+    
+    from agents.rag_agent.reranker import DocumentReranker
+    reranker = DocumentReranker(model_name)
+    responses.put(("ready", index, None if reranker.enabled else "model failed to load"))
+    if not reranker.enabled:
+        return
+    
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        job_id, block_name, names, batch, length = message
+        try:
+            block = shared_memory.SharedMemory(name=block_name)
+            try:
+                if block.buf[0] == JOB_ABANDONED:
+                    responses.put((job_id, "abandoned before it started"))
+                    continue
+                inputs = np.ndarray((len(names), batch, length), dtype=INPUT_DTYPE, buffer=block.buf, offset=HEADER_BYTES)
+                features = {name: inputs[i].astype(np.int64) for i, name in enumerate(names)}
+                output = np.ndarray((batch,), dtype=SCORE_DTYPE, buffer=block.buf, offset=HEADER_BYTES + inputs.nbytes)
+                output[:] = reranker.backend.forward(features)
+                del inputs, output
+            finally:
+                block.close()
+            responses.put((job_id, None))
+        except Exception as e:
+            responses.put((job_id, f"worker {index}: {e}"))
+
+
+class RerankWorkerPool:
+    """
+    Cross-encoder backend served by a pool of worker processes
+    
+    Each worker process holds one copy of the model and is pinned to its
+    own group of cores, with torch/ONNX Runtime threads sized to match, so
+    inference no longer competes with request handling for the GIL. Padded
+    inputs are written to a shared-memory block; only its name goes over
+    the request queue, and the worker writes scores back into the same
+    block. Workers pull from one queue, so a busy worker never holds up
+    another's jobs. Dead workers are restarted on the next forward pass.
+    
+    A forward pass that times out marks its block abandoned instead of
+    unlinking it while a worker may still write to it; the dispatcher
+    unlinks the block once the worker acknowledges the job (a worker that
+    has not started it yet skips it).
+    
+    The pool is meant to be the only one on the host: it refuses to start
+    when WEB_CONCURRENCY asks for several API worker processes, each of
+    which would start its own pool and model copies.
+    """
+    
+    name = "process-pool"
+    
+    def __init__(self, model_name: str, processes: int = None, core_groups: List[List[int]] = None, timeout: float = None):
+        """
+        Start the worker processes
+        
+        Args:
+            model_name: Cross-encoder model name
+            processes: Number of worker processes (default from settings)
+            core_groups: Cores per worker, reused cyclically (default from settings)
+            timeout: Seconds to wait for a forward pass before failing it
+            
+        Raises:
+            RuntimeError: If WEB_CONCURRENCY is greater than 1
+        """
+        api_workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+        if api_workers > 1:
+            raise RuntimeError(
+                f"RERANK_WORKER_PROCESSES needs a single API worker per host, but WEB_CONCURRENCY={api_workers} "
+                "would start one pool per worker; run one API worker or set RERANK_WORKER_PROCESSES=0"
+            )
+        self.model_name = model_name
+        self.processes = processes or settings.rerank_worker_processes
+        self.core_groups = core_groups if core_groups is not None else parse_core_groups(settings.rerank_worker_cores)
+        self.timeout = timeout or settings.rerank_worker_timeout
+        
+        self._context = mp.get_context("spawn")
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        self._pending: Dict[int, Future] = {}
+        # Shared-memory blocks of queued jobs, and jobs whose caller gave up waiting
+        self._blocks: Dict[int, shared_memory.SharedMemory] = {}
+        self._abandoned: set = set()
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._ready = threading.Event()
+        self._closed = False
+        self.ready_workers = 0
+        self.failed_workers = 0
+        self.jobs = 0
+        self.errors = 0
+        self.restarts = 0
+        
+        self._workers = [self._start_worker(index) for index in range(self.processes)]
+        self._dispatcher = threading.Thread(target=self._dispatch, name="rerank-pool-dispatch", daemon=True)
+        self._dispatcher.start()
+        logger.info(
+            f"RerankWorkerPool started {self.processes} worker processes for {model_name} "
+            f"(cores: {settings.rerank_worker_cores or 'unpinned'})"
+        )
+    
+    def _cores(self, index: int) -> List[int]:
+        """Core group of a worker"""
+        return self.core_groups[index % len(self.core_groups)] if self.core_groups else []
+    
+    def _start_worker(self, index: int):
+        """Spawn one worker process"""
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.model_name, self._cores(index), self._requests, self._responses),
+            name=f"rerank-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+    
+    def _ensure_workers(self):
+        """Restart worker processes that crashed (a worker whose model failed to load exits cleanly and stays down)"""
+        with self._lock:
+            for index, process in enumerate(self._workers):
+                if not self._closed and not process.is_alive() and process.exitcode:
+                    logger.warning(f"Rerank worker {index} exited with code {process.exitcode}, restarting")
+                    self._workers[index] = self._start_worker(index)
+                    self.restarts += 1
+    
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        Wait for the first worker to load its model
+        
+        Args:
+            timeout: Seconds to wait (None = forever)
+            
+        Returns:
+            True if at least one worker is ready
+        """
+        return self._ready.wait(timeout)
+    
+    def _dispatch(self):
+        """Resolve forward-pass futures as workers report back"""
+        while True:
+            message = self._responses.get()
+            if message is None:
+                return
+            if message[0] == "ready":
+                _, index, error = message
+                if error:
+                    self.failed_workers += 1
+                    logger.error(f"Rerank worker {index} failed to start: {error}")
+                else:
+                    self.ready_workers += 1
+                    self._ready.set()
+                continue
+            
+            job_id, error = message
+            with self._lock:
+                if job_id in self._abandoned:
+                    # The worker is done with the block: nobody reads the result
+                    self._abandoned.discard(job_id)
+                    self._release(job_id)
+                    continue
+                future = self._pending.get(job_id)
+            if future is None or future.done():
+                continue
+            if error:
+                future.set_exception(RuntimeError(f"Rerank worker error: {error}"))
+            else:
+                future.set_result(None)
+    
+    def _release(self, job_id: int):
+        """Close and unlink the shared-memory block of a job (caller holds the lock)"""
+        block = self._blocks.pop(job_id, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+    
+    def forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Score a padded batch in a worker process
+        
+        Args:
+            features: Padded int arrays keyed by model input name
+            
+        Returns:
+            Float32 array of relevance logits, one per pair
+        """
+        self._ensure_workers()
+        if self.failed_workers >= self.processes:
+            raise RuntimeError("No rerank worker could load the model")
+        names = list(features)
+        batch, length = features[names[0]].shape
+        input_bytes = len(names) * batch * length * np.dtype(INPUT_DTYPE).itemsize
+        block = shared_memory.SharedMemory(
+            create=True,
+            size=HEADER_BYTES + input_bytes + batch * np.dtype(SCORE_DTYPE).itemsize
+        )
+        job_id = next(self._job_ids)
+        future: Future = Future()
+        queued = False
+        try:
+            block.buf[0] = 0
+            inputs = np.ndarray((len(names), batch, length), dtype=INPUT_DTYPE, buffer=block.buf, offset=HEADER_BYTES)
+            for i, name in enumerate(names):
+                inputs[i] = features[name]
+            del inputs
+            
+            with self._lock:
+                self._pending[job_id] = future
+                self._blocks[job_id] = block
+                self.jobs += 1
+            self._requests.put((job_id, block.name, names, batch, length))
+            queued = True
+            future.result(timeout=self.timeout)
+            
+            output = np.ndarray((batch,), dtype=SCORE_DTYPE, buffer=block.buf, offset=HEADER_BYTES + input_bytes)
+            scores = output.copy()
+            del output
+            return scores
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(job_id, None)
+                self._blocks[job_id] = block
+                if queued and not future.done():
+                    # A worker may still hold the job: unlink once it acknowledges
+                    block.buf[0] = JOB_ABANDONED
+                    self._abandoned.add(job_id)
+                else:
+                    self._release(job_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Worker pool statistics
+        
+        Returns:
+            Dictionary with worker counts, jobs, errors and restarts
+        """
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "alive": sum(process.is_alive() for process in self._workers),
+                "ready": self.ready_workers,
+                "failed": self.failed_workers,
+                "in_flight": len(self._pending),
+                "abandoned": len(self._abandoned),
+                "jobs": self.jobs,
+                "errors": self.errors,
+                "restarts": self.restarts
+            }
+    
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the worker processes and the dispatcher thread
+        
+        Args:
+            timeout: Seconds to wait for each worker to exit
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._requests.put(None)
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._responses.put(None)
+        self._dispatcher.join(timeout)
+        with self._lock:
+            # Workers are gone, so blocks of unacknowledged jobs can go too
+            for job_id in list(self._blocks):
+                self._release(job_id)
+            self._abandoned.clear()
+        logger.info("RerankWorkerPool stopped")
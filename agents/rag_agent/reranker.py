@@ -2,54 +2,348 @@
 Reranker Module
 Uses Cross-Encoder model to rerank retrieved documents for better relevance
 """
+import hashlib
 import logging
-from typing import List, Tuple
+import re
+import threading
+from typing import List, Tuple, Dict, Any
+import numpy as np
 from langchain_core.documents import Document
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
 from config import settings
+from utils.lru_cache import LRUCache
+from agents.rag_agent.rerank_batcher import RerankBatcher, length_buckets
+from agents.rag_agent.rerank_workers import RerankWorkerPool
+from agents.rag_agent.token_cache import ChunkTokenCache
 
 logger = logging.getLogger(__name__)
 
+# Query/passage pairs used to compare an alternative backend with eager PyTorch
+PARITY_PAIRS = [
+    ["what are the symptoms of type 2 diabetes", "Common symptoms of type 2 diabetes include increased thirst, frequent urination and fatigue."],
+    ["what are the symptoms of type 2 diabetes", "The heart pumps blood through the circulatory system."],
+    ["how is hypertension treated", "Hypertension is managed with lifestyle changes and medications such as ACE inhibitors."],
+    ["how is hypertension treated", "Influenza is a contagious respiratory illness caused by influenza viruses."],
+    ["side effects of ibuprofen", "Ibuprofen may cause stomach upset, heartburn and, rarely, gastrointestinal bleeding. " * 20],
+    ["asthma inhaler", "Short-acting bronchodilators relieve acute asthma symptoms."]
+]
+
+
+def text_hash(text: str) -> str:
+    """Short stable hash of a passage (same scheme as the vector store's content_hash)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def query_hash(query: str) -> str:
+    """Hash of a query after case and whitespace normalization"""
+    normalized = re.sub(r"\s+", " ", query).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
 
 class DocumentReranker:
     """
     Reranks retrieved documents using HuggingFace Cross-Encoder model
+    
+    The forward pass runs on a pluggable backend: eager PyTorch, or the
+    model exported to ONNX (optionally int8-quantized) and run with ONNX
+    Runtime. Both see the same tokenized pairs, so rerank and get_scores
+    behave identically apart from numerical noise. With batching enabled,
+    pairs from concurrent requests are scored together by a RerankBatcher.
+    Passage token IDs are cached per chunk, so a request only tokenizes
+    its query, and scores are cached per (query, passage) so popular
+    questions skip the model entirely. With RERANK_WORKER_PROCESSES set,
+    the model is loaded only in a RerankWorkerPool and this process keeps
+    the tokenizer and caches (and never imports torch).
+    
+    The pool belongs to the process that builds the reranker, so it is only
+    started with a single API worker (WEB_CONCURRENCY unset or 1); with
+    several, every worker would start its own pool and model copies.
     """
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-TinyBERT-L-6"):
+    def __init__(self, model_name: str = None):
         """
         Initialize reranker with cross-encoder model
         
         Args:
-            model_name: HuggingFace model name for reranking
+            model_name: HuggingFace model name for reranking (default from settings)
         """
         self.enabled = True
-        self.model_name = model_name
+        self.model_name = model_name or settings.reranker_model
+        self.max_length = settings.reranker_max_length
+        self.batcher = None
+        self.token_cache = None
+        self.score_cache = (
+            LRUCache(settings.rerank_score_cache_size, ttl=settings.rerank_score_cache_ttl or None)
+            if settings.rerank_score_cache_enabled else None
+        )
+        # Fast tokenizers are not safe to call concurrently with truncation settings
+        self._tokenizer_lock = threading.Lock()
+        
+        # transformers and torch take seconds to import, so they load with the model
+        from transformers import AutoTokenizer
+        self.device = None
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(
-                model_name,
+                self.model_name,
                 token=settings.huggingface_token
             )
-            self.model = AutoModelForSequenceClassification.from_pretrained(
-                model_name,
-                token=settings.huggingface_token
-            )
-            
-            # Set model to evaluation mode
-            self.model.eval()
-            
-            # Use GPU if available
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(self.device)
+            if settings.rerank_worker_processes > 0:
+                # The model lives in the worker processes; this process only tokenizes
+                self.model = None
+                self.backend = RerankWorkerPool(self.model_name)
+            else:
+                import torch
+                from transformers import AutoModelForSequenceClassification
+                self.model = AutoModelForSequenceClassification.from_pretrained(
+                    self.model_name,
+                    token=settings.huggingface_token
+                )
+                
+                # Set model to evaluation mode
+                self.model.eval()
+                
+                # Use GPU if available
+                self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+                self.model.to(self.device)
+                if settings.reranker_intra_op_threads:
+                    torch.set_num_threads(settings.reranker_intra_op_threads)
+                
+                self.backend = self._load_backend()
+            if settings.rerank_token_cache_enabled:
+                self.token_cache = ChunkTokenCache(settings.rerank_token_cache_max_tokens, len(self.tokenizer))
+            if settings.rerank_batching_enabled:
+                self.batcher = RerankBatcher(
+                    self._forward_encoded,
+                    parallelism=max(1, settings.rerank_worker_processes)
+                )
             
-            logger.info(f"DocumentReranker initialized with model: {model_name} on {self.device}")
+            logger.info(
+                f"DocumentReranker initialized with model: {self.model_name} "
+                f"on {self.device or 'worker processes'} ({self.backend.name} backend)"
+            )
             
         except Exception as e:
             self.enabled = False
-            self.device = torch.device("cpu")
             logger.error(f"Error initializing DocumentReranker (disabled): {e}")
     
+    def _load_backend(self):
+        """Pick the configured backend, falling back to PyTorch if ONNX is unavailable or off"""
+        from agents.rag_agent.reranker_backends import TorchCrossEncoder, OnnxCrossEncoder, export_onnx
+        
+        torch_backend = TorchCrossEncoder(self.model, self.device)
+        if settings.reranker_backend != "onnx":
+            return torch_backend
+        
+        try:
+            model_path = export_onnx(
+                self.model,
+                self.tokenizer,
+                self.model_name,
+                settings.reranker_onnx_directory,
+                quantize=settings.reranker_onnx_quantize
+            )
+            backend = OnnxCrossEncoder(model_path, settings.reranker_intra_op_threads)
+            deviation = self.check_parity(backend, reference=torch_backend)
+            if deviation > settings.reranker_parity_tolerance:
+                logger.warning(
+                    f"ONNX reranker scores deviate by {deviation:.4f} from PyTorch "
+                    f"(tolerance {settings.reranker_parity_tolerance}), using PyTorch"
+                )
+                return torch_backend
+            logger.info(f"ONNX reranker parity check passed (max deviation {deviation:.4f})")
+            return backend
+        except Exception as e:
+            logger.error(f"Error loading ONNX reranker, using PyTorch: {e}")
+            return torch_backend
+    
+    def check_parity(self, backend, reference=None, pairs: List[List[str]] = None) -> float:
+        """
+        Compare a backend's scores with a reference backend
+        
+        Args:
+            backend: Backend under test
+            reference: Reference backend (default: eager PyTorch)
+            pairs: Query/passage pairs (default: PARITY_PAIRS)
+            
+        Returns:
+            Maximum absolute score difference
+        """
+        if reference is None:
+            from agents.rag_agent.reranker_backends import TorchCrossEncoder
+            reference = TorchCrossEncoder(self.model, self.device)
+        features = self._collate(self._encode_pairs(pairs or PARITY_PAIRS))
+        return float(np.max(np.abs(backend.forward(features) - reference.forward(features))))
+    
+    def _encode_pairs(self, pairs: List[List[str]], max_length: int = None) -> List[Dict[str, List[int]]]:
+        """
+        Tokenize query/passage pairs without padding
+        
+        Args:
+            pairs: [query, passage] pairs
+            max_length: Truncation length (longest-first, default from settings)
+            
+        Returns:
+            One dict of token lists per pair
+        """
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(
+                pairs,
+                truncation=True,
+                max_length=max_length or self.max_length
+            )
+        names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in encoded]
+        return [
+            {name: encoded[name][i] for name in names}
+            for i in range(len(pairs))
+        ]
+    
+    def _encode(self, query: str, documents: List[Document], max_length: int = None) -> List[Dict[str, List[int]]]:
+        """
+        Build encoded query/passage pairs from cached passage tokens
+        
+        Args:
+            query: User query
+            documents: Documents to pair with the query
+            max_length: Pair length limit including special tokens (default from settings)
+            
+        Returns:
+            One dict of token lists per document
+        """
+        max_length = max_length or self.max_length
+        if self.token_cache is None:
+            return self._encode_pairs([[query, doc.page_content] for doc in documents], max_length)
+        
+        keys = [self._token_cache_key(doc) for doc in documents]
+        passages = [self.token_cache.get(key) for key in keys]
+        missing = [i for i, tokens in enumerate(passages) if tokens is None]
+        
+        with self._tokenizer_lock:
+            query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+            if missing:
+                tokenized = self.tokenizer(
+                    [documents[i].page_content for i in missing],
+                    add_special_tokens=False,
+                    truncation=True,
+                    max_length=self.max_length
+                )["input_ids"]
+        for i, tokens in zip(missing, tokenized if missing else []):
+            self.token_cache.put(keys[i], tokens)
+            passages[i] = tokens
+        
+        budget = max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+        encoded = []
+        for passage_ids in passages:
+            query_length, passage_length = self._truncated_lengths(
+                len(query_ids), len(passage_ids), budget, fast=self.tokenizer.is_fast
+            )
+            first, second = query_ids[:query_length], passage_ids[:passage_length]
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(first, second)
+            pair = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if "token_type_ids" in self.tokenizer.model_input_names:
+                pair["token_type_ids"] = self.tokenizer.create_token_type_ids_from_sequences(first, second)
+            encoded.append(pair)
+        return encoded
+    
+    @staticmethod
+    def _truncated_lengths(query_length: int, passage_length: int, budget: int, fast: bool = True) -> Tuple[int, int]:
+        """
+        Longest-first truncation lengths, matching the HF tokenizers
+        
+        The longer sequence is trimmed first; if both still exceed half the
+        budget each keeps budget // 2 tokens and one keeps the odd token.
+        Fast (Rust) tokenizers give it to the longer sequence, the passage on
+        a tie; the Python tokenizers always give it to the query.
+        
+        Args:
+            query_length: Query tokens (without special tokens)
+            passage_length: Passage tokens (without special tokens)
+            budget: Pair length limit minus special tokens
+            fast: Mirror a fast tokenizer rather than a Python one
+            
+        Returns:
+            Tuple of (query_length, passage_length) after truncation
+        """
+        if query_length + passage_length <= budget:
+            return query_length, passage_length
+        shorter = min(query_length, passage_length)
+        if shorter <= budget // 2:
+            longer = budget - shorter
+            return (shorter, longer) if query_length <= passage_length else (longer, shorter)
+        half, odd = budget // 2, budget % 2
+        if fast and query_length <= passage_length:
+            return half, half + odd
+        return half + odd, half
+    
+    @staticmethod
+    def _token_cache_key(doc: Document) -> str:
+        """Chunk ID when the document came from the vector store, else a hash of its text"""
+        return doc.metadata.get("chunk_id") or DocumentReranker._content_key(doc)
+    
+    @staticmethod
+    def _content_key(doc: Document) -> str:
+        """Content hash of a document's text"""
+        return doc.metadata.get("content_hash") or text_hash(doc.page_content)
+    
+    def _collate(self, encoded: List[Dict[str, List[int]]]) -> Dict[str, np.ndarray]:
+        """Pad encoded pairs to the longest one in the batch"""
+        length = max(len(pair["input_ids"]) for pair in encoded)
+        pad_id = self.tokenizer.pad_token_id or 0
+        features = {}
+        for name in encoded[0]:
+            batch = np.full((len(encoded), length), pad_id if name == "input_ids" else 0, dtype=np.int64)
+            for row, pair in enumerate(encoded):
+                batch[row, :len(pair[name])] = pair[name]
+            features[name] = batch
+        return features
+    
+    def _forward_encoded(self, encoded: List[Dict[str, List[int]]]) -> np.ndarray:
+        """Run the backend over one padded batch of encoded pairs"""
+        return self.backend.forward(self._collate(encoded))
+    
+    def _score_encoded(self, encoded: List[Dict[str, List[int]]]) -> np.ndarray:
+        """Score encoded pairs, through the shared batcher when enabled"""
+        if self.batcher is not None:
+            return self.batcher.score(encoded)
+        scores = np.empty(len(encoded), dtype=np.float32)
+        for bucket in length_buckets(
+            [len(pair["input_ids"]) for pair in encoded],
+            settings.rerank_batch_max_padding,
+            settings.rerank_batch_max_pairs
+        ):
+            scores[bucket] = self._forward_encoded([encoded[i] for i in bucket])
+        return scores
+    
+    def _score_pairs(self, query: str, documents: List[Document], max_length: int = None) -> np.ndarray:
+        """
+        Cross-encoder relevance logits for a query against documents
+        
+        Cached (query, passage) scores are reused; only the remaining pairs
+        go through the model.
+        
+        Args:
+            query: User query
+            documents: Documents to score
+            max_length: Truncation length (default from settings)
+            
+        Returns:
+            Float32 array of scores aligned with documents
+        """
+        max_length = max_length or self.max_length
+        if self.score_cache is None:
+            return self._score_encoded(self._encode(query, documents, max_length))
+        
+        query_key = query_hash(query)
+        keys = [(query_key, self._content_key(doc), max_length) for doc in documents]
+        cached = [self.score_cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(cached) if score is None]
+        
+        scores = np.array([0.0 if score is None else score for score in cached], dtype=np.float32)
+        if missing:
+            fresh = self._score_encoded(self._encode(query, [documents[i] for i in missing], max_length))
+            for i, score in zip(missing, fresh):
+                scores[i] = score
+                self.score_cache.put(keys[i], float(score))
+        return scores
+    
     def rerank(
         self, 
         query: str, 
@@ -77,21 +371,8 @@ class DocumentReranker:
             
             top_k = top_k or settings.rerank_top_k
             
-            # Prepare query-document pairs
-            pairs = [[query, doc.page_content] for doc in documents]
-            
-            # Tokenize and get scores
-            with torch.no_grad():
-                inputs = self.tokenizer(
-                    pairs,
-                    padding=True,
-                    truncation=True,
-                    return_tensors="pt",
-                    max_length=512
-                ).to(self.device)
-                
-                outputs = self.model(**inputs)
-                scores = outputs.logits.squeeze(-1).cpu().numpy()
+            # Score query-document pairs
+            scores = self._score_pairs(query, documents)
             
             # Combine documents with scores
             doc_scores = list(zip(documents, scores))
@@ -111,6 +392,64 @@ class DocumentReranker:
             # Return original documents with default scores if reranking fails
             return [(doc, 0.5) for doc in documents[:top_k]]
     
+    def cascade_rerank(
+        self,
+        query: str,
+        documents: List[Document],
+        top_k: int = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Two-stage rerank: truncated cross-encoder over all candidates, full one on the uncertain shortlist
+        
+        Stage one scores every pair at RERANK_CASCADE_FIRST_MAX_LENGTH tokens.
+        If the k-th and (k+1)-th stage-one scores are at least
+        RERANK_CASCADE_MARGIN apart, the top k is already decided and is
+        returned as is. Otherwise the best RERANK_CASCADE_SHORTLIST
+        candidates that are within the margin of the k-th score are
+        rescored at full length.
+        
+        Args:
+            query: User query
+            documents: List of retrieved documents
+            top_k: Number of top documents to return
+            
+        Returns:
+            List of tuples (document, relevance_score) sorted by score
+        """
+        top_k = top_k or settings.rerank_top_k
+        try:
+            if not documents:
+                return []
+            if not self.enabled:
+                return [(doc, 0.5) for doc in documents[:top_k]]
+            if len(documents) <= top_k:
+                return self.rerank(query, documents, top_k)
+            
+            first = self._score_pairs(query, documents, max_length=settings.rerank_cascade_first_max_length)
+            order = np.argsort(-first, kind="stable")
+            boundary = first[order[top_k - 1]]
+            if boundary - first[order[top_k]] >= settings.rerank_cascade_margin:
+                logger.info(f"Cascade rerank: top {top_k} of {len(documents)} separated after the first stage")
+                return [(documents[i], first[i]) for i in order[:top_k]]
+            
+            shortlist_size = max(top_k + 1, settings.rerank_cascade_shortlist)
+            shortlist = [
+                int(i) for i in order[:shortlist_size]
+                if first[i] >= boundary - settings.rerank_cascade_margin
+            ]
+            full = self._score_pairs(query, [documents[i] for i in shortlist])
+            doc_scores = sorted(zip((documents[i] for i in shortlist), full), key=lambda x: x[1], reverse=True)
+            
+            logger.info(
+                f"Cascade rerank: {len(documents)} scored at {settings.rerank_cascade_first_max_length} tokens, "
+                f"{len(shortlist)} rescored at full length, returning top {min(top_k, len(doc_scores))}"
+            )
+            return doc_scores[:top_k]
+            
+        except Exception as e:
+            logger.error(f"Error in cascade reranking: {e}")
+            return [(doc, 0.5) for doc in documents[:top_k]]
+    
     def get_scores(self, query: str, documents: List[Document]) -> List[float]:
         """
         Get relevance scores for documents without reranking
@@ -125,34 +464,58 @@ class DocumentReranker:
         try:
             if not self.enabled:
                 return [0.5] * len(documents)
-            pairs = [[query, doc.page_content] for doc in documents]
-            
-            with torch.no_grad():
-                inputs = self.tokenizer(
-                    pairs,
-                    padding=True,
-                    truncation=True,
-                    return_tensors="pt",
-                    max_length=512
-                ).to(self.device)
-                
-                outputs = self.model(**inputs)
-                scores = outputs.logits.squeeze(-1).cpu().numpy().tolist()
-            
-            return scores
+            if not documents:
+                return []
+            return self._score_pairs(query, documents).tolist()
             
         except Exception as e:
             logger.error(f"Error getting scores: {e}")
             return [0.5] * len(documents)
+    
+    def warm_up(self, timeout: float = None):
+        """
+        Run one forward pass so the first request does not pay for lazy initialization
+        
+        The score cache is bypassed. Errors are raised rather than hidden
+        behind the neutral fallback scores rerank and get_scores return.
+        
+        Args:
+            timeout: Seconds to wait for a worker process to load the model
+        """
+        if not self.enabled:
+            raise RuntimeError(f"Reranker model {self.model_name} failed to load")
+        if isinstance(self.backend, RerankWorkerPool) and not self.backend.wait_ready(timeout):
+            raise RuntimeError("No rerank worker became ready")
+        pair = PARITY_PAIRS[0]
+        self._score_encoded(self._encode(pair[0], [Document(page_content=pair[1])]))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Reranker cache and batching statistics
+        
+        Returns:
+            Dictionary with backend name and score cache, token cache, batcher and worker pool stats
+        """
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.enabled else None,
+            "score_cache": self.score_cache.stats() if self.score_cache is not None else None,
+            "token_cache": self.token_cache.stats() if self.token_cache is not None else None,
+            "batcher": self.batcher.stats() if self.batcher is not None else None,
+            "workers": self.backend.stats() if self.enabled and isinstance(self.backend, RerankWorkerPool) else None
+        }
 
 
 # Global instance
 _reranker = None
+_reranker_lock = threading.Lock()
 
 
 def get_reranker() -> DocumentReranker:
-    """Get or create global reranker instance"""
+    """Get or create global reranker instance (safe to call from worker threads)"""
     global _reranker
     if _reranker is None:
-        _reranker = DocumentReranker()
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = DocumentReranker()
     return _reranker
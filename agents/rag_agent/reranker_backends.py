@@ -0,0 +1,166 @@
+"""
+Reranker Backends Module
+Cross-encoder forward passes in eager PyTorch or ONNX Runtime (optionally int8-quantized)
+"""
+import logging
+from pathlib import Path
+from typing import List, Dict
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class TorchCrossEncoder:
+    """
+    Eager PyTorch forward pass
+    """
+    
+    name = "torch"
+    
+    def __init__(self, model, device: torch.device):
+        """
+        Initialize backend
+        
+        Args:
+            model: HuggingFace sequence classification model (in eval mode)
+            device: Device the model lives on
+        """
+        self.model = model
+        self.device = device
+    
+    def forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Score a padded batch
+        
+        Args:
+            features: Padded int arrays keyed by model input name
+            
+        Returns:
+            Float32 array of relevance logits, one per pair
+        """
+        with torch.no_grad():
+            inputs = {name: torch.from_numpy(array).to(self.device) for name, array in features.items()}
+            logits = self.model(**inputs).logits
+        return logits.squeeze(-1).float().cpu().numpy()
+
+
+class OnnxCrossEncoder:
+    """
+    ONNX Runtime forward pass on CPU
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_path: Path, intra_op_threads: int = 0):
+        """
+        Open an exported cross-encoder
+        
+        Args:
+            model_path: Path to the .onnx file
+            intra_op_threads: Threads per operator (0 = ONNX Runtime default)
+        """
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        
+        self.model_path = Path(model_path)
+        self.session = ort.InferenceSession(
+            str(self.model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names: List[str] = [model_input.name for model_input in self.session.get_inputs()]
+        logger.info(f"ONNX cross-encoder loaded from {self.model_path} (inputs: {self.input_names})")
+    
+    def forward(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Score a padded batch
+        
+        Args:
+            features: Padded int arrays keyed by model input name
+            
+        Returns:
+            Float32 array of relevance logits, one per pair
+        """
+        feeds = {name: features[name].astype(np.int64, copy=False) for name in self.input_names}
+        logits = self.session.run(None, feeds)[0].astype(np.float32)
+        return logits[:, 0] if logits.ndim == 2 and logits.shape[1] == 1 else logits
+
+
+class _LogitsModule(torch.nn.Module):
+    """Positional-input wrapper returning only the logits, for tracing"""
+    
+    def __init__(self, model, input_names: List[str]):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+    
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs))).logits
+
+
+def export_onnx(model, tokenizer, model_name: str, output_dir: str, quantize: bool = True) -> Path:
+    """
+    Export a cross-encoder to ONNX once, optionally with dynamic int8 quantization
+    
+    Exports are cached per model under output_dir and reused on later starts.
+    
+    Args:
+        model: HuggingFace sequence classification model
+        tokenizer: Matching tokenizer
+        model_name: HuggingFace model name (used for the cache directory)
+        output_dir: Root directory for exported models
+        quantize: Quantize weights to int8 (MatMul/Gemm, dynamic activations)
+        
+    Returns:
+        Path to the .onnx file to load
+    """
+    model_dir = Path(output_dir) / model_name.replace("/", "__")
+    fp32_path = model_dir / "model.onnx"
+    int8_path = model_dir / "model.int8.onnx"
+    target = int8_path if quantize else fp32_path
+    if target.exists():
+        return target
+    model_dir.mkdir(parents=True, exist_ok=True)
+    
+    if not fp32_path.exists():
+        sample = tokenizer(
+            [["what causes hypertension", "High blood pressure is often linked to diet."]],
+            return_tensors="pt"
+        )
+        input_names = [name for name in MODEL_INPUTS if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        
+        tmp_path = model_dir / "model.onnx.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                _LogitsModule(model, input_names),
+                tuple(sample[name] for name in input_names),
+                str(tmp_path),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True
+            )
+        tmp_path.replace(fp32_path)
+        logger.info(f"Exported {model_name} to {fp32_path}")
+    
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        tmp_path = model_dir / "model.int8.onnx.tmp"
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+        tmp_path.replace(int8_path)
+        logger.info(f"Quantized {model_name} to int8 at {int8_path}")
+    
+    return target
@@ -0,0 +1,105 @@
+"""
+Retrieval Cache Module
+Caches retrieval results keyed on the query text and on a locality-sensitive
+hash of the query embedding
+"""
+import json
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Hashable
+import numpy as np
+from config import settings
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalCache:
+    """
+    Bounded LRU of (chunk_id, score) lists for repeated and near-identical queries
+    
+    Two kinds of keys share the LRU: the normalized query text, looked up
+    before query expansion and embedding, and a SimHash (signs of random
+    projections) of the query embedding, so queries whose embeddings are
+    almost the same share a key. The collection version is part of both
+    keys, and the cache is cleared as soon as a new version is seen, so
+    ingests and deletes invalidate it.
+    """
+    
+    def __init__(self, max_size: int = None, hash_bits: int = None, seed: int = 0):
+        """
+        Initialize retrieval cache
+        
+        Args:
+            max_size: Maximum number of cached retrievals
+            hash_bits: Number of SimHash bits (more bits = stricter matching)
+            seed: Seed for the random hyperplanes
+        """
+        self.cache = LRUCache(max_size or settings.retrieval_cache_size)
+        self.hash_bits = hash_bits or settings.retrieval_cache_hash_bits
+        self.seed = seed
+        self._hyperplanes: Optional[np.ndarray] = None
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def _simhash(self, embedding: List[float]) -> bytes:
+        """Sign bits of the embedding projected on random hyperplanes"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self._hyperplanes is None or self._hyperplanes.shape[0] != len(vector):
+            rng = np.random.default_rng(self.seed)
+            self._hyperplanes = rng.standard_normal((len(vector), self.hash_bits)).astype(np.float32)
+        return np.packbits(vector @ self._hyperplanes > 0).tobytes()
+    
+    def _check_version(self, version: Hashable):
+        """Clear the cache when the collection version changes (caller holds the lock)"""
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"Collection version changed ({self._version} -> {version}), clearing retrieval cache")
+            self.cache.clear()
+            self._version = version
+    
+    def text_key(self, query: str, version: Hashable, **params) -> Hashable:
+        """
+        Build the cache key for a retrieval from the raw query text
+        
+        Args:
+            query: User query (case and whitespace are normalized)
+            version: Collection version
+            **params: Retrieval parameters that change the result (top_k, filter, ...)
+            
+        Returns:
+            Hashable cache key
+        """
+        with self._lock:
+            self._check_version(version)
+        normalized = " ".join(query.casefold().split())
+        return ("text", normalized, version, json.dumps(params, sort_keys=True, default=str))
+    
+    def key(self, embedding: List[float], version: Hashable, **params) -> Hashable:
+        """
+        Build the cache key for a retrieval
+        
+        Args:
+            embedding: Query embedding
+            version: Collection version
+            **params: Retrieval parameters that change the result (top_k, filter, ...)
+            
+        Returns:
+            Hashable cache key
+        """
+        with self._lock:
+            self._check_version(version)
+            simhash = self._simhash(embedding)
+        return (simhash, version, json.dumps(params, sort_keys=True, default=str))
+    
+    def get(self, key: Hashable) -> Optional[List[Tuple[str, float]]]:
+        """Cached (chunk_id, score) list for a key, or None"""
+        return self.cache.get(key)
+    
+    def put(self, key: Hashable, results: List[Tuple[str, float]]):
+        """Cache the (chunk_id, score) list of a retrieval"""
+        self.cache.put(key, results)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics"""
+        return self.cache.stats()
@@ -0,0 +1,172 @@
+"""
+Shard Router Module
+Routes queries to specialty-sharded collections using embedding centroids
+"""
+import json
+import logging
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def shard_slug(value: Any) -> str:
+    """
+    Normalize a metadata value into a shard key
+    
+    Args:
+        value: Metadata value (e.g. "Infectious Disease")
+        
+    Returns:
+        Lowercase key safe for collection names (e.g. "infectious_disease")
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", str(value).strip().lower()).strip("_")
+    return slug or settings.chroma_default_shard
+
+
+class ShardRouter:
+    """
+    Picks the shards most likely to answer a query
+    
+    Each shard keeps a running sum of its embeddings; the query is routed
+    to the shards whose mean embedding is closest (cosine), with a boost
+    for shards whose name appears in the query text.
+    """
+    
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize router, loading centroids from disk when present
+        
+        Args:
+            path: Optional JSON file the centroids are persisted to
+        """
+        self.path = Path(path) if path else None
+        self.sums: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        
+        if self.path and self.path.exists():
+            self.load()
+    
+    def __len__(self) -> int:
+        return len(self.counts)
+    
+    def update(self, shard: str, vectors: List[List[float]]):
+        """
+        Add embeddings to a shard centroid
+        
+        Args:
+            shard: Shard key
+            vectors: Embeddings routed to the shard
+        """
+        if not vectors:
+            return
+        batch_sum = np.asarray(vectors, dtype=np.float64).sum(axis=0)
+        if shard in self.sums:
+            self.sums[shard] += batch_sum
+        else:
+            self.sums[shard] = batch_sum
+        self.counts[shard] = self.counts.get(shard, 0) + len(vectors)
+    
+    def remove(self, shard: str, vectors: List[List[float]]):
+        """
+        Subtract deleted embeddings from a shard centroid
+        
+        A shard whose last chunk is removed is forgotten, so it no longer
+        competes for queries.
+        
+        Args:
+            shard: Shard key
+            vectors: Embeddings deleted from the shard
+        """
+        if not vectors or shard not in self.counts:
+            return
+        count = self.counts[shard] - len(vectors)
+        if count <= 0:
+            del self.counts[shard]
+            del self.sums[shard]
+            return
+        self.sums[shard] -= np.asarray(vectors, dtype=np.float64).sum(axis=0)
+        self.counts[shard] = count
+    
+    def route(
+        self,
+        query_embedding: List[float],
+        query_text: str = "",
+        shards: Optional[List[str]] = None,
+        top_n: int = None
+    ) -> List[str]:
+        """
+        Rank shards for a query
+        
+        The best shard is always returned; further shards (up to top_n)
+        are added while their score is within the routing margin.
+        
+        Args:
+            query_embedding: Query embedding
+            query_text: Raw query, used for keyword matches on shard names
+            shards: Candidate shard keys (default: all known shards)
+            top_n: Maximum number of shards to search
+            
+        Returns:
+            Ordered list of shard keys
+        """
+        top_n = top_n or settings.shard_router_top_n
+        shards = list(shards if shards is not None else self.counts)
+        if len(shards) <= 1:
+            return shards
+        
+        query = np.asarray(query_embedding, dtype=np.float64)
+        query_norm = np.linalg.norm(query) or 1.0
+        text = query_text.lower()
+        
+        scores = {}
+        for shard in shards:
+            if self.counts.get(shard):
+                centroid = self.sums[shard] / self.counts[shard]
+                scores[shard] = float(centroid @ query / ((np.linalg.norm(centroid) or 1.0) * query_norm))
+            else:
+                scores[shard] = -1.0
+            if shard.replace("_", " ") in text:
+                scores[shard] += settings.shard_router_keyword_boost
+        
+        ranked = sorted(shards, key=scores.get, reverse=True)
+        best = scores[ranked[0]]
+        selected = [ranked[0]] + [
+            shard for shard in ranked[1:top_n]
+            if best - scores[shard] <= settings.shard_router_margin
+        ]
+        logger.info(f"Routed query to shards {selected}")
+        return selected
+    
+    def clear(self):
+        """Forget all centroids and delete the persisted file"""
+        self.sums = {}
+        self.counts = {}
+        if self.path and self.path.exists():
+            self.path.unlink()
+    
+    def save(self):
+        """Persist centroids to disk"""
+        if not self.path:
+            return
+        with open(self.path, "w") as f:
+            json.dump({
+                shard: {"count": self.counts[shard], "sum": self.sums[shard].tolist()}
+                for shard in self.counts
+            }, f)
+    
+    def load(self):
+        """Load centroids from disk"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.counts = {shard: entry["count"] for shard, entry in state.items()}
+            self.sums = {shard: np.asarray(entry["sum"], dtype=np.float64) for shard, entry in state.items()}
+            logger.info(f"Loaded shard router with {len(self.counts)} shards from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading shard router, starting empty: {e}")
+            self.sums = {}
+            self.counts = {}
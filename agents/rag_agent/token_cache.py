@@ -0,0 +1,127 @@
+"""
+Token Cache Module
+Array-backed cache of chunk token IDs for the cross-encoder
+"""
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkTokenCache:
+    """
+    Token IDs of chunk texts, tokenized once and kept in one flat array
+    
+    Chunk text never changes for a given chunk ID, so passages are
+    tokenized the first time they are seen and later requests only
+    tokenize the query. IDs live back to back in a single uint16/int32
+    array with an (offset, length) entry per chunk; when it fills up the
+    oldest entries are dropped and the array is compacted.
+    """
+    
+    def __init__(self, max_tokens: int, vocab_size: int):
+        """
+        Initialize cache
+        
+        Args:
+            max_tokens: Capacity of the token array
+            vocab_size: Tokenizer vocabulary size (picks the narrowest dtype)
+        """
+        self.dtype = np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.int32
+        self.max_tokens = max(1, max_tokens)
+        self._tokens = np.empty(min(self.max_tokens, 1 << 16), dtype=self.dtype)
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[List[int]]:
+        """
+        Token IDs of a chunk
+        
+        Args:
+            key: Chunk ID (or content hash)
+            
+        Returns:
+            List of token IDs, or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            offset, length = entry
+            return self._tokens[offset:offset + length].tolist()
+    
+    def put(self, key: str, token_ids: List[int]):
+        """
+        Cache the token IDs of a chunk
+        
+        Args:
+            key: Chunk ID (or content hash)
+            token_ids: Token IDs without special tokens
+        """
+        length = len(token_ids)
+        if length > self.max_tokens:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            if self._used + length > self.max_tokens:
+                self._evict(self.max_tokens // 2 - length)
+            if self._used + length > len(self._tokens):
+                grown = np.empty(min(self.max_tokens, max(2 * len(self._tokens), self._used + length)), dtype=self.dtype)
+                grown[:self._used] = self._tokens[:self._used]
+                self._tokens = grown
+            self._tokens[self._used:self._used + length] = token_ids
+            self._entries[key] = (self._used, length)
+            self._used += length
+    
+    def _evict(self, keep_tokens: int):
+        """Drop the oldest entries until at most keep_tokens remain, compacting the array"""
+        entries = list(self._entries.items())
+        kept, total = [], 0
+        for key, (offset, length) in reversed(entries):
+            if total + length > keep_tokens:
+                break
+            kept.append((key, offset, length))
+            total += length
+        kept.reverse()
+        
+        compacted = np.empty_like(self._tokens)
+        position = 0
+        self._entries = {}
+        for key, offset, length in kept:
+            compacted[position:position + length] = self._tokens[offset:offset + length]
+            self._entries[key] = (position, length)
+            position += length
+        self.evicted += len(entries) - len(kept)
+        self._tokens = compacted
+        self._used = position
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics
+        
+        Returns:
+            Dictionary with entries, tokens, bytes, hits, misses and hit_ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "tokens": self._used,
+                "bytes": int(self._tokens.nbytes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
@@ -2,37 +2,194 @@
 ChromaDB Vector Store Module
 Handles document embedding, storage, and retrieval using ChromaDB
 """
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import numpy as np
 from langchain_core.documents import Document
 from config import settings
+from utils.rw_lock import ReadWriteLock
+from agents.rag_agent.embedding_scheduler import EmbeddingScheduler
+from agents.rag_agent.bm25_index import BM25Index
+from agents.rag_agent.metadata_index import MetadataIndex
+from agents.rag_agent.ann_snapshot import (
+    AnnSnapshot, export_snapshot, record_deleted, record_added, MANIFEST_FILE, TOMBSTONES_FILE, ADDED_FILE
+)
+from agents.rag_agent.shard_router import ShardRouter, shard_slug
+from agents.rag_agent.collection_dump import export_dump, read_manifest, iter_dump
+from agents.rag_agent.near_duplicates import get_near_duplicate_index
+from agents.rag_agent.projection import EmbeddingProjection
 
 logger = logging.getLogger(__name__)
 
 
+def content_hash(text: str) -> str:
+    """Short stable hash of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def make_chunk_id(source: str, chunk_index: int, text_hash: str) -> str:
+    """
+    Deterministic chunk ID
+    
+    Re-ingesting the same source produces the same IDs for unchanged chunks,
+    while an edited chunk gets a new ID through its content hash.
+    
+    Args:
+        source: Source document name
+        chunk_index: Position of the chunk within the source
+        text_hash: Content hash of the chunk text
+        
+    Returns:
+        Chunk ID
+    """
+    source_hash = hashlib.sha256(str(source).encode("utf-8")).hexdigest()[:16]
+    return f"{source_hash}-{chunk_index:05d}-{text_hash}"
+
+
+def maximal_marginal_relevance(
+    query_embedding: List[float],
+    embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Greedy Maximal Marginal Relevance selection
+    
+    Cosine similarities to the query and between all candidates are computed
+    once as matrix products; each step only updates the running "most
+    similar already selected" vector.
+    
+    Args:
+        query_embedding: Query embedding
+        embeddings: Candidate embeddings, one row per candidate
+        k: Number of candidates to select
+        lambda_mult: Diversity parameter (0=max diversity, 1=max relevance)
+        
+    Returns:
+        Indices of selected candidates in selection order
+    """
+    n = len(embeddings)
+    if n == 0 or k <= 0:
+        return []
+    
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    
+    while len(selected) < min(k, n):
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    
+    return selected
+
+
+def rehome_duplicates(collections: List[Any], ids: List[str], near_duplicate_index, page_size: int) -> int:
+    """
+    Re-point "duplicate_of" links at chunks that are about to be deleted
+    
+    For every deleted canonical chunk with linked duplicates left in other
+    sources (DEDUP_MODE=link), the duplicate with the smallest ID becomes the
+    new canonical chunk: its link is cleared, its signature is indexed, and
+    the remaining duplicates link to it. Chunks skipped at ingest
+    (DEDUP_MODE=skip) were never stored, so there is nothing to re-home;
+    re-ingesting their source stores them once the canonical chunk is gone.
+    
+    Args:
+        collections: Chroma collections holding chunks
+        ids: Chunk IDs being deleted
+        near_duplicate_index: NearDuplicateIndex to register new canonical chunks in
+        page_size: Largest number of IDs per Chroma query
+        
+    Returns:
+        Number of deleted chunks whose duplicates were re-homed
+    """
+    deleted = set(ids)
+    groups: Dict[str, List[Tuple[Any, str, str, Dict[str, Any]]]] = {}
+    for collection in collections:
+        for start in range(0, len(ids), page_size):
+            results = collection.get(
+                where={"duplicate_of": {"$in": ids[start:start + page_size]}},
+                include=["documents", "metadatas"]
+            )
+            for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+                if chunk_id not in deleted:
+                    groups.setdefault(metadata["duplicate_of"], []).append((collection, chunk_id, text, metadata))
+    
+    for canonical, members in groups.items():
+        members.sort(key=lambda member: member[1])
+        _, head_id, head_text, head_metadata = members[0]
+        for collection, chunk_id, _, metadata in members:
+            # An empty link marks a canonical chunk (DocumentProcessor only checks truthiness)
+            link = "" if chunk_id == head_id else head_id
+            collection.update(ids=[chunk_id], metadatas=[dict(metadata, duplicate_of=link)])
+        near_duplicate_index.add(head_id, near_duplicate_index.signature(head_text), head_metadata.get("source"))
+        logger.info(f"Re-homed {len(members)} duplicates of deleted chunk {canonical} to {head_id}")
+    return len(groups)
+
+
 class ChromaVectorStore:
     """
     Manages ChromaDB vector store for medical document retrieval
+    
+    Thread safety: writers (ingest, import, delete) are serialized by a
+    writer mutex and do their slow work (embedding, Chroma upserts) outside
+    the read/write lock, taking it exclusively only to update the in-memory
+    side indexes. Queries hold the read lock only while they consult those
+    indexes, so they keep running during an ingest.
     """
     
     def __init__(self):
         """Initialize ChromaDB vector store with embeddings"""
         try:
+            # Imported here rather than at module level: they pull in chromadb and the
+            # OpenAI client, which importing the app (or this module) must not pay for
+            from langchain_openai import AzureOpenAIEmbeddings
+            from langchain_community.vectorstores import Chroma
+            
+            # Read/write discipline for the in-memory indexes, one writer at a time
+            self.lock = ReadWriteLock()
+            self._writer_mutex = threading.RLock()
+            
+            # Bounded pool backing the async facade (keeps Chroma off the event loop)
+            self.executor = ThreadPoolExecutor(
+                max_workers=settings.vector_store_max_workers,
+                thread_name_prefix="vector-store"
+            )
+            
             # Initialize Azure OpenAI Embeddings
             self.embeddings = AzureOpenAIEmbeddings(
                 azure_endpoint=settings.embedding_azure_endpoint,
                 openai_api_key=settings.embedding_api_key,
                 openai_api_version=settings.embedding_api_version,
                 model=settings.embedding_model_name,
-                chunk_size=16
+                chunk_size=settings.embedding_batch_size
             )
             
+            # Ingestion-side batching, concurrency and retries
+            self.embedding_scheduler = EmbeddingScheduler(self.embeddings)
+            
             # Initialize ChromaDB client
             self.persist_directory = str(settings.get_chroma_path())
             self.collection_name = settings.chroma_collection_name
@@ -42,7 +199,57 @@ class ChromaVectorStore:
                 collection_name=self.collection_name,
                 embedding_function=self.embeddings,
                 persist_directory=self.persist_directory,
+                collection_metadata=settings.hnsw_metadata(self.collection_name)
             )
+            self._check_hnsw_params(self.vectorstore._collection)
+            
+            # Bumped on every write so caches keyed on it invalidate themselves
+            self.version = 0
+            
+            # Specialty shards (the main collection doubles as the default shard)
+            self.shards: Dict[str, Any] = {}
+            self.shard_router = ShardRouter(
+                Path(self.persist_directory) / f"{self.collection_name}.shards.json"
+            )
+            self.shard_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.shard_router_top_n),
+                thread_name_prefix="shard-search"
+            )
+            if settings.chroma_sharding_enabled:
+                self._discover_shards()
+            
+            # Sparse lexical and metadata indexes kept in step with the collection
+            self.bm25_index = BM25Index(
+                Path(self.persist_directory) / f"{self.collection_name}.bm25.pkl"
+            )
+            self.metadata_index = MetadataIndex(
+                Path(self.persist_directory) / f"{self.collection_name}.metadata.pkl"
+            )
+            self.near_duplicate_index = get_near_duplicate_index()
+            if self.get_collection_count() > 0 and (
+                len(self.bm25_index) == 0
+                or len(self.metadata_index) == 0
+                or (settings.dedup_enabled and len(self.near_duplicate_index) == 0)
+                or (settings.chroma_sharding_enabled and len(self.shard_router) == 0)
+            ):
+                self.rebuild_indexes()
+            
+            # Optional reduced-dimension first stage, mirrored into its own collection
+            self.projection_path = Path(self.persist_directory) / f"{self.collection_name}.projection.npz"
+            # The reduced collection is maintained whenever a projection is fitted,
+            # and only searched when REDUCED_SEARCH_ENABLED is set and it is in sync
+            self.projection: Optional[EmbeddingProjection] = None
+            self.reduced_collection = None
+            self.reduced_in_sync = False
+            self._load_projection()
+            
+            # Optional read-only ANN snapshot for serving; chunks deleted after
+            # the export are recorded in its tombstone file and filtered out
+            self.ann_snapshot: Optional[AnnSnapshot] = None
+            self._snapshot_checked_at = 0.0
+            self._snapshot_reload_lock = threading.Lock()
+            if settings.ann_snapshot_enabled:
+                self.load_ann_snapshot()
             
             logger.info(f"ChromaDB initialized at {self.persist_directory}")
             
@@ -54,20 +261,328 @@ class ChromaVectorStore:
         """
         Add documents to the vector store
         
+        Chunks get deterministic IDs (source + chunk index + content hash) and
+        are upserted; chunks already stored under the same ID are unchanged
+        and skipped without an embedding call.
+        
+        Embeddings are computed by the EmbeddingScheduler (token-aware batches,
+        several requests in flight) and written to Chroma in bulk upserts.
+        With sharding enabled each chunk goes to the shard of its category.
+        
+        If the write fails, near-duplicate signatures registered for these
+        chunks by DocumentProcessor and not yet committed are dropped, so
+        later chunks are not skipped as duplicates of unstored content.
+        
         Args:
             documents: List of LangChain Document objects
             
         Returns:
-            List of document IDs
+            List of document IDs (including skipped, unchanged chunks)
         """
         try:
-            ids = self.vectorstore.add_documents(documents)
-            logger.info(f"Added {len(ids)} documents to ChromaDB")
-            return ids
+            if not documents:
+                return []
+            with self._writer_mutex:
+                return self._add_documents(documents)
         except Exception as e:
             logger.error(f"Error adding documents to ChromaDB: {e}")
+            if settings.dedup_enabled:
+                self.near_duplicate_index.discard_pending([self.chunk_id_for(doc) for doc in documents])
+            raise
+    
+    def _add_documents(self, documents: List[Document]) -> List[str]:
+        """Embed and store new chunks (caller holds the writer mutex)"""
+        all_ids = [self.chunk_id_for(doc) for doc in documents]
+        existing = set(self._get_by_ids(list(dict.fromkeys(all_ids)), include=[])["ids"])
+        
+        # Drop unchanged chunks and duplicates within the batch
+        seen = set(existing)
+        new_documents, ids = [], []
+        for doc, chunk_id in zip(documents, all_ids):
+            if chunk_id not in seen:
+                seen.add(chunk_id)
+                new_documents.append(doc)
+                ids.append(chunk_id)
+        if not new_documents:
+            logger.info(f"All {len(documents)} documents unchanged, nothing to add")
+            return all_ids
+        
+        texts = [doc.page_content for doc in new_documents]
+        metadatas = [dict(doc.metadata, chunk_id=chunk_id) for doc, chunk_id in zip(new_documents, ids)]
+        shard_keys = [self._shard_for_metadata(metadata) for metadata in metadatas]
+        
+        upsert_limit = self._upsert_limit()
+        pending: Dict[str, Dict[str, list]] = {}
+        
+        def flush(shard: str):
+            batch = pending.pop(shard, None)
+            if batch:
+                self._write_batch(shard, batch)
+        
+        def on_batch_done(indices: List[int], vectors: List[List[float]]):
+            for i, vector in zip(indices, vectors):
+                batch = pending.setdefault(
+                    shard_keys[i],
+                    {"ids": [], "embeddings": [], "metadatas": [], "documents": []}
+                )
+                batch["ids"].append(ids[i])
+                batch["embeddings"].append(vector)
+                batch["metadatas"].append(metadatas[i])
+                batch["documents"].append(texts[i])
+                if len(batch["ids"]) >= upsert_limit:
+                    flush(shard_keys[i])
+        
+        stats = self.embedding_scheduler.run(texts, on_batch_done)
+        for shard in list(pending):
+            flush(shard)
+        self._save_indexes()
+        
+        if stats["failed"]:
+            raise RuntimeError(
+                f"{stats['failed']} of {len(new_documents)} documents could not be embedded"
+            )
+        
+        logger.info(
+            f"Added {len(ids)} documents to ChromaDB, skipped {len(documents) - len(ids)} unchanged "
+            f"({stats['embeddings_per_second']:.1f} embeddings/s)"
+        )
+        return all_ids
+    
+    def _upsert_limit(self) -> int:
+        """Largest number of records sent to Chroma in one upsert"""
+        return min(
+            settings.chroma_upsert_batch_size,
+            getattr(self.vectorstore._client, "max_batch_size", settings.chroma_upsert_batch_size)
+        )
+    
+    def _write_batch(self, shard: str, batch: Dict[str, list]):
+        """Upsert embedded records into a shard, then publish them in the side indexes"""
+        self._get_collection(shard).upsert(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            metadatas=batch["metadatas"],
+            documents=batch["documents"]
+        )
+        if self.projection is not None:
+            self.reduced_collection.upsert(
+                ids=batch["ids"],
+                embeddings=self.projection.transform(batch["embeddings"]).tolist(),
+                metadatas=batch["metadatas"]
+            )
+        with self.lock.write():
+            self.bm25_index.add(batch["ids"], batch["documents"])
+            self.metadata_index.add(batch["ids"], batch["metadatas"])
+            if settings.chroma_sharding_enabled:
+                self.shard_router.update(shard, batch["embeddings"])
+            if settings.dedup_enabled:
+                self.near_duplicate_index.commit(batch["ids"], batch["documents"], batch["metadatas"])
+            if self.ann_snapshot is not None:
+                self.ann_snapshot.added.update(batch["ids"])
+            self.version += 1
+        # Recorded even when this process does not serve the snapshot (e.g. the ingest CLI)
+        record_added(settings.ann_snapshot_directory, batch["ids"])
+    
+    def _save_indexes(self):
+        """Persist the side indexes after a write"""
+        with self.lock.read():
+            self.bm25_index.save()
+            self.metadata_index.save()
+            if settings.dedup_enabled:
+                self.near_duplicate_index.save()
+            if settings.chroma_sharding_enabled:
+                self.shard_router.save()
+    
+    def export_dump(self, directory: str) -> Dict[str, Any]:
+        """
+        Export IDs, texts, metadata and embeddings for bulk loading elsewhere
+        
+        Holds the writer mutex so writes from this process cannot shift the
+        pages being read.
+        
+        Args:
+            directory: Dump directory
+            
+        Returns:
+            Dump manifest
+        """
+        try:
+            with self._writer_mutex:
+                return export_dump(self._collections(), directory)
+        except Exception as e:
+            logger.error(f"Error exporting collection dump: {e}")
             raise
     
+    def import_dump(self, directory: str, verify: bool = True) -> int:
+        """
+        Bulk-load a dump written by export_dump, without any embedding calls
+        
+        Args:
+            directory: Dump directory
+            verify: Verify file checksums before loading
+            
+        Returns:
+            Number of records imported
+        """
+        try:
+            start_time = time.time()
+            manifest = read_manifest(directory, verify=verify)
+            
+            imported = 0
+            with self._writer_mutex:
+                for page in iter_dump(directory, page_size=self._upsert_limit()):
+                    batches: Dict[str, Dict[str, list]] = {}
+                    for i, metadata in enumerate(page["metadatas"]):
+                        batch = batches.setdefault(
+                            self._shard_for_metadata(metadata),
+                            {"ids": [], "embeddings": [], "metadatas": [], "documents": []}
+                        )
+                        for field in batch:
+                            batch[field].append(page[field][i])
+                    for shard, batch in batches.items():
+                        self._write_batch(shard, batch)
+                    imported += len(page["ids"])
+                self._save_indexes()
+            
+            logger.info(
+                f"Imported {imported} of {manifest['count']} records from {directory} "
+                f"in {time.time() - start_time:.1f}s"
+            )
+            return imported
+        except Exception as e:
+            logger.error(f"Error importing collection dump: {e}")
+            raise
+    
+    @staticmethod
+    def chunk_id_for(doc: Document) -> str:
+        """
+        Deterministic ID of a chunk
+        
+        Uses metadata["chunk_id"] when the DocumentProcessor already set it.
+        
+        Args:
+            doc: Chunk document
+            
+        Returns:
+            Chunk ID
+        """
+        if doc.metadata.get("chunk_id"):
+            return doc.metadata["chunk_id"]
+        return make_chunk_id(
+            doc.metadata.get("source", "unknown"),
+            int(doc.metadata.get("chunk_index", 0)),
+            doc.metadata.get("content_hash") or content_hash(doc.page_content)
+        )
+    
+    def replace_source(self, source: str, documents: List[Document]) -> Dict[str, Any]:
+        """
+        Make the stored chunks of a source match a fresh set of chunks
+        
+        Unchanged chunks are kept, new or edited chunks are embedded and
+        chunks that no longer exist are deleted, so the cost is proportional
+        to the number of changed chunks.
+        
+        Args:
+            source: Source document name
+            documents: Current chunks of the source
+            
+        Returns:
+            Dictionary with ids, added, unchanged and deleted counts
+        """
+        with self._writer_mutex:
+            current = set(self._source_chunk_ids(source))
+            ids = self.add_documents(documents)
+            stale = list(current - set(ids))
+            if stale:
+                self.delete_ids(stale)
+        
+        added = len(set(ids) - current)
+        logger.info(
+            f"Synced source {source}: {added} added, {len(ids) - added} unchanged, {len(stale)} deleted"
+        )
+        return {"ids": ids, "added": added, "unchanged": len(ids) - added, "deleted": len(stale)}
+    
+    def delete_source(self, source: str) -> int:
+        """
+        Delete all chunks of one source document
+        
+        With DEDUP_MODE=skip, near-duplicates of this source's chunks in
+        other sources were never stored: that content is gone until those
+        sources are re-ingested. With DEDUP_MODE=link the linked copies are
+        kept and re-homed.
+        
+        Args:
+            source: Source document name (metadata["source"])
+            
+        Returns:
+            Number of chunks deleted
+        """
+        try:
+            with self._writer_mutex:
+                ids = self._source_chunk_ids(source)
+                if ids:
+                    self.delete_ids(ids)
+            logger.info(f"Deleted {len(ids)} chunks of source {source}")
+            return len(ids)
+        except Exception as e:
+            logger.error(f"Error deleting source {source}: {e}")
+            raise
+    
+    def delete_ids(self, ids: List[str]):
+        """
+        Delete chunks by ID from Chroma and the sparse and metadata indexes
+        
+        Duplicates linked to a deleted chunk from other sources are re-homed
+        first (see rehome_duplicates), so deleting the source that holds a
+        canonical chunk leaves no dangling "duplicate_of" links.
+        
+        Args:
+            ids: Chunk IDs
+        """
+        with self._writer_mutex:
+            rehome_duplicates(self._collections(), ids, self.near_duplicate_index, self._upsert_limit())
+            removed = self._shard_embeddings(ids) if settings.chroma_sharding_enabled else {}
+            limit = self._upsert_limit()
+            collections = self._collections()
+            if self.reduced_collection is not None:
+                collections.append(self.reduced_collection)
+            for collection in collections:
+                for start in range(0, len(ids), limit):
+                    collection.delete(ids=ids[start:start + limit])
+            with self.lock.write():
+                self.bm25_index.remove(ids)
+                self.metadata_index.remove(ids)
+                self.near_duplicate_index.remove(ids)
+                for shard, vectors in removed.items():
+                    self.shard_router.remove(shard, vectors)
+                if self.ann_snapshot is not None:
+                    self.ann_snapshot.deleted.update(ids)
+                self.version += 1
+            # Recorded even when this process does not serve the snapshot (e.g. the ingest CLI)
+            record_deleted(settings.ann_snapshot_directory, ids)
+            self._save_indexes()
+    
+    def _shard_embeddings(self, ids: List[str]) -> Dict[str, List[List[float]]]:
+        """Stored embeddings of the given chunks, keyed by the shard holding them"""
+        limit = self._upsert_limit()
+        removed = {}
+        for shard, collection in self._shard_collections().items():
+            vectors = []
+            for start in range(0, len(ids), limit):
+                vectors.extend(collection.get(ids=ids[start:start + limit], include=["embeddings"])["embeddings"])
+            if vectors:
+                removed[shard] = vectors
+        return removed
+    
+    def _source_chunk_ids(self, source: str) -> List[str]:
+        """IDs of all stored chunks of a source"""
+        if "source" in self.metadata_index.bitmaps:
+            with self.lock.read():
+                return self.metadata_index.ids(self.metadata_index.resolve({"source": source}))
+        ids = []
+        for collection in self._collections():
+            ids.extend(collection.get(where={"source": source}, include=[])["ids"])
+        return ids
+    
     def similarity_search(
         self, 
         query: str, 
@@ -86,14 +601,8 @@ class ChromaVectorStore:
             List of relevant documents
         """
         try:
-            k = k or settings.top_k_retrieval
-            results = self.vectorstore.similarity_search(
-                query=query,
-                k=k,
-                filter=filter
-            )
-            logger.info(f"Retrieved {len(results)} documents for query")
-            return results
+            results = self.similarity_search_with_score(query=query, k=k, filter=filter)
+            return [doc for doc, _ in results]
         except Exception as e:
             logger.error(f"Error during similarity search: {e}")
             raise
@@ -107,27 +616,346 @@ class ChromaVectorStore:
         """
         Perform similarity search with relevance scores
         
+        Queries the collection directly (rather than through the LangChain
+        wrapper) so every returned Document carries its chunk ID in
+        metadata["chunk_id"].
+        
         Args:
             query: Search query
             k: Number of results to return
             filter: Optional metadata filter
             
         Returns:
-            List of tuples (document, score)
+            List of tuples (document, distance)
         """
         try:
-            k = k or settings.top_k_retrieval
-            results = self.vectorstore.similarity_search_with_score(
-                query=query,
+            return self.similarity_search_by_vector_with_score(
+                embedding=self.embed_query(query),
                 k=k,
-                filter=filter
+                filter=filter,
+                query_text=query
             )
-            logger.info(f"Retrieved {len(results)} documents with scores")
-            return results
         except Exception as e:
             logger.error(f"Error during similarity search with score: {e}")
             raise
     
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None,
+        query_text: str = ""
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform similarity search for a precomputed query embedding
+        
+        Unfiltered searches are served from the memory-mapped ANN snapshot
+        when one is loaded; everything else goes to ChromaDB, through the
+        reduced-dimension collection when a projection is fitted, otherwise
+        searching the routed shards in parallel when sharding is enabled.
+        
+        Snapshot results skip chunks deleted since the export, over-fetching
+        at most ANN_SNAPSHOT_TOMBSTONE_OVERFETCH * k rows to replace them, and
+        chunks written since the export are scanned exactly in the live store
+        and merged in. Once deleted plus added chunks exceed
+        ANN_SNAPSHOT_MAX_STALE_FRACTION of the snapshot, more are added than
+        METADATA_FILTER_EXACT_MAX, or tombstones leave fewer than k results,
+        the query goes to ChromaDB instead.
+        
+        Args:
+            embedding: Query embedding
+            k: Number of results to return
+            filter: Optional metadata filter
+            query_text: Raw query text, used for keyword shard routing
+            
+        Returns:
+            List of tuples (document, distance)
+        """
+        k = k or settings.top_k_retrieval
+        
+        self._current_snapshot()
+        with self.lock.read():
+            snapshot = self.ann_snapshot if settings.ann_snapshot_enabled else None
+            snapshot_results = added_ids = None
+            if snapshot is not None and (not filter or snapshot.can_filter(filter)):
+                snapshot_results, added_ids = self._snapshot_search(snapshot, embedding, k, filter)
+            
+            scoped_ids = self._scoped_ids(filter) if snapshot_results is None else None
+            shards = self._route(embedding, filter, query_text) if scoped_ids is None and snapshot_results is None else []
+            if settings.reduced_search_enabled and self.reduced_in_sync:
+                projection, reduced_collection = self.projection, self.reduced_collection
+            else:
+                projection, reduced_collection = None, None
+        
+        if snapshot_results is not None:
+            if added_ids:
+                snapshot_results = sorted(
+                    snapshot_results + self._exact_search(embedding, added_ids, k),
+                    key=lambda pair: pair[1]
+                )[:k]
+            logger.info(
+                f"Retrieved {len(snapshot_results)} documents from ANN snapshot "
+                f"({len(added_ids)} chunks added since the export scanned live)"
+            )
+            return snapshot_results
+        
+        # Small filtered scopes are scanned exactly instead of through the ANN index
+        if scoped_ids is not None:
+            if not scoped_ids:
+                logger.info("Metadata filter matches no documents")
+                return []
+            return self._exact_search(embedding, scoped_ids, k)
+        
+        if projection is not None and projection.input_dimension == len(embedding):
+            return self._reduced_search(projection, reduced_collection, embedding, k, filter)
+        
+        collections = [self._get_collection(shard) for shard in shards]
+        if len(collections) == 1:
+            docs_and_scores = self._query_collection(collections[0], embedding, k, filter)
+        else:
+            futures = [
+                self.shard_executor.submit(self._query_collection, collection, embedding, k, filter)
+                for collection in collections
+            ]
+            docs_and_scores = [pair for future in futures for pair in future.result()]
+            docs_and_scores.sort(key=lambda pair: pair[1])
+            docs_and_scores = docs_and_scores[:k]
+        
+        logger.info(f"Retrieved {len(docs_and_scores)} documents with scores")
+        return docs_and_scores
+    
+    def _snapshot_search(
+        self,
+        snapshot: AnnSnapshot,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[List[Tuple[Document, float]]], List[str]]:
+        """
+        Search the ANN snapshot, or decline when it is too far behind the live store
+        
+        Caller holds the read lock.
+        
+        Returns:
+            Tuple of (snapshot results without deleted chunks, or None to search
+            ChromaDB instead; IDs of chunks added since the export that match the
+            filter, to scan in the live store)
+        """
+        if snapshot.stale_fraction() > settings.ann_snapshot_max_stale_fraction:
+            logger.info(
+                f"ANN snapshot is {snapshot.stale_fraction():.1%} out of date, searching ChromaDB; re-export it"
+            )
+            return None, []
+        added_ids = list(snapshot.added)
+        if added_ids and filter:
+            bitmap = self.metadata_index.resolve(filter)
+            if bitmap is None:
+                return None, []
+            row_of = self.metadata_index.row_of
+            added_ids = [chunk_id for chunk_id in added_ids if chunk_id in row_of and bitmap >> row_of[chunk_id] & 1]
+        if len(added_ids) > settings.metadata_filter_exact_max:
+            return None, []
+        
+        # Re-written chunks are served from the live store, so their snapshot rows count as deleted
+        outdated = len(snapshot.deleted) + len(snapshot.added)
+        fetch = k + min(outdated, k * max(0, settings.ann_snapshot_tombstone_overfetch))
+        hits = snapshot.search(embedding, k=fetch, filter=filter)
+        docs_and_scores = [(snapshot.get_document(row), distance) for row, distance in hits]
+        if outdated:
+            docs_and_scores = [
+                pair for pair in docs_and_scores
+                if pair[0].metadata.get("chunk_id") not in snapshot.deleted
+                and pair[0].metadata.get("chunk_id") not in snapshot.added
+            ]
+            if len(docs_and_scores) < k and len(hits) == fetch:
+                # Tombstones ate more than the over-fetch; the snapshot may hold more matches
+                return None, []
+        return docs_and_scores[:k], added_ids
+    
+    def _scoped_ids(self, filter: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """
+        Chunk IDs matching a filter when the scope is small enough to scan exactly
+        
+        Caller holds the read lock. Returns None when the filter is absent,
+        not resolvable by the metadata index, or matches too many chunks.
+        """
+        if not filter:
+            return None
+        bitmap = self.metadata_index.resolve(filter)
+        if bitmap is None or MetadataIndex.count(bitmap) > settings.metadata_filter_exact_max:
+            return None
+        return self.metadata_index.ids(bitmap)
+    
+    def _query_collection(
+        self,
+        collection,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Run a nearest neighbour query against one Chroma collection"""
+        results = collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances"]
+        )
+        return self._results_to_docs_and_scores(results)
+    
+    def _reduced_search(
+        self,
+        projection: EmbeddingProjection,
+        reduced_collection,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Shortlist in the reduced space, then rescore the shortlist with full embeddings"""
+        results = reduced_collection.query(
+            query_embeddings=[projection.transform(embedding).tolist()],
+            n_results=k * max(1, settings.reduced_search_rescore_factor),
+            where=filter,
+            include=["distances"]
+        )
+        shortlist = results["ids"][0]
+        if not shortlist:
+            return []
+        return self._exact_search(embedding, shortlist, k)
+    
+    def _exact_search(
+        self,
+        embedding: List[float],
+        ids: List[str],
+        k: int
+    ) -> List[Tuple[Document, float]]:
+        """Brute-force search restricted to the given chunk IDs"""
+        candidates = self._get_by_ids(ids, include=["embeddings"])
+        if not candidates["ids"]:
+            return []
+        
+        matrix = np.asarray(candidates["embeddings"], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = ((matrix - query) ** 2).sum(axis=1)
+        
+        top = np.argsort(distances)[:k]
+        top_ids = [candidates["ids"][i] for i in top]
+        documents = self.get_documents_by_ids(top_ids)
+        docs_and_scores = [
+            (documents[chunk_id], float(distances[i]))
+            for chunk_id, i in zip(top_ids, top)
+            if chunk_id in documents
+        ]
+        logger.info(f"Exact search over {len(ids)} candidate documents retrieved {len(docs_and_scores)}")
+        return docs_and_scores
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a search query
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Query embedding
+        """
+        return self.embeddings.embed_query(query)
+    
+    def keyword_search(
+        self,
+        query: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform BM25 keyword search over the sparse index
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            filter: Optional metadata filter (indexed fields only)
+            
+        Returns:
+            List of tuples (document, bm25_score) sorted by score
+        """
+        try:
+            k = k or settings.top_k_retrieval
+            with self.lock.read():
+                allowed_ids = None
+                if filter:
+                    bitmap = self.metadata_index.resolve(filter)
+                    if bitmap is None:
+                        logger.info("Keyword search skipped: filter uses non-indexed metadata")
+                        return []
+                    allowed_ids = self.metadata_index.ids(bitmap)
+                
+                hits = self.bm25_index.search(query, k=k, allowed_ids=allowed_ids)
+            if not hits:
+                return []
+            
+            documents = self.get_documents_by_ids([chunk_id for chunk_id, _ in hits])
+            results = [
+                (documents[chunk_id], score)
+                for chunk_id, score in hits
+                if chunk_id in documents
+            ]
+            logger.info(f"Keyword search retrieved {len(results)} documents")
+            return results
+        except Exception as e:
+            logger.error(f"Error during keyword search: {e}")
+            raise
+    
+    def get_documents_by_ids(self, ids: List[str]) -> Dict[str, Document]:
+        """
+        Fetch stored chunks by ID
+        
+        Args:
+            ids: Chunk IDs
+            
+        Returns:
+            Dictionary mapping chunk ID to Document
+        """
+        if not ids:
+            return {}
+        results = self._get_by_ids(ids, include=["documents", "metadatas"])
+        documents = {}
+        for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+            doc_metadata = dict(metadata or {})
+            doc_metadata["chunk_id"] = chunk_id
+            documents[chunk_id] = Document(page_content=text, metadata=doc_metadata)
+        return documents
+    
+    def _get_by_ids(self, ids: List[str], include: List[str]) -> Dict[str, List]:
+        """
+        Fetch records by ID from every collection they may live in
+        
+        IDs are sent in pages of the upsert limit, keeping each query under
+        SQLite's bound-variable limit.
+        """
+        limit = self._upsert_limit()
+        merged = {"ids": []}
+        merged.update({field: [] for field in include})
+        for collection in self._collections():
+            for start in range(0, len(ids), limit):
+                results = collection.get(ids=ids[start:start + limit], include=include)
+                merged["ids"].extend(results["ids"])
+                for field in include:
+                    merged[field].extend(results[field])
+        return merged
+    
+    def _results_to_docs_and_scores(self, results: Dict[str, Any]) -> List[Tuple[Document, float]]:
+        """Convert a Chroma query result for a single query into (Document, distance) pairs"""
+        docs_and_scores = []
+        for chunk_id, text, metadata, distance in zip(
+            results["ids"][0],
+            results["documents"][0],
+            results["metadatas"][0],
+            results["distances"][0]
+        ):
+            doc_metadata = dict(metadata or {})
+            doc_metadata["chunk_id"] = chunk_id
+            docs_and_scores.append((Document(page_content=text, metadata=doc_metadata), distance))
+        return docs_and_scores
+    
     def max_marginal_relevance_search(
         self,
         query: str,
@@ -149,25 +977,128 @@ class ChromaVectorStore:
         Returns:
             List of diverse relevant documents
         """
-        try:
-            k = k or settings.top_k_retrieval
-            results = self.vectorstore.max_marginal_relevance_search(
+        return [
+            doc for doc, _ in self.max_marginal_relevance_search_with_score(
                 query=query,
                 k=k,
                 fetch_k=fetch_k,
                 lambda_mult=lambda_mult,
                 filter=filter
             )
-            logger.info(f"MMR search retrieved {len(results)} diverse documents")
+        ]
+    
+    def max_marginal_relevance_search_with_score(
+        self,
+        query: str,
+        k: int = None,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform MMR search, keeping each result's vector distance
+        
+        Candidate embeddings come back with the candidates in a single
+        query, and selection runs as batched NumPy matrix operations.
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            fetch_k: Number of documents to fetch before MMR
+            lambda_mult: Diversity parameter (0=max diversity, 1=max relevance)
+            filter: Optional metadata filter
+            embedding: Precomputed query embedding (embedded from query if omitted)
+            
+        Returns:
+            List of tuples (document, distance) in MMR selection order
+        """
+        try:
+            k = k or settings.top_k_retrieval
+            if embedding is None:
+                embedding = self.embed_query(query)
+            docs_and_scores, vectors = self._candidates_with_embeddings(
+                embedding, max(fetch_k, k), filter, query
+            )
+            if not docs_and_scores:
+                return []
+            
+            selected = maximal_marginal_relevance(embedding, vectors, k=k, lambda_mult=lambda_mult)
+            results = [docs_and_scores[i] for i in selected]
+            logger.info(f"MMR search selected {len(results)} of {len(docs_and_scores)} candidates")
             return results
         except Exception as e:
             logger.error(f"Error during MMR search: {e}")
             raise
     
+    def _candidates_with_embeddings(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        query_text: str = ""
+    ) -> Tuple[List[Tuple[Document, float]], np.ndarray]:
+        """Nearest neighbours together with their stored embeddings"""
+        include = ["documents", "metadatas", "distances", "embeddings"]
+        
+        with self.lock.read():
+            ids = self._scoped_ids(filter)
+            shards = self._route(embedding, filter, query_text) if ids is None else []
+        
+        if ids is not None:
+            if not ids:
+                return [], np.empty((0, len(embedding)), dtype=np.float32)
+            records = self._get_by_ids(ids, include=["documents", "metadatas", "embeddings"])
+            matrix = np.asarray(records["embeddings"], dtype=np.float32)
+            distances = ((matrix - np.asarray(embedding, dtype=np.float32)) ** 2).sum(axis=1)
+            top = np.argsort(distances)[:k]
+            results = {
+                "ids": [[records["ids"][i] for i in top]],
+                "documents": [[records["documents"][i] for i in top]],
+                "metadatas": [[records["metadatas"][i] for i in top]],
+                "distances": [[float(distances[i]) for i in top]]
+            }
+            return self._results_to_docs_and_scores(results), matrix[top]
+        
+        docs_and_scores, vectors = [], []
+        for shard in shards:
+            results = self._get_collection(shard).query(
+                query_embeddings=[embedding],
+                n_results=k,
+                where=filter,
+                include=include
+            )
+            docs_and_scores.extend(self._results_to_docs_and_scores(results))
+            vectors.extend(results["embeddings"][0])
+        
+        order = sorted(range(len(docs_and_scores)), key=lambda i: docs_and_scores[i][1])[:k]
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        return [docs_and_scores[i] for i in order], matrix[order]
+    
     def delete_collection(self):
-        """Delete the entire collection"""
+        """Delete the entire collection, including its ANN snapshot"""
         try:
-            self.vectorstore.delete_collection()
+            with self._writer_mutex, self.lock.write():
+                self.vectorstore.delete_collection()
+                for collection in self.shards.values():
+                    self.vectorstore._client.delete_collection(collection.name)
+                self.shards = {}
+                if self.reduced_collection is not None:
+                    self.vectorstore._client.delete_collection(self.reduced_collection.name)
+                    self.projection, self.reduced_collection = None, None
+                    self.reduced_in_sync = False
+                if self.projection_path.exists():
+                    self.projection_path.unlink()
+                self.shard_router.clear()
+                self.bm25_index.clear()
+                self.metadata_index.clear()
+                self.near_duplicate_index.clear()
+                snapshot, self.ann_snapshot = self.ann_snapshot, None
+                self.version += 1
+            # Other workers see the manifest disappear and unload on their next check
+            if snapshot is not None:
+                snapshot.close()
+            shutil.rmtree(settings.ann_snapshot_directory, ignore_errors=True)
             logger.info(f"Deleted collection: {self.collection_name}")
         except Exception as e:
             logger.error(f"Error deleting collection: {e}")
@@ -176,12 +1107,464 @@ class ChromaVectorStore:
     def get_collection_count(self) -> int:
         """Get number of documents in collection"""
         try:
-            count = self.vectorstore._collection.count()
+            count = sum(collection.count() for collection in self._collections())
             return count
         except Exception as e:
             logger.error(f"Error getting collection count: {e}")
             return 0
     
+    def persisted_version(self) -> Tuple:
+        """
+        Version of the stored data read from disk rather than process memory
+        
+        Collection counts plus the modification times of the Chroma database,
+        the side indexes and the ANN snapshot manifest and change files. Every
+        worker derives the same value, and a write made by any process
+        (including an update that keeps the counts) changes it.
+        
+        Returns:
+            Hashable version tuple
+        """
+        snapshot_dir = Path(settings.ann_snapshot_directory)
+        paths = [
+            Path(self.persist_directory) / "chroma.sqlite3",
+            self.bm25_index.path,
+            self.metadata_index.path,
+            self.shard_router.path,
+            snapshot_dir / MANIFEST_FILE,
+            snapshot_dir / TOMBSTONES_FILE,
+            snapshot_dir / ADDED_FILE
+        ]
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except (OSError, TypeError):
+                mtimes.append(0)
+        counts = [collection.count() for collection in self._collections()]
+        return tuple(counts) + tuple(mtimes)
+    
+    def export_ann_snapshot(self, directory: str = None) -> Dict[str, Any]:
+        """
+        Export the collection to a memory-mapped ANN snapshot
+        
+        Args:
+            directory: Snapshot directory (default from settings)
+            
+        Returns:
+            Snapshot manifest
+        """
+        try:
+            directory = directory or settings.ann_snapshot_directory
+            return export_snapshot(self._collections(), directory)
+        except Exception as e:
+            logger.error(f"Error exporting ANN snapshot: {e}")
+            raise
+    
+    def load_ann_snapshot(self, directory: str = None) -> bool:
+        """
+        Open (or reopen) the ANN snapshot used for serving
+        
+        Args:
+            directory: Snapshot directory (default from settings)
+            
+        Returns:
+            True if a snapshot is loaded
+        """
+        directory = directory or settings.ann_snapshot_directory
+        try:
+            snapshot = AnnSnapshot(directory)
+        except FileNotFoundError:
+            logger.warning(f"No ANN snapshot found at {directory}, serving from ChromaDB")
+            # A loaded snapshot whose files were removed (delete_collection) must stop serving
+            with self.lock.write():
+                previous, self.ann_snapshot = self.ann_snapshot, None
+                if previous is not None:
+                    self.version += 1
+            if previous is not None:
+                previous.close()
+            return False
+        except Exception as e:
+            logger.error(f"Error loading ANN snapshot: {e}")
+            return False
+        
+        with self.lock.write():
+            previous, self.ann_snapshot = self.ann_snapshot, snapshot
+            self.version += 1
+        if previous is not None:
+            previous.close()
+        return True
+    
+    def _current_snapshot(self) -> Optional[AnnSnapshot]:
+        """
+        Return the loaded snapshot, reopening it if a newer export exists
+        
+        Tombstones appended by other processes are picked up on the same
+        ANN_SNAPSHOT_RELOAD_INTERVAL schedule.
+        """
+        if not settings.ann_snapshot_enabled:
+            return None
+        
+        now = time.monotonic()
+        if now - self._snapshot_checked_at >= settings.ann_snapshot_reload_interval:
+            # Only one thread checks for a newer export; the others keep serving
+            if self._snapshot_reload_lock.acquire(blocking=False):
+                try:
+                    self._snapshot_checked_at = now
+                    if self.ann_snapshot is None or self.ann_snapshot.is_stale():
+                        self.load_ann_snapshot()
+                    else:
+                        with self.lock.write():
+                            self.ann_snapshot.refresh_deleted()
+                finally:
+                    self._snapshot_reload_lock.release()
+        return self.ann_snapshot
+    
+    def rebuild_indexes(self, page_size: int = 5000):
+        """
+        Rebuild the BM25, metadata, shard routing and near-duplicate indexes from ChromaDB
+        
+        Args:
+            page_size: Number of documents fetched per page
+        """
+        try:
+            with self._writer_mutex:
+                with self.lock.write():
+                    self.bm25_index.clear()
+                    self.metadata_index.clear()
+                    self.shard_router.clear()
+                    self.near_duplicate_index.clear()
+                    self.version += 1
+                
+                include = ["documents", "metadatas"]
+                if settings.chroma_sharding_enabled:
+                    include.append("embeddings")
+                
+                for shard, collection in self._shard_collections().items():
+                    offset = 0
+                    while True:
+                        page = collection.get(include=include, limit=page_size, offset=offset)
+                        if not page["ids"]:
+                            break
+                        with self.lock.write():
+                            self.bm25_index.add(page["ids"], page["documents"])
+                            self.metadata_index.add(page["ids"], page["metadatas"])
+                            if settings.chroma_sharding_enabled:
+                                self.shard_router.update(shard, page["embeddings"])
+                            if settings.dedup_enabled:
+                                self.near_duplicate_index.commit(page["ids"], page["documents"], page["metadatas"])
+                            self.version += 1
+                        offset += len(page["ids"])
+                
+                self._save_indexes()
+            logger.info(f"Rebuilt BM25 and metadata indexes with {len(self.bm25_index)} documents")
+        except Exception as e:
+            logger.error(f"Error rebuilding indexes: {e}")
+    
+    def _reduced_collection_name(self) -> str:
+        """Chroma collection holding the reduced-dimension vectors"""
+        return f"{self.collection_name}_reduced"
+    
+    def _load_projection(self):
+        """
+        Attach the persisted projection and its reduced collection
+        
+        The reduced collection is only searched if it holds as many vectors
+        as the main collections; a mismatch means writes were missed and the
+        projection must be refitted.
+        """
+        if not self.projection_path.exists():
+            if settings.reduced_search_enabled:
+                logger.warning(
+                    "Reduced-dimension search is enabled but no projection is fitted; "
+                    "run ingest_documents.py --fit-projection"
+                )
+            return
+        try:
+            projection = EmbeddingProjection.load(self.projection_path)
+            if projection.method != settings.reduced_search_method or projection.dimension != settings.reduced_search_dimension:
+                logger.warning(
+                    f"Persisted projection ({projection.method}, {projection.dimension}d) differs from settings; "
+                    "refit with ingest_documents.py --fit-projection"
+                )
+            self.reduced_collection = self._get_or_create_collection(self._reduced_collection_name())
+            self.projection = projection
+            reduced_count, count = self.reduced_collection.count(), self.get_collection_count()
+            self.reduced_in_sync = reduced_count == count
+            if not self.reduced_in_sync:
+                logger.warning(
+                    f"Reduced collection holds {reduced_count} vectors but the collection holds {count}; "
+                    "using full-dimension search until ingest_documents.py --fit-projection is rerun"
+                )
+            logger.info(f"Loaded embedding projection: {projection.info()}")
+        except Exception as e:
+            logger.error(f"Error loading embedding projection, using full-dimension search: {e}")
+    
+    def fit_projection(self, method: str = None, dimension: int = None, sample_size: int = None) -> Dict[str, Any]:
+        """
+        Fit the reduced-dimension projection and rebuild the reduced collection
+        
+        Searches fall back to full-dimension vectors while the reduced
+        collection is rebuilt, and switch over once it is complete (when
+        REDUCED_SEARCH_ENABLED is set). From then on every write keeps the
+        reduced collection up to date, whether or not the flag is set.
+        
+        Args:
+            method: "pca" or "matryoshka" (default from settings)
+            dimension: Reduced dimension (default from settings)
+            sample_size: Maximum number of embeddings PCA is fitted on
+            
+        Returns:
+            Projection info with the number of vectors indexed
+        """
+        method = method or settings.reduced_search_method
+        dimension = dimension or settings.reduced_search_dimension
+        sample_size = sample_size or settings.reduced_search_fit_sample
+        page_size = self._upsert_limit()
+        
+        try:
+            start_time = time.time()
+            with self._writer_mutex:
+                total = self.get_collection_count()
+                if total == 0:
+                    raise ValueError("Cannot fit a projection on an empty collection")
+                
+                # Strided sample so the fit is not biased towards the first ingested sources
+                stride = max(1, -(-total // sample_size))
+                sample = []
+                for collection in self._collections():
+                    for page in self._iter_pages(collection, ["embeddings"], page_size):
+                        sample.extend(page["embeddings"][::stride])
+                sample = np.asarray(sample, dtype=np.float32)
+                
+                if method == "matryoshka":
+                    projection = EmbeddingProjection.matryoshka(sample.shape[1], dimension)
+                else:
+                    projection = EmbeddingProjection.fit_pca(sample, dimension)
+                
+                with self.lock.write():
+                    self.projection, self.reduced_collection = None, None
+                    self.reduced_in_sync = False
+                    self.version += 1
+                
+                name = self._reduced_collection_name()
+                if any(collection.name == name for collection in self.vectorstore._client.list_collections()):
+                    self.vectorstore._client.delete_collection(name)
+                reduced_collection = self._get_or_create_collection(name)
+                indexed = 0
+                for collection in self._collections():
+                    for page in self._iter_pages(collection, ["embeddings", "metadatas"], page_size):
+                        reduced_collection.upsert(
+                            ids=page["ids"],
+                            embeddings=projection.transform(page["embeddings"]).tolist(),
+                            metadatas=page["metadatas"]
+                        )
+                        indexed += len(page["ids"])
+                
+                projection.save(self.projection_path)
+                with self.lock.write():
+                    self.projection, self.reduced_collection = projection, reduced_collection
+                    self.reduced_in_sync = True
+                    self.version += 1
+            
+            info = dict(projection.info(), indexed=indexed, sample=len(sample))
+            logger.info(f"Fitted embedding projection in {time.time() - start_time:.1f}s: {info}")
+            return info
+        except Exception as e:
+            logger.error(f"Error fitting embedding projection: {e}")
+            raise
+    
+    @staticmethod
+    def _iter_pages(collection, include: List[str], page_size: int):
+        """Page through every record of a Chroma collection"""
+        offset = 0
+        while True:
+            page = collection.get(include=include, limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
+    
+    def _get_or_create_collection(self, name: str, shard: Optional[str] = None):
+        """
+        Open a raw Chroma collection, creating it with the configured HNSW parameters
+        
+        Args:
+            name: Collection name
+            shard: Shard key recorded in the metadata of a new shard collection
+        """
+        existing = {collection.name for collection in self.vectorstore._client.list_collections()}
+        if name in existing:
+            collection = self.vectorstore._client.get_collection(name=name, embedding_function=None)
+            self._check_hnsw_params(collection)
+            return collection
+        metadata = settings.hnsw_metadata(name)
+        if shard is not None:
+            metadata["shard"] = shard
+        return self.vectorstore._client.create_collection(
+            name=name,
+            metadata=metadata,
+            embedding_function=None
+        )
+    
+    @staticmethod
+    def _check_hnsw_params(collection):
+        """
+        Warn when an existing collection was built with different HNSW parameters
+        
+        Raises:
+            ValueError: If the collection uses a space other than l2, which the
+                in-process exact, reduced and snapshot searches do not compute
+        """
+        expected = settings.hnsw_metadata(collection.name)
+        actual = collection.metadata or {}
+        space = actual.get("hnsw:space", "l2")
+        if space != "l2":
+            raise ValueError(
+                f"Collection {collection.name} was built with hnsw:space={space!r}; only l2 is supported, "
+                "rebuild it with ingest_documents.py --export-dump/--import-dump"
+            )
+        differing = {
+            key: actual.get(key) for key, value in expected.items()
+            if key in actual and actual[key] != value
+        }
+        if differing:
+            logger.warning(
+                f"Collection {collection.name} was built with {differing}, settings ask for "
+                f"{ {key: expected[key] for key in differing} }; HNSW parameters only apply at creation, "
+                "rebuild it with ingest_documents.py --export-dump/--import-dump"
+            )
+    
+    def _shard_collection_name(self, shard: str) -> str:
+        """
+        Chroma collection name for a shard key
+        
+        Names longer than Chroma's 63-character limit are truncated and
+        suffixed with a hash of the key, so distinct keys never share a
+        collection.
+        """
+        name = f"{self.collection_name}__{shard}"
+        if len(name) <= 63:
+            return name
+        digest = hashlib.sha1(shard.encode("utf-8")).hexdigest()[:8]
+        return f"{name[:54].rstrip('_')}_{digest}"
+    
+    def _discover_shards(self):
+        """Attach shard collections that already exist on disk"""
+        prefix = f"{self.collection_name}__"
+        for collection in self.vectorstore._client.list_collections():
+            if collection.name.startswith(prefix):
+                # The key is stored in the collection metadata; older collections only have it in the name
+                shard = (collection.metadata or {}).get("shard") or collection.name[len(prefix):]
+                self.shards[shard] = self._get_or_create_collection(collection.name)
+        if self.shards:
+            logger.info(f"Found {len(self.shards)} shard collections: {sorted(self.shards)}")
+    
+    def _shard_for_metadata(self, metadata: Optional[Dict[str, Any]]) -> str:
+        """Shard key a chunk is stored under"""
+        if not settings.chroma_sharding_enabled:
+            return settings.chroma_default_shard
+        value = (metadata or {}).get(settings.chroma_shard_field)
+        return shard_slug(value) if value else settings.chroma_default_shard
+    
+    def _get_collection(self, shard: str):
+        """Get (or create) the Chroma collection backing a shard"""
+        if shard == settings.chroma_default_shard:
+            return self.vectorstore._collection
+        collection = self.shards.get(shard)
+        if collection is None:
+            collection = self._get_or_create_collection(self._shard_collection_name(shard), shard=shard)
+            self.shards[shard] = collection
+            logger.info(f"Created shard collection: {collection.name}")
+        return collection
+    
+    def _shard_collections(self) -> Dict[str, Any]:
+        """All collections keyed by shard, main collection first"""
+        collections = {settings.chroma_default_shard: self.vectorstore._collection}
+        collections.update(self.shards)
+        return collections
+    
+    def _collections(self) -> List[Any]:
+        """All Chroma collections holding chunks"""
+        return list(self._shard_collections().values())
+    
+    def _route(
+        self,
+        embedding: List[float],
+        filter: Optional[Dict[str, Any]],
+        query_text: str
+    ) -> List[str]:
+        """Pick the shards a query is sent to"""
+        if not settings.chroma_sharding_enabled or not self.shards:
+            return [settings.chroma_default_shard]
+        
+        known = list(self._shard_collections())
+        scoped = self._shards_for_filter(filter)
+        if scoped is not None:
+            return [shard for shard in scoped if shard in known]
+        return self.shard_router.route(embedding, query_text, shards=known)
+    
+    def _shards_for_filter(self, filter: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Shards implied by a filter on the shard field, or None if unconstrained"""
+        if not filter:
+            return None
+        clauses = filter["$and"] if "$and" in filter else [filter]
+        for clause in clauses:
+            condition = clause.get(settings.chroma_shard_field)
+            if condition is None:
+                continue
+            if isinstance(condition, dict):
+                if "$eq" in condition:
+                    return [shard_slug(condition["$eq"])]
+                if "$in" in condition:
+                    return [shard_slug(value) for value in condition["$in"]]
+                return None
+            return [shard_slug(condition)]
+        return None
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking store call on the vector store executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+    
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Async similarity_search, run on the vector store executor"""
+        return await self._run(self.similarity_search, query, k=k, filter=filter)
+    
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Async similarity_search_with_score, run on the vector store executor"""
+        return await self._run(self.similarity_search_with_score, query, k=k, filter=filter)
+    
+    async def aadd_documents(self, documents: List[Document]) -> List[str]:
+        """Async add_documents, run on the vector store executor"""
+        return await self._run(self.add_documents, documents)
+    
+    async def areplace_source(self, source: str, documents: List[Document]) -> Dict[str, Any]:
+        """Async replace_source, run on the vector store executor"""
+        return await self._run(self.replace_source, source, documents)
+    
+    async def adelete_source(self, source: str) -> int:
+        """Async delete_source, run on the vector store executor"""
+        return await self._run(self.delete_source, source)
+    
+    async def adelete_collection(self):
+        """Async delete_collection, run on the vector store executor"""
+        return await self._run(self.delete_collection)
+    
+    async def acount(self) -> int:
+        """Async get_collection_count, run on the vector store executor"""
+        return await self._run(self.get_collection_count)
+    
     def as_retriever(self, search_type: str = "similarity", search_kwargs: Dict = None):
         """
         Get retriever interface for the vector store
@@ -207,12 +1590,16 @@ class DocumentProcessor:
     
     def __init__(self):
         """Initialize document processor with text splitter"""
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
+        self.near_duplicate_index = get_near_duplicate_index()
+        self.dedup_stats = {"chunks": 0, "duplicates": 0}
         logger.info("DocumentProcessor initialized")
     
     def process_text(
@@ -223,6 +1610,10 @@ class DocumentProcessor:
         """
         Process text into chunks
         
+        Chunks that are near-duplicates of a chunk elsewhere in the corpus
+        (or earlier in this text) are skipped, or kept with a "duplicate_of"
+        link when DEDUP_MODE is "link".
+        
         Args:
             text: Raw text to process
             metadata: Optional metadata to attach to chunks
@@ -230,26 +1621,55 @@ class DocumentProcessor:
         Returns:
             List of Document chunks
         """
+        documents = []
         try:
             chunks = self.text_splitter.split_text(text)
-            documents = []
+            duplicates = 0
             
             for i, chunk in enumerate(chunks):
                 doc_metadata = metadata.copy() if metadata else {}
                 doc_metadata["chunk_index"] = i
                 doc_metadata["chunk_total"] = len(chunks)
+                doc_metadata["content_hash"] = content_hash(chunk)
+                doc_metadata["chunk_id"] = make_chunk_id(
+                    doc_metadata.get("source", "unknown"), i, doc_metadata["content_hash"]
+                )
+                
+                if settings.dedup_enabled:
+                    signature = self.near_duplicate_index.signature(chunk)
+                    duplicate_of = self.near_duplicate_index.find(signature, doc_metadata.get("source"))
+                    if duplicate_of is not None and duplicate_of != doc_metadata["chunk_id"]:
+                        duplicates += 1
+                        if settings.dedup_mode == "skip":
+                            continue
+                        doc_metadata["duplicate_of"] = duplicate_of
+                    else:
+                        self.near_duplicate_index.add(
+                            doc_metadata["chunk_id"], signature, doc_metadata.get("source"), pending=True
+                        )
                 
                 documents.append(Document(
                     page_content=chunk,
                     metadata=doc_metadata
                 ))
             
-            logger.info(f"Processed text into {len(documents)} chunks")
+            self.dedup_stats["chunks"] += len(chunks)
+            self.dedup_stats["duplicates"] += duplicates
+            logger.info(
+                f"Processed text into {len(documents)} chunks "
+                f"({duplicates} near-duplicates, dedup ratio {self.dedup_ratio(len(chunks), duplicates):.1%})"
+            )
             return documents
         except Exception as e:
             logger.error(f"Error processing text: {e}")
+            self.near_duplicate_index.discard_pending([doc.metadata["chunk_id"] for doc in documents])
             raise
     
+    @staticmethod
+    def dedup_ratio(chunks: int, duplicates: int) -> float:
+        """Fraction of chunks detected as near-duplicates"""
+        return duplicates / chunks if chunks else 0.0
+    
     def process_documents(self, documents: List[Document]) -> List[Document]:
         """
         Process existing documents into smaller chunks
@@ -271,20 +1691,26 @@ class DocumentProcessor:
 
 # Global instances
 _vector_store = None
+_vector_store_lock = threading.Lock()
 _document_processor = None
+_document_processor_lock = threading.Lock()
 
 
 def get_vector_store() -> ChromaVectorStore:
-    """Get or create global vector store instance"""
+    """Get or create global vector store instance (safe to call from worker threads)"""
     global _vector_store
     if _vector_store is None:
-        _vector_store = ChromaVectorStore()
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = ChromaVectorStore()
     return _vector_store
 
 
 def get_document_processor() -> DocumentProcessor:
-    """Get or create global document processor instance"""
+    """Get or create global document processor instance (safe to call from worker threads)"""
     global _document_processor
     if _document_processor is None:
-        _document_processor = DocumentProcessor()
+        with _document_processor_lock:
+            if _document_processor is None:
+                _document_processor = DocumentProcessor()
     return _document_processor
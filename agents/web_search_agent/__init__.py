@@ -1,10 +1,12 @@
 """Web Search Agent Package"""
 from agents.web_search_agent.web_search_agent import WebSearchAgent, get_web_search_agent
 from agents.web_search_agent.tavily_search import TavilySearch, get_tavily_search
+from agents.web_search_agent.search_cache import SearchCache
 
 __all__ = [
     'WebSearchAgent',
     'get_web_search_agent',
     'TavilySearch',
-    'get_tavily_search'
+    'get_tavily_search',
+    'SearchCache'
 ]
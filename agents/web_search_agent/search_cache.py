@@ -0,0 +1,192 @@
+"""
+Search Cache Module
+Two-tier (in-memory LRU + SQLite) cache of Tavily responses with stale-while-revalidate
+"""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from config import settings
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """
+    Cache of web search responses keyed on everything that changes the result
+    
+    Lookups go to a per-process LRU first, then to a SQLite file shared by
+    all workers on the host (WAL mode, so readers do not block the writer).
+    An entry is fresh for WEB_SEARCH_CACHE_TTL seconds; for a further
+    WEB_SEARCH_CACHE_STALE_TTL seconds it is still returned, flagged stale,
+    so the caller can serve it and refresh it in the background.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, ttl: float = None, stale_ttl: float = None, max_size: int = None):
+        """
+        Initialize cache, opening (or creating) the SQLite tier when a path is given
+        
+        Args:
+            path: SQLite file (None = in-memory only)
+            ttl: Seconds an entry is fresh
+            stale_ttl: Seconds after ttl an entry may still be served while it is refreshed
+            max_size: Entries kept in the in-memory tier
+        """
+        self.ttl = ttl if ttl is not None else settings.web_search_cache_ttl
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.web_search_cache_stale_ttl
+        self.memory = LRUCache(max_size or settings.web_search_cache_size, ttl=self.ttl + self.stale_ttl)
+        self.path = Path(path) if path else None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.stale_hits = 0
+        
+        if self.path:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+                )
+                self._connection.commit()
+                logger.info(f"Web search cache opened at {self.path}")
+            except Exception as e:
+                logger.error(f"Error opening web search cache at {self.path}, using memory only: {e}")
+                self._connection = None
+    
+    @staticmethod
+    def key(
+        query: str,
+        search_depth: str,
+        include_domains: Optional[List[str]],
+        exclude_domains: Optional[List[str]],
+        max_results: int
+    ) -> str:
+        """
+        Cache key of a search
+        
+        Args:
+            query: Search query (case and whitespace are normalized)
+            search_depth: "basic" or "advanced"
+            include_domains: Domains searched (order does not matter)
+            exclude_domains: Domains excluded (order does not matter)
+            max_results: Maximum number of results
+            
+        Returns:
+            Hex digest identifying the search
+        """
+        params = [
+            re.sub(r"\s+", " ", query).strip().lower(),
+            search_depth,
+            sorted(include_domains or []),
+            sorted(exclude_domains or []),
+            max_results
+        ]
+        return hashlib.sha256(json.dumps(params).encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Look up a search response
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            (response, is_stale), or None on a miss or when the entry is past its stale window
+        """
+        entry = self.memory.get(key)
+        if entry is None and self._connection is not None:
+            entry = self._load(key)
+            if entry is not None:
+                self.memory.put(key, entry)
+                with self._lock:
+                    self.disk_hits += 1
+        if entry is None:
+            return None
+        
+        response, fetched_at = entry
+        age = time.time() - fetched_at
+        if age > self.ttl + self.stale_ttl:
+            return None
+        stale = age > self.ttl
+        if stale:
+            with self._lock:
+                self.stale_hits += 1
+        return response, stale
+    
+    def _load(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Read an entry from the SQLite tier"""
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT response, fetched_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+            return (json.loads(row[0]), row[1]) if row else None
+        except Exception as e:
+            logger.error(f"Error reading web search cache: {e}")
+            return None
+    
+    def put(self, key: str, response: Dict[str, Any]):
+        """
+        Store a search response in both tiers
+        
+        Args:
+            key: Cache key
+            response: Tavily response (must be JSON-serializable)
+        """
+        fetched_at = time.time()
+        self.memory.put(key, (response, fetched_at))
+        if self._connection is None:
+            return
+        try:
+            with self._lock:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, response, fetched_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(response), fetched_at)
+                )
+                self._connection.commit()
+        except Exception as e:
+            logger.error(f"Error writing web search cache: {e}")
+    
+    def prune(self) -> int:
+        """
+        Delete SQLite entries past their stale window
+        
+        Returns:
+            Number of entries deleted
+        """
+        if self._connection is None:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._connection.execute(
+                    "DELETE FROM search_cache WHERE fetched_at < ?",
+                    (time.time() - self.ttl - self.stale_ttl,)
+                )
+                self._connection.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error pruning web search cache: {e}")
+            return 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics
+        
+        Returns:
+            Dictionary with in-memory LRU stats, SQLite hits and stale hits
+        """
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "persistent": self._connection is not None
+        }
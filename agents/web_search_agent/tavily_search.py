@@ -3,9 +3,11 @@ Tavily Web Search Module
 Performs real-time web searches for medical information
 """
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from tavily import TavilyClient
 from config import settings
+from agents.web_search_agent.search_cache import SearchCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +15,26 @@ logger = logging.getLogger(__name__)
 class TavilySearch:
     """
     Wrapper for Tavily API to search medical information
+    
+    Responses are cached per (query, depth, domains, max_results). A stale
+    cached response is returned immediately while a background thread
+    fetches a fresh one, so repeated topics never wait on the API.
     """
     
     def __init__(self):
-        """Initialize Tavily client"""
+        """Initialize Tavily client and the search cache"""
         try:
+            from tavily import TavilyClient
+            
             self.client = TavilyClient(api_key=settings.tavily_api_key)
+            self.cache = None
+            if settings.web_search_cache_enabled:
+                self.cache = SearchCache(settings.web_search_cache_path or None)
+                self.cache.prune()
+            self.api_calls = 0
+            self._refreshing = set()
+            self._refresh_lock = threading.Lock()
+            self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
             logger.info("TavilySearch initialized")
         except Exception as e:
             logger.error(f"Error initializing TavilySearch: {e}")
@@ -59,21 +75,74 @@ class TavilySearch:
                     "nejm.org"
                 ]
             
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth=search_depth,
-                include_domains=include_domains,
-                exclude_domains=exclude_domains
-            )
+            params = {
+                "query": query,
+                "max_results": max_results,
+                "search_depth": search_depth,
+                "include_domains": include_domains,
+                "exclude_domains": exclude_domains
+            }
+            if self.cache is None:
+                return self._fetch(params)
             
-            logger.info(f"Tavily search completed: {len(response.get('results', []))} results")
+            key = SearchCache.key(query, search_depth, include_domains, exclude_domains, max_results)
+            cached = self.cache.get(key)
+            if cached is not None:
+                response, stale = cached
+                if stale:
+                    self._refresh(key, params)
+                logger.info(f"Tavily search served from cache ({'stale' if stale else 'fresh'})")
+                return response
+            
+            response = self._fetch(params)
+            self.cache.put(key, response)
             return response
             
         except Exception as e:
             logger.error(f"Error performing Tavily search: {e}")
             return {"results": [], "error": str(e)}
     
+    def _fetch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the Tavily API"""
+        with self._refresh_lock:
+            self.api_calls += 1
+        response = self.client.search(**params)
+        logger.info(f"Tavily search completed: {len(response.get('results', []))} results")
+        return response
+    
+    def _refresh(self, key: str, params: Dict[str, Any]):
+        """Re-fetch a stale entry in the background (once per key at a time)"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self.cache.put(key, self._fetch(params))
+            except Exception as e:
+                logger.error(f"Error refreshing cached Tavily search: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+        
+        self._refresh_executor.submit(refresh)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Search cache statistics
+        
+        Returns:
+            Dictionary with API calls, refreshes in flight and cache stats
+        """
+        with self._refresh_lock:
+            refreshing = len(self._refreshing)
+        return {
+            "api_calls": self.api_calls,
+            "refreshing": refreshing,
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
+    
     def medical_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
         Perform medical-focused search
@@ -117,11 +186,14 @@ class TavilySearch:
 
 # Global instance
 _tavily_search = None
+_tavily_search_lock = threading.Lock()
 
 
 def get_tavily_search() -> TavilySearch:
-    """Get or create global Tavily search instance"""
+    """Get or create global Tavily search instance (safe to call from worker threads)"""
     global _tavily_search
     if _tavily_search is None:
-        _tavily_search = TavilySearch()
+        with _tavily_search_lock:
+            if _tavily_search is None:
+                _tavily_search = TavilySearch()
     return _tavily_search
@@ -3,8 +3,8 @@ Web Search Agent Module
 Performs web searches and processes results for medical queries
 """
 import logging
+import threading
 from typing import List, Dict, Any
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from config import settings
 from agents.web_search_agent.tavily_search import get_tavily_search
@@ -20,6 +20,9 @@ class WebSearchAgent:
     def __init__(self):
         """Initialize web search agent"""
         try:
+            from langchain_openai import AzureChatOpenAI
+            from core.health import get_llm_call_tracker
+            
             # Initialize LLM
             self.llm = AzureChatOpenAI(
                 azure_endpoint=settings.azure_endpoint,
@@ -27,7 +30,8 @@ class WebSearchAgent:
                 openai_api_version=settings.openai_api_version,
                 deployment_name=settings.deployment_name or settings.model_name,
                 temperature=settings.temperature,
-                max_tokens=settings.max_tokens
+                max_tokens=settings.max_tokens,
+                callbacks=[get_llm_call_tracker()]
             )
             
             # Initialize search client
@@ -184,11 +188,14 @@ Search Results:
 
 # Global instance
 _web_search_agent = None
+_web_search_agent_lock = threading.Lock()
 
 
 def get_web_search_agent() -> WebSearchAgent:
-    """Get or create global web search agent instance"""
+    """Get or create global web search agent instance (safe to call from worker threads)"""
     global _web_search_agent
     if _web_search_agent is None:
-        _web_search_agent = WebSearchAgent()
+        with _web_search_agent_lock:
+            if _web_search_agent is None:
+                _web_search_agent = WebSearchAgent()
     return _web_search_agent
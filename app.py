@@ -8,6 +8,7 @@ from contextlib import asynccontextmanager
 from typing import List
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
@@ -15,10 +16,10 @@ from config import settings
 from utils.logger import setup_logging, get_logger
 from utils.models import (
     ChatRequest, ChatResponse, DocumentUploadResponse,
-    HealthResponse, CollectionInfoResponse, Source
+    HealthResponse, ReadyResponse, CollectionInfoResponse, Source
 )
-from core import get_orchestrator
-from agents.rag_agent import get_vector_store, get_document_processor
+from core import get_orchestrator, get_warmup, get_health_monitor, loaded_instance
+from agents.rag_agent import get_vector_store, get_document_processor, build_metadata_filter
 
 # Setup logging
 setup_logging()
@@ -32,13 +33,23 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Medical Assistant Backend...")
     logger.info(f"Environment: {'Development' if settings.debug else 'Production'}")
     
-    # Initialize components (lazy loading on first use)
-    logger.info("Application started successfully")
+    # Preload models and clients in the background; /ready reports when done
+    warmup = get_warmup()
+    warmup.start()
+    if warmup.steps:
+        logger.info(f"Application started, warming up: {', '.join(warmup.steps)}")
+    else:
+        logger.info("Application started successfully (warm-up disabled, components load on first use)")
+    
+    # Component probes run in the background; /health and /ready serve the cached result
+    health_monitor = get_health_monitor()
+    health_monitor.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Medical Assistant Backend...")
+    await health_monitor.stop()
 
 
 # Create FastAPI app
@@ -77,33 +88,37 @@ async def global_exception_handler(request, exc):
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """
-    Health check endpoint
+    Liveness endpoint: answers from memory with the last background probe of each component
+    
+    Status is "healthy", "degraded" (a component failed, the LLM is
+    unreachable or warm-up finished degraded) or "unhealthy" (vector store failed).
     """
-    try:
-        # Check vector store
-        vector_store = get_vector_store()
-        doc_count = vector_store.get_collection_count()
-        
-        return HealthResponse(
-            status="healthy",
-            version=settings.app_version,
-            components={
-                "api": "operational",
-                "vector_store": "operational",
-                "document_count": str(doc_count)
-            }
-        )
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return HealthResponse(
-            status="unhealthy",
-            version=settings.app_version,
-            components={
-                "api": "operational",
-                "vector_store": "error",
-                "error": str(e)
-            }
-        )
+    monitor = get_health_monitor()
+    components = {"api": "operational"}
+    for name, state in monitor.components.items():
+        components[name] = state["status"]
+        if "document_count" in state:
+            components["document_count"] = str(state["document_count"])
+    return HealthResponse(
+        status=monitor.overall_status(),
+        version=settings.app_version,
+        components=components
+    )
+
+
+@app.get("/ready", response_model=ReadyResponse, tags=["Health"])
+async def readiness_check():
+    """
+    Readiness endpoint for the load balancer: 200 once warm-up has finished, 503 before
+    
+    Reports the cached state of the vector store, reranker and LLM (judged
+    from recent call outcomes) without probing anything.
+    """
+    snapshot = get_health_monitor().snapshot()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if snapshot["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=ReadyResponse(**snapshot).model_dump()
+    )
 
 
 @app.get("/", tags=["Root"])
@@ -113,7 +128,8 @@ async def root():
         "message": "Medical Assistant Backend API",
         "version": settings.app_version,
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready"
     }
 
 
@@ -128,6 +144,8 @@ async def chat(request: ChatRequest):
     - **session_id**: Optional session identifier
     - **use_expansion**: Enable query expansion (default: true)
     - **use_reranking**: Enable document reranking (default: true)
+    - **specialty**: Optional specialty scope (e.g. "cardiology")
+    - **sources**: Optional list of source documents to search
     """
     try:
         logger.info(f"Processing chat request: {request.question[:100]}...")
@@ -135,11 +153,16 @@ async def chat(request: ChatRequest):
         # Get orchestrator
         orchestrator = get_orchestrator()
         
-        # Process query
-        result = orchestrator.process_query(
+        # Process query (blocking LLM and vector store calls run off the event loop)
+        result = await run_in_threadpool(
+            orchestrator.process_query,
             question=request.question,
             user_id=request.user_id,
-            session_id=request.session_id
+            session_id=request.session_id,
+            retrieval_filter=build_metadata_filter(
+                specialty=request.specialty,
+                sources=request.sources
+            )
         )
         
         # Convert to response model
@@ -211,7 +234,8 @@ async def upload_document(file: UploadFile = File(...)):
         
         # Process and add to vector store
         doc_processor = get_document_processor()
-        chunks = doc_processor.process_text(
+        chunks = await run_in_threadpool(
+            doc_processor.process_text,
             text=text,
             metadata={
                 "source": file.filename,
@@ -220,14 +244,22 @@ async def upload_document(file: UploadFile = File(...)):
             }
         )
         
+        # Re-uploads only embed changed chunks and drop chunks that disappeared
         vector_store = get_vector_store()
-        doc_ids = vector_store.add_documents(chunks)
+        sync = await vector_store.areplace_source(file.filename, chunks)
+        doc_ids = sync["ids"]
         
-        logger.info(f"Document processed: {file.filename}, {len(chunks)} chunks created")
+        logger.info(
+            f"Document processed: {file.filename}, {len(chunks)} chunks "
+            f"({sync['added']} new, {sync['unchanged']} unchanged, {sync['deleted']} removed)"
+        )
         
         return DocumentUploadResponse(
             success=True,
-            message="Document uploaded and processed successfully",
+            message=(
+                "Document uploaded and processed successfully "
+                f"({sync['added']} new, {sync['unchanged']} unchanged, {sync['deleted']} removed chunks)"
+            ),
             filename=file.filename,
             chunks_created=len(chunks),
             document_ids=doc_ids
@@ -250,7 +282,7 @@ async def get_collection_info():
     """
     try:
         vector_store = get_vector_store()
-        doc_count = vector_store.get_collection_count()
+        doc_count = await vector_store.acount()
         
         return CollectionInfoResponse(
             collection_name=settings.chroma_collection_name,
@@ -273,7 +305,7 @@ async def delete_collection():
     """
     try:
         vector_store = get_vector_store()
-        vector_store.delete_collection()
+        await vector_store.adelete_collection()
         
         logger.warning("Document collection deleted")
         
@@ -287,6 +319,78 @@ async def delete_collection():
         )
 
 
+@app.delete("/documents/source/{source}", tags=["Documents"])
+async def delete_document(source: str):
+    """
+    Delete one document (all chunks with this source name) from the collection
+    
+    Lives under /documents/source/ so no file name can collide with
+    /documents/collection, which deletes everything.
+    """
+    try:
+        vector_store = get_vector_store()
+        deleted = await vector_store.adelete_source(source)
+        
+        if deleted == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No chunks found for source: {source}"
+            )
+        
+        logger.info(f"Document deleted: {source}, {deleted} chunks removed")
+        
+        return {"success": True, "message": f"Deleted {deleted} chunks of {source}", "chunks_deleted": deleted}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting document: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting document: {str(e)}"
+        )
+
+
+@app.get("/reranker/stats", tags=["Health"])
+async def reranker_stats():
+    """
+    Reranker backend with score cache, token cache and batching hit ratios
+    
+    Reports not_loaded instead of loading the model on the event loop.
+    """
+    try:
+        reranker = loaded_instance("agents.rag_agent.reranker", "_reranker")
+        if reranker is None:
+            return {"status": "not_loaded"}
+        return reranker.stats()
+    except Exception as e:
+        logger.error(f"Error getting reranker stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving reranker stats: {str(e)}"
+        )
+
+
+@app.get("/web-search/stats", tags=["Health"])
+async def web_search_stats():
+    """
+    Tavily API calls and web search cache hit ratios
+    
+    Reports not_loaded instead of creating the client on the event loop.
+    """
+    try:
+        tavily_search = loaded_instance("agents.web_search_agent.tavily_search", "_tavily_search")
+        if tavily_search is None:
+            return {"status": "not_loaded"}
+        return tavily_search.stats()
+    except Exception as e:
+        logger.error(f"Error getting web search stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving web search stats: {str(e)}"
+        )
+
+
 # Run the application
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,99 @@
+"""
+Metadata Filter Benchmark
+Compares the exact scan of a filtered scope with a Chroma query using a where pre-filter
+
+The exact path is what VectorStore takes when the metadata index resolves a
+filter to at most METADATA_FILTER_EXACT_MAX chunks: fetch their embeddings by
+ID, then score them in NumPy. The crossover scope size is a good value for
+that setting.
+
+Usage:
+    python benchmarks/filter_benchmark.py --n 50000 --dimension 1536 --scopes 100 250 500 1000 2500 5000
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from benchmarks.synthetic import make_corpus, time_queries
+
+
+def build_collection(client, corpus, scopes, batch_size: int):
+    """Load the corpus, tagging the first `scope` rows with scope_<scope> for every scope size"""
+    collection = client.create_collection(name="filter-benchmark", embedding_function=None)
+    for start in range(0, len(corpus), batch_size):
+        block = corpus[start:start + batch_size]
+        rows = range(start, start + len(block))
+        collection.add(
+            ids=[f"v{row}" for row in rows],
+            embeddings=block.tolist(),
+            metadatas=[{f"scope_{scope}": row < scope for scope in scopes} for row in rows]
+        )
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the exact-scan vs where pre-filter crossover")
+    parser.add_argument("--n", type=int, default=50000, help="Corpus size")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries per scope")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--scopes", type=int, nargs="+", default=[100, 250, 500, 1000, 2500, 5000], help="Filtered scope sizes")
+    args = parser.parse_args()
+    
+    corpus, queries = make_corpus(args.n, args.dimension, n_queries=args.queries)
+    print(f"Corpus: {args.n} x {args.dimension}, {args.queries} queries, k={args.k}\n")
+    
+    header = f"{'scope':>6} {'exact p50':>10} {'exact p99':>10} {'where p50':>10} {'where p99':>10}"
+    print(header)
+    print("-" * len(header))
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        client = chromadb.PersistentClient(
+            path=workdir,
+            settings=ChromaSettings(anonymized_telemetry=False)
+        )
+        collection = build_collection(
+            client,
+            corpus,
+            args.scopes,
+            batch_size=min(5000, getattr(client, "max_batch_size", 5000))
+        )
+        
+        for scope in args.scopes:
+            ids = [f"v{row}" for row in range(scope)]
+            
+            def exact(query):
+                candidates = collection.get(ids=ids, include=["embeddings"])
+                matrix = np.asarray(candidates["embeddings"], dtype=np.float32)
+                distances = ((matrix - query) ** 2).sum(axis=1)
+                top = np.argsort(distances)[:args.k]
+                collection.get(ids=[candidates["ids"][i] for i in top], include=["documents", "metadatas"])
+                return [int(candidates["ids"][i][1:]) for i in top]
+            
+            def where(query):
+                results = collection.query(
+                    query_embeddings=[query.tolist()],
+                    n_results=args.k,
+                    where={f"scope_{scope}": True},
+                    include=["documents", "metadatas", "distances"]
+                )
+                return [int(chunk_id[1:]) for chunk_id in results["ids"][0]]
+            
+            _, exact_latency = time_queries(exact, queries)
+            _, where_latency = time_queries(where, queries)
+            print(
+                f"{scope:>6} {exact_latency['p50_ms']:>10.2f} {exact_latency['p99_ms']:>10.2f} "
+                f"{where_latency['p50_ms']:>10.2f} {where_latency['p99_ms']:>10.2f}"
+            )
+        del collection, client
+
+
+if __name__ == "__main__":
+    main()
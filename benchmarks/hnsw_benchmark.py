@@ -0,0 +1,112 @@
+"""
+HNSW Parameter Benchmark
+Sweeps Chroma HNSW parameters on a synthetic corpus and reports latency, recall@k and memory
+
+Usage:
+    python benchmarks/hnsw_benchmark.py --n 20000 --dimension 1536 --m 8 16 32 --search-ef 10 50 100
+"""
+import argparse
+import itertools
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from benchmarks.synthetic import make_corpus, exact_neighbors, recall_at_k, time_queries
+
+
+def directory_bytes(path: Path) -> int:
+    """Total size of the HNSW segment files under a Chroma persist directory"""
+    return sum(
+        file.stat().st_size
+        for file in path.rglob("*")
+        if file.is_file() and file.name != "chroma.sqlite3"
+    )
+
+
+def estimated_index_bytes(n: int, dimension: int, m: int) -> int:
+    """hnswlib resident size: float32 vectors, 2*M level-0 links, labels and upper levels"""
+    level0 = n * (4 * dimension + 4 * (2 * m + 1) + 8)
+    upper = int(n / max(m, 2)) * 4 * (m + 1)
+    return level0 + upper
+
+
+def build_collection(client, name: str, metadata: dict, corpus, batch_size: int):
+    """Create a collection with the given HNSW metadata and load the corpus into it"""
+    collection = client.create_collection(name=name, metadata=metadata, embedding_function=None)
+    for start in range(0, len(corpus), batch_size):
+        block = corpus[start:start + batch_size]
+        collection.add(
+            ids=[f"v{row}" for row in range(start, start + len(block))],
+            embeddings=block.tolist()
+        )
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Chroma HNSW parameters")
+    parser.add_argument("--n", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--space", default="l2", choices=["l2", "cosine", "ip"], help="Distance metric")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32], help="HNSW M values")
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200], help="ef_construction values")
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100], help="ef_search values")
+    args = parser.parse_args()
+    
+    corpus, queries = make_corpus(args.n, args.dimension, n_queries=args.queries)
+    # Embeddings are unit-norm, so l2, cosine and ip share the same exact neighbours
+    truth = exact_neighbors(corpus, queries, args.k)
+    print(f"Corpus: {args.n} x {args.dimension}, {args.queries} queries, space={args.space}, recall@{args.k}\n")
+    
+    header = (
+        f"{'M':>4} {'ef_c':>5} {'ef_s':>5} {'build s':>8} {'recall':>7} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'disk MB':>8} {'est MB':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    
+    for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef):
+        with tempfile.TemporaryDirectory() as workdir:
+            client = chromadb.PersistentClient(
+                path=workdir,
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+            metadata = {
+                "hnsw:space": args.space,
+                "hnsw:M": m,
+                "hnsw:construction_ef": construction_ef,
+                "hnsw:search_ef": search_ef
+            }
+            start = time.perf_counter()
+            collection = build_collection(
+                client,
+                f"hnsw-m{m}-c{construction_ef}-s{search_ef}",
+                metadata,
+                corpus,
+                batch_size=min(5000, getattr(client, "max_batch_size", 5000))
+            )
+            build_seconds = time.perf_counter() - start
+            
+            def search(query):
+                results = collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])
+                return [int(chunk_id[1:]) for chunk_id in results["ids"][0]]
+            
+            results, latency = time_queries(search, queries)
+            disk_bytes = directory_bytes(Path(workdir))
+            print(
+                f"{m:>4} {construction_ef:>5} {search_ef:>5} {build_seconds:>8.1f} "
+                f"{recall_at_k(truth, results, args.k):>7.3f} {latency['p50_ms']:>8.2f} {latency['p99_ms']:>8.2f} "
+                f"{disk_bytes / 2**20:>8.1f} {estimated_index_bytes(args.n, args.dimension, m) / 2**20:>7.1f}"
+            )
+            del collection, client
+
+
+if __name__ == "__main__":
+    main()
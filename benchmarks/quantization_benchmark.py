@@ -0,0 +1,76 @@
+"""
+Quantization Benchmark
+Recall@k, latency and index memory of float32 / float16 / int8 ANN snapshots
+
+Usage:
+    python benchmarks/quantization_benchmark.py --n 20000 --dimension 1536 --k 10
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import settings
+from agents.rag_agent.ann_snapshot import AnnSnapshot, export_snapshot
+from benchmarks.synthetic import SyntheticCollection, make_corpus, exact_neighbors, recall_at_k, time_queries
+
+
+def snapshot_rows_to_corpus(snapshot: AnnSnapshot) -> np.ndarray:
+    """Map snapshot rows (grouped by IVF list) back to corpus rows"""
+    return np.array([
+        int(snapshot.get_document(row).metadata["chunk_id"].rsplit("-", 1)[1])
+        for row in range(len(snapshot))
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized ANN snapshot storage")
+    parser.add_argument("--n", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--nprobe", type=int, default=None, help="IVF lists probed (default from settings)")
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[0, 4],
+                        help="Shortlist multipliers to compare (0 = no rescoring)")
+    args = parser.parse_args()
+    
+    corpus, queries = make_corpus(args.n, args.dimension, n_queries=args.queries)
+    truth = exact_neighbors(corpus, queries, args.k)
+    collection = SyntheticCollection(corpus)
+    print(f"Corpus: {args.n} x {args.dimension}, {args.queries} queries, recall@{args.k} vs exact float32\n")
+    
+    header = f"{'dtype':<8} {'rescore':>7} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'index MB':>9} {'ratio':>6}"
+    print(header)
+    print("-" * len(header))
+    
+    baseline_bytes = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for dtype in ("float32", "float16", "int8"):
+            directory = Path(workdir) / dtype
+            export_snapshot([collection], str(directory), dtype=dtype)
+            snapshot = AnnSnapshot(str(directory))
+            to_corpus = snapshot_rows_to_corpus(snapshot)
+            index_bytes = snapshot.memory_bytes()["index_bytes"]
+            baseline_bytes = baseline_bytes or index_bytes
+            
+            factors = args.rescore_factors if dtype != "float32" else [0]
+            for factor in factors:
+                settings.ann_snapshot_rescore_factor = factor
+                results, latency = time_queries(
+                    lambda query: [to_corpus[row] for row, _ in snapshot.search(query, k=args.k, nprobe=args.nprobe)],
+                    queries
+                )
+                print(
+                    f"{dtype:<8} {factor:>7} {recall_at_k(truth, results, args.k):>7.3f} "
+                    f"{latency['p50_ms']:>8.2f} {latency['p99_ms']:>8.2f} "
+                    f"{index_bytes / 2**20:>9.1f} {baseline_bytes / index_bytes:>5.1f}x"
+                )
+            snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Reranker Backend Parity Check
+Compares ONNX Runtime (fp32 and int8) cross-encoder scores and latency against eager PyTorch
+
+Usage:
+    python benchmarks/reranker_parity.py --batch 9 --runs 50
+Exits non-zero when a backend deviates from PyTorch by more than RERANKER_PARITY_TOLERANCE.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import settings
+from agents.rag_agent.reranker import DocumentReranker, PARITY_PAIRS
+from agents.rag_agent.reranker_backends import TorchCrossEncoder, OnnxCrossEncoder, export_onnx
+
+
+def rank_agreement(reference: np.ndarray, scores: np.ndarray) -> float:
+    """Spearman rank correlation between two score vectors"""
+    reference_ranks = np.argsort(np.argsort(reference))
+    ranks = np.argsort(np.argsort(scores))
+    return float(np.corrcoef(reference_ranks, ranks)[0, 1])
+
+
+def latency_ms(backend, features, runs: int):
+    """p50/p99 forward latency over repeated runs"""
+    backend.forward(features)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.forward(features)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ONNX reranker parity and latency against PyTorch")
+    parser.add_argument("--batch", type=int, default=settings.rerank_top_k * 3, help="Pairs per forward pass")
+    parser.add_argument("--runs", type=int, default=50, help="Timed forward passes per backend")
+    args = parser.parse_args()
+    
+    reranker = DocumentReranker()
+    if not reranker.enabled:
+        print("Reranker failed to load")
+        return 1
+    
+    pairs = [PARITY_PAIRS[i % len(PARITY_PAIRS)] for i in range(args.batch)]
+    features = reranker._collate(reranker._encode_pairs(pairs))
+    print(f"Model: {reranker.model_name}, batch {args.batch}, padded length {features['input_ids'].shape[1]}\n")
+    
+    torch_backend = TorchCrossEncoder(reranker.model, reranker.device)
+    reference = torch_backend.forward(features)
+    backends = [("torch fp32", torch_backend)]
+    for quantize in (False, True):
+        path = export_onnx(
+            reranker.model,
+            reranker.tokenizer,
+            reranker.model_name,
+            settings.reranker_onnx_directory,
+            quantize=quantize
+        )
+        backends.append((
+            f"onnx {'int8' if quantize else 'fp32'}",
+            OnnxCrossEncoder(path, settings.reranker_intra_op_threads)
+        ))
+    
+    header = f"{'backend':<11} {'max |diff|':>10} {'mean |diff|':>11} {'rank corr':>9} {'p50 ms':>8} {'p99 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for name, backend in backends:
+        scores = backend.forward(features)
+        deviation = np.abs(scores - reference)
+        p50, p99 = latency_ms(backend, features, args.runs)
+        print(
+            f"{name:<11} {deviation.max():>10.4f} {deviation.mean():>11.4f} "
+            f"{rank_agreement(reference, scores):>9.3f} {p50:>8.2f} {p99:>8.2f}"
+        )
+        failed = failed or deviation.max() > settings.reranker_parity_tolerance
+    
+    if failed:
+        print(f"\nParity check FAILED (tolerance {settings.reranker_parity_tolerance})")
+        return 1
+    print(f"\nParity check passed (tolerance {settings.reranker_parity_tolerance})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Startup Benchmark
+Measures how long importing the app takes, which packages dominate it, and time until the server answers
+
+Usage:
+    python benchmarks/startup_benchmark.py --runs 5 --import-budget 3 --ready-budget 10
+Exits non-zero when a budget is exceeded or importing the app loads a heavy dependency
+(those belong behind the get_* factories).
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Packages that must only be imported when the component that needs them is built
+HEAVY_MODULES = ("torch", "transformers", "onnxruntime", "chromadb", "langchain_community", "langchain_openai", "langgraph", "tavily")
+
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    """Run a snippet in a fresh interpreter from the repository root"""
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def import_seconds(module: str) -> float:
+    """Wall time of importing a module in a fresh interpreter"""
+    result = run_python(
+        f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(module: str) -> dict:
+    """
+    Self import time per top-level package from python -X importtime
+    
+    Args:
+        module: Module to import
+        
+    Returns:
+        Microseconds of import time keyed by top-level package name
+    """
+    result = run_python(f"import {module}", "-X", "importtime")
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us)
+    return totals
+
+
+def loaded_heavy_modules(module: str) -> list:
+    """Heavy dependencies present in sys.modules after importing a module"""
+    result = run_python(
+        f"import json, sys; import {module}; "
+        f"print(json.dumps(sorted(name for name in {list(HEAVY_MODULES)!r} if name in sys.modules)))"
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    """Ask the OS for an unused local port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(path: str, timeout: float) -> float:
+    """
+    Seconds from launching uvicorn until a path answers 200
+    
+    Args:
+        path: Endpoint polled for readiness
+        timeout: Seconds to wait before giving up
+        
+    Returns:
+        Seconds to first 200 response (inf on timeout)
+    """
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.02)
+        return float("inf")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and time to first ready response")
+    parser.add_argument("--module", default="app", help="Module whose import is measured")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Packages shown in the import breakdown")
+    parser.add_argument("--path", default="/ready", help="Endpoint polled for time-to-ready (/ready includes warm-up)")
+    parser.add_argument("--import-budget", type=float, default=3.0, help="Maximum median import seconds")
+    parser.add_argument("--ready-budget", type=float, default=10.0, help="Maximum median seconds to first ready response")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure the import")
+    args = parser.parse_args()
+    
+    failures = []
+    
+    heavy = loaded_heavy_modules(args.module)
+    print(f"Heavy modules loaded by 'import {args.module}': {', '.join(heavy) or 'none'}")
+    if heavy:
+        failures.append(f"import {args.module} loads {', '.join(heavy)}")
+    
+    profile = import_profile(args.module)
+    total_us = sum(profile.values())
+    print(f"\nImport breakdown (python -X importtime, self time per package, total {total_us / 1e6:.2f}s)")
+    print(f"{'package':<32} {'ms':>9} {'share':>7}")
+    for name, micros in sorted(profile.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<32} {micros / 1000:>9.1f} {micros / total_us:>7.1%}")
+    
+    import_times = [import_seconds(args.module) for _ in range(args.runs)]
+    import_median = statistics.median(import_times)
+    print(f"\nimport {args.module}: median {import_median:.3f}s, max {max(import_times):.3f}s over {args.runs} runs")
+    if import_median > args.import_budget:
+        failures.append(f"import took {import_median:.3f}s (budget {args.import_budget}s)")
+    
+    if not args.skip_server:
+        ready_times = [time_to_ready(args.path, args.ready_budget * 3) for _ in range(args.runs)]
+        ready_median = statistics.median(ready_times)
+        print(f"time to first 200 on {args.path}: median {ready_median:.3f}s, max {max(ready_times):.3f}s")
+        if ready_median > args.ready_budget:
+            failures.append(f"time to ready {ready_median:.3f}s (budget {args.ready_budget}s)")
+    
+    if failures:
+        print("\nStartup budget FAILED: " + "; ".join(failures))
+        return 1
+    print("\nStartup budget met")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
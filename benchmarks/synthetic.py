@@ -0,0 +1,119 @@
+"""
+Synthetic Benchmark Data
+Clustered embedding corpora, exact ground truth and metrics shared by the benchmarks
+"""
+import time
+from typing import List, Dict, Any, Callable, Tuple
+import numpy as np
+
+
+class SyntheticCollection:
+    """
+    In-memory stand-in for a raw Chroma collection's paginated get()
+    
+    Lets snapshot exports run over a synthetic corpus without a Chroma
+    instance or embedding API.
+    """
+    
+    def __init__(self, vectors: np.ndarray, name: str = "synthetic"):
+        self.name = name
+        self.vectors = vectors
+    
+    def count(self) -> int:
+        return len(self.vectors)
+    
+    def get(self, include: List[str] = None, limit: int = None, offset: int = 0) -> Dict[str, Any]:
+        end = len(self.vectors) if limit is None else min(offset + limit, len(self.vectors))
+        rows = range(offset, end)
+        return {
+            "ids": [f"chunk-{row}" for row in rows],
+            "documents": [f"synthetic chunk {row}" for row in rows],
+            "metadatas": [{"source": f"doc-{row // 20}.txt", "chunk_index": row % 20} for row in rows],
+            "embeddings": self.vectors[offset:end]
+        }
+
+
+def make_corpus(
+    n: int,
+    dimension: int,
+    n_clusters: int = 64,
+    n_queries: int = 200,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clustered unit-norm vectors resembling text embeddings
+    
+    Args:
+        n: Number of corpus vectors
+        dimension: Embedding dimension
+        n_clusters: Number of topic clusters
+        n_queries: Number of query vectors (drawn from the same clusters)
+        seed: Random seed
+        
+    Returns:
+        Tuple of (corpus, queries) float32 matrices
+    """
+    rng = np.random.default_rng(seed)
+    # Decaying per-dimension variance gives the low effective rank of real embeddings
+    spectrum = (1.0 / np.sqrt(1.0 + np.arange(dimension) / 16.0)).astype(np.float32)
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32) * spectrum
+    
+    def sample(count: int) -> np.ndarray:
+        labels = rng.integers(0, n_clusters, size=count)
+        noise = rng.standard_normal((count, dimension)).astype(np.float32) * spectrum * 0.6
+        vectors = centers[labels] + noise
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    
+    return sample(n), sample(n_queries)
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, k: int, block_size: int = 256) -> np.ndarray:
+    """
+    Brute-force squared-L2 top-k row indices (ground truth)
+    
+    Args:
+        corpus: Float32 matrix (N x D)
+        queries: Float32 matrix (Q x D)
+        k: Number of neighbours
+        
+    Returns:
+        Int matrix (Q x k) of corpus rows, closest first
+    """
+    norms = (corpus ** 2).sum(axis=1)
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        distances = norms[None, :] - 2.0 * block @ corpus.T
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+        results[start:start + block_size] = np.take_along_axis(top, order, axis=1)
+    return results
+
+
+def recall_at_k(truth: np.ndarray, found: List[List[int]], k: int) -> float:
+    """Mean fraction of the true top-k found in each result list's top-k"""
+    hits = [len(set(truth[i, :k]) & set(found[i][:k])) for i in range(len(truth))]
+    return float(np.mean(hits)) / k
+
+
+def time_queries(search: Callable[[np.ndarray], List[int]], queries: np.ndarray) -> Tuple[List[List[int]], Dict[str, float]]:
+    """
+    Run a search per query and collect latency percentiles
+    
+    Args:
+        search: Function mapping a query vector to result rows
+        queries: Query matrix
+        
+    Returns:
+        Tuple of (results, {"p50_ms", "p99_ms", "mean_ms"})
+    """
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return results, {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(np.mean(latencies))
+    }
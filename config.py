@@ -2,11 +2,12 @@
 Configuration module for Medical Assistant Backend
 Loads environment variables and application settings
 """
+import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, Any
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator
 
 
 class Settings(BaseSettings):
@@ -20,6 +21,16 @@ class Settings(BaseSettings):
     debug: bool = Field(default=False, alias="DEBUG")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     
+    # Startup Warm-Up (preload models and clients before /ready reports ready)
+    warmup_enabled: bool = Field(default=True, alias="WARMUP_ENABLED")
+    warmup_steps: str = Field(default="vector_store,embeddings,reranker,agents,graph", alias="WARMUP_STEPS")
+    warmup_retry_interval: float = Field(default=30.0, alias="WARMUP_RETRY_INTERVAL")  # seconds between retries of failed steps
+    warmup_max_retries: int = Field(default=10, alias="WARMUP_MAX_RETRIES")  # then ready but degraded
+    
+    # Health Monitoring (component probes refreshed in the background, served from memory)
+    health_refresh_interval: float = Field(default=15.0, alias="HEALTH_REFRESH_INTERVAL")  # seconds
+    health_llm_window: float = Field(default=300.0, alias="HEALTH_LLM_WINDOW")  # seconds of LLM call outcomes considered
+    
     # LLM Configuration (Azure OpenAI)
     openai_api_key: str = Field(..., alias="OPENAI_API_KEY")
     openai_api_version: str = Field(default="2024-08-01-preview", alias="OPENAI_API_VERSION")
@@ -33,9 +44,24 @@ class Settings(BaseSettings):
     embedding_model_name: str = Field(default="text-embedding-ada-002", alias="EMBEDDING_MODEL_NAME")
     embedding_api_version: str = Field(default="2024-08-01-preview", alias="EMBEDDING_API_VERSION")
     
+    # Embedding Batching (ingestion)
+    embedding_batch_size: int = Field(default=256, alias="EMBEDDING_BATCH_SIZE")  # inputs per API request
+    embedding_batch_max_tokens: int = Field(default=100000, alias="EMBEDDING_BATCH_MAX_TOKENS")
+    embedding_max_concurrency: int = Field(default=4, alias="EMBEDDING_MAX_CONCURRENCY")
+    embedding_requests_per_minute: int = Field(default=600, alias="EMBEDDING_REQUESTS_PER_MINUTE")
+    embedding_tokens_per_minute: int = Field(default=1000000, alias="EMBEDDING_TOKENS_PER_MINUTE")
+    embedding_max_retries: int = Field(default=5, alias="EMBEDDING_MAX_RETRIES")
+    
     # Web Search API
     tavily_api_key: str = Field(..., alias="TAVILY_API_KEY")
     
+    # Web Search Cache (in-memory LRU + SQLite, stale-while-revalidate)
+    web_search_cache_enabled: bool = Field(default=True, alias="WEB_SEARCH_CACHE_ENABLED")
+    web_search_cache_ttl: float = Field(default=21600.0, alias="WEB_SEARCH_CACHE_TTL")  # seconds an entry is fresh
+    web_search_cache_stale_ttl: float = Field(default=86400.0, alias="WEB_SEARCH_CACHE_STALE_TTL")  # served stale while refreshing
+    web_search_cache_size: int = Field(default=1000, alias="WEB_SEARCH_CACHE_SIZE")
+    web_search_cache_path: str = Field(default="./data/cache/web_search.sqlite3", alias="WEB_SEARCH_CACHE_PATH")  # empty = memory only
+    
     # Speech API (Eleven Labs) - Optional
     eleven_labs_api_key: Optional[str] = Field(default=None, alias="ELEVEN_LABS_API_KEY")
     
@@ -51,6 +77,50 @@ class Settings(BaseSettings):
     # ChromaDB Settings
     chroma_persist_directory: str = Field(default="./data/chroma_db", alias="CHROMA_PERSIST_DIRECTORY")
     chroma_collection_name: str = Field(default="medical_documents", alias="CHROMA_COLLECTION_NAME")
+    chroma_upsert_batch_size: int = Field(default=5000, alias="CHROMA_UPSERT_BATCH_SIZE")
+    vector_store_max_workers: int = Field(default=8, alias="VECTOR_STORE_MAX_WORKERS")
+    hybrid_search_max_workers: int = Field(default=4, alias="HYBRID_SEARCH_MAX_WORKERS")  # dense/sparse searches in flight, shared by all requests
+    
+    # HNSW Index (applied when a Chroma collection is created)
+    hnsw_space: str = Field(default="l2", alias="HNSW_SPACE")  # only l2: exact, reduced and snapshot searches score squared L2 in process
+    hnsw_m: int = Field(default=16, alias="HNSW_M")
+    hnsw_construction_ef: int = Field(default=100, alias="HNSW_CONSTRUCTION_EF")
+    hnsw_search_ef: int = Field(default=10, alias="HNSW_SEARCH_EF")
+    hnsw_collection_overrides: str = Field(default="", alias="HNSW_COLLECTION_OVERRIDES")  # JSON: {"collection": {"search_ef": 64}}
+    
+    # Near-Duplicate Detection (MinHash + LSH at ingest)
+    dedup_enabled: bool = Field(default=True, alias="DEDUP_ENABLED")
+    dedup_mode: str = Field(default="skip", alias="DEDUP_MODE")  # "skip" or "link"
+    dedup_threshold: float = Field(default=0.85, alias="DEDUP_THRESHOLD")
+    dedup_num_perm: int = Field(default=128, alias="DEDUP_NUM_PERM")
+    dedup_bands: int = Field(default=16, alias="DEDUP_BANDS")
+    dedup_shingle_size: int = Field(default=5, alias="DEDUP_SHINGLE_SIZE")
+    
+    # Specialty Sharding
+    chroma_sharding_enabled: bool = Field(default=False, alias="CHROMA_SHARDING_ENABLED")
+    chroma_shard_field: str = Field(default="category", alias="CHROMA_SHARD_FIELD")
+    chroma_default_shard: str = Field(default="general", alias="CHROMA_DEFAULT_SHARD")
+    shard_router_top_n: int = Field(default=2, alias="SHARD_ROUTER_TOP_N")
+    shard_router_margin: float = Field(default=0.05, alias="SHARD_ROUTER_MARGIN")
+    shard_router_keyword_boost: float = Field(default=0.1, alias="SHARD_ROUTER_KEYWORD_BOOST")
+    
+    # ANN Snapshot (memory-mapped, read-only serving index)
+    ann_snapshot_enabled: bool = Field(default=False, alias="ANN_SNAPSHOT_ENABLED")
+    ann_snapshot_directory: str = Field(default="./data/ann_snapshot", alias="ANN_SNAPSHOT_DIRECTORY")
+    ann_snapshot_dtype: str = Field(default="float16", alias="ANN_SNAPSHOT_DTYPE")  # float32, float16 or int8
+    ann_snapshot_rescore_factor: int = Field(default=4, alias="ANN_SNAPSHOT_RESCORE_FACTOR")  # 0/1 = no rescoring
+    ann_snapshot_n_lists: int = Field(default=0, alias="ANN_SNAPSHOT_N_LISTS")  # 0 = sqrt(N)
+    ann_snapshot_nprobe: int = Field(default=8, alias="ANN_SNAPSHOT_NPROBE")
+    ann_snapshot_reload_interval: float = Field(default=30.0, alias="ANN_SNAPSHOT_RELOAD_INTERVAL")
+    ann_snapshot_max_stale_fraction: float = Field(default=0.05, alias="ANN_SNAPSHOT_MAX_STALE_FRACTION")  # deleted + added share above which searches go to ChromaDB
+    ann_snapshot_tombstone_overfetch: int = Field(default=2, alias="ANN_SNAPSHOT_TOMBSTONE_OVERFETCH")  # extra results fetched to cover tombstones, in multiples of k
+    
+    # Reduced-Dimension Search (PCA / Matryoshka first stage, full-precision rescoring)
+    reduced_search_enabled: bool = Field(default=False, alias="REDUCED_SEARCH_ENABLED")
+    reduced_search_method: str = Field(default="pca", alias="REDUCED_SEARCH_METHOD")  # "pca" or "matryoshka"
+    reduced_search_dimension: int = Field(default=256, alias="REDUCED_SEARCH_DIMENSION")
+    reduced_search_rescore_factor: int = Field(default=4, alias="REDUCED_SEARCH_RESCORE_FACTOR")
+    reduced_search_fit_sample: int = Field(default=20000, alias="REDUCED_SEARCH_FIT_SAMPLE")
     
     # File Upload Settings
     max_upload_size: int = Field(default=10485760, alias="MAX_UPLOAD_SIZE")  # 10MB
@@ -64,6 +134,73 @@ class Settings(BaseSettings):
     rerank_top_k: int = Field(default=3, alias="RERANK_TOP_K")
     confidence_threshold: float = Field(default=0.7, alias="CONFIDENCE_THRESHOLD")
     
+    # Hybrid Retrieval (BM25 + vector)
+    hybrid_search_enabled: bool = Field(default=True, alias="HYBRID_SEARCH_ENABLED")
+    bm25_k1: float = Field(default=1.5, alias="BM25_K1")
+    bm25_b: float = Field(default=0.75, alias="BM25_B")
+    hybrid_rrf_k: int = Field(default=60, alias="HYBRID_RRF_K")
+    hybrid_dense_weight: float = Field(default=1.0, alias="HYBRID_DENSE_WEIGHT")
+    hybrid_sparse_weight: float = Field(default=1.0, alias="HYBRID_SPARSE_WEIGHT")
+    
+    # MMR Retrieval (diversified dense search)
+    mmr_search_enabled: bool = Field(default=False, alias="MMR_SEARCH_ENABLED")
+    mmr_lambda: float = Field(default=0.5, alias="MMR_LAMBDA")
+    mmr_fetch_k_multiplier: int = Field(default=4, alias="MMR_FETCH_K_MULTIPLIER")
+    
+    # Retrieval Result Cache
+    retrieval_cache_enabled: bool = Field(default=True, alias="RETRIEVAL_CACHE_ENABLED")
+    retrieval_cache_size: int = Field(default=1024, alias="RETRIEVAL_CACHE_SIZE")
+    retrieval_cache_hash_bits: int = Field(default=64, alias="RETRIEVAL_CACHE_HASH_BITS")
+    
+    # Rerank Early Exit (distance-based)
+    rerank_skip_enabled: bool = Field(default=True, alias="RERANK_SKIP_ENABLED")
+    rerank_skip_distance_margin: float = Field(default=0.15, alias="RERANK_SKIP_DISTANCE_MARGIN")
+    rerank_skip_max_distance: float = Field(default=0.5, alias="RERANK_SKIP_MAX_DISTANCE")
+    rerank_candidate_multiplier: int = Field(default=3, alias="RERANK_CANDIDATE_MULTIPLIER")
+    rerank_candidate_distance_window: float = Field(default=0.25, alias="RERANK_CANDIDATE_DISTANCE_WINDOW")
+    distance_confidence_midpoint: float = Field(default=0.8, alias="DISTANCE_CONFIDENCE_MIDPOINT")
+    distance_confidence_scale: float = Field(default=0.1, alias="DISTANCE_CONFIDENCE_SCALE")
+    
+    # Reranker (cross-encoder)
+    reranker_model: str = Field(default="cross-encoder/ms-marco-TinyBERT-L-6", alias="RERANKER_MODEL")
+    reranker_backend: str = Field(default="torch", alias="RERANKER_BACKEND")  # "torch" or "onnx"
+    reranker_max_length: int = Field(default=512, alias="RERANKER_MAX_LENGTH")
+    reranker_intra_op_threads: int = Field(default=0, alias="RERANKER_INTRA_OP_THREADS")  # 0 = library default
+    reranker_onnx_directory: str = Field(default="./data/models/onnx", alias="RERANKER_ONNX_DIRECTORY")
+    reranker_onnx_quantize: bool = Field(default=True, alias="RERANKER_ONNX_QUANTIZE")  # dynamic int8
+    reranker_parity_tolerance: float = Field(default=0.5, alias="RERANKER_PARITY_TOLERANCE")
+    
+    # Rerank Micro-Batching (pairs from concurrent requests share forward passes)
+    rerank_batching_enabled: bool = Field(default=True, alias="RERANK_BATCHING_ENABLED")
+    rerank_batch_max_wait_ms: float = Field(default=3.0, alias="RERANK_BATCH_MAX_WAIT_MS")
+    rerank_batch_max_pairs: int = Field(default=64, alias="RERANK_BATCH_MAX_PAIRS")
+    rerank_batch_max_padding: float = Field(default=0.2, alias="RERANK_BATCH_MAX_PADDING")
+    
+    # Rerank Token Cache (passage token IDs tokenized once per chunk)
+    rerank_token_cache_enabled: bool = Field(default=True, alias="RERANK_TOKEN_CACHE_ENABLED")
+    rerank_token_cache_max_tokens: int = Field(default=5000000, alias="RERANK_TOKEN_CACHE_MAX_TOKENS")
+    
+    # Rerank Score Cache (keyed on normalized query hash + passage content hash)
+    rerank_score_cache_enabled: bool = Field(default=True, alias="RERANK_SCORE_CACHE_ENABLED")
+    rerank_score_cache_size: int = Field(default=50000, alias="RERANK_SCORE_CACHE_SIZE")
+    rerank_score_cache_ttl: float = Field(default=0.0, alias="RERANK_SCORE_CACHE_TTL")  # seconds, 0 = no expiry
+    
+    # Cascade Reranking (truncated cross-encoder first, full length on the uncertain shortlist)
+    rerank_cascade_enabled: bool = Field(default=False, alias="RERANK_CASCADE_ENABLED")
+    rerank_cascade_first_max_length: int = Field(default=128, alias="RERANK_CASCADE_FIRST_MAX_LENGTH")
+    rerank_cascade_shortlist: int = Field(default=6, alias="RERANK_CASCADE_SHORTLIST")
+    rerank_cascade_margin: float = Field(default=2.0, alias="RERANK_CASCADE_MARGIN")  # logit units
+    
+    # Rerank Worker Processes (model runs outside the API process, 0 = in-process).
+    # Each API worker starts its own pool: model copies = uvicorn workers x RERANK_WORKER_PROCESSES
+    rerank_worker_processes: int = Field(default=0, alias="RERANK_WORKER_PROCESSES")
+    rerank_worker_cores: str = Field(default="", alias="RERANK_WORKER_CORES")  # e.g. "0-3;4-7", one group per worker
+    rerank_worker_timeout: float = Field(default=30.0, alias="RERANK_WORKER_TIMEOUT")  # seconds per forward pass
+    
+    # Metadata Filtering
+    metadata_index_fields: str = Field(default="topic,category,source,file_type", alias="METADATA_INDEX_FIELDS")
+    metadata_filter_exact_max: int = Field(default=250, alias="METADATA_FILTER_EXACT_MAX")  # above this, filter with a Chroma where clause (benchmarks/filter_benchmark.py)
+    
     # Temperature settings for LLM
     temperature: float = 0.3
     max_tokens: int = 2000
@@ -73,6 +210,29 @@ class Settings(BaseSettings):
         case_sensitive = False
         extra = "allow"
     
+    @field_validator("hnsw_space")
+    @classmethod
+    def _check_hnsw_space(cls, value: str) -> str:
+        """Only l2 matches the distances computed outside Chroma"""
+        if value != "l2":
+            raise ValueError(f"HNSW_SPACE={value!r} is not supported; in-process searches use squared L2")
+        return value
+    
+    @field_validator("hnsw_collection_overrides")
+    @classmethod
+    def _check_hnsw_overrides(cls, value: str) -> str:
+        """Overrides may tune the graph but not change the distance space"""
+        if value:
+            for name, params in json.loads(value).items():
+                if params.get("space", "l2") != "l2":
+                    raise ValueError(f"HNSW_COLLECTION_OVERRIDES sets space={params['space']!r} for {name}; only l2 is supported")
+        return value
+    
+    @property
+    def warmup_steps_list(self) -> list:
+        """Return warm-up steps as a list"""
+        return [step.strip() for step in self.warmup_steps.split(",") if step.strip()]
+    
     @property
     def allowed_extensions_list(self) -> list:
         """Return allowed file extensions as a list"""
@@ -84,6 +244,18 @@ class Settings(BaseSettings):
         path.mkdir(parents=True, exist_ok=True)
         return path
     
+    def hnsw_metadata(self, collection_name: str) -> Dict[str, Any]:
+        """Chroma collection metadata carrying the HNSW parameters for a collection"""
+        params = {
+            "space": self.hnsw_space,
+            "M": self.hnsw_m,
+            "construction_ef": self.hnsw_construction_ef,
+            "search_ef": self.hnsw_search_ef
+        }
+        if self.hnsw_collection_overrides:
+            params.update(json.loads(self.hnsw_collection_overrides).get(collection_name, {}))
+        return {f"hnsw:{key}": value for key, value in params.items()}
+    
     def get_upload_path(self) -> Path:
         """Get upload directory as Path object"""
         path = Path(self.upload_directory)
@@ -1,5 +1,19 @@
 """Core Package"""
 from core.orchestrator import MedicalAssistantOrchestrator, get_orchestrator
 from core.state import GraphState
+from core.warmup import Warmup, WarmupDegraded, get_warmup
+from core.health import HealthMonitor, LLMCallTracker, get_health_monitor, get_llm_call_tracker, loaded_instance
 
-__all__ = ['MedicalAssistantOrchestrator', 'get_orchestrator', 'GraphState']
+__all__ = [
+    'MedicalAssistantOrchestrator',
+    'get_orchestrator',
+    'GraphState',
+    'Warmup',
+    'WarmupDegraded',
+    'get_warmup',
+    'HealthMonitor',
+    'LLMCallTracker',
+    'get_health_monitor',
+    'get_llm_call_tracker',
+    'loaded_instance'
+]
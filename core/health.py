@@ -0,0 +1,250 @@
+"""
+Health Module
+Component health refreshed in the background and served from memory
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from config import settings
+from core.warmup import get_warmup
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCallTracker(BaseCallbackHandler):
+    """
+    LangChain callback recording the outcome of recent LLM calls
+    
+    Attached to every chat model, so LLM reachability is judged from real
+    traffic instead of extra probe requests.
+    """
+    
+    def __init__(self, max_outcomes: int = 100):
+        """
+        Initialize tracker
+        
+        Args:
+            max_outcomes: Number of recent call outcomes kept
+        """
+        self._outcomes: "deque[tuple]" = deque(maxlen=max_outcomes)
+        self._lock = threading.Lock()
+    
+    def on_llm_end(self, response, **kwargs):
+        """Record a successful call"""
+        with self._lock:
+            self._outcomes.append((time.time(), None))
+    
+    def on_llm_error(self, error: BaseException, **kwargs):
+        """Record a failed call"""
+        with self._lock:
+            self._outcomes.append((time.time(), str(error)))
+    
+    def status(self, window: float = None) -> Dict[str, Any]:
+        """
+        LLM reachability from calls in the recent window
+        
+        Args:
+            window: Seconds of history considered (default from settings)
+            
+        Returns:
+            Dictionary with status (reachable, unreachable or unknown), call and
+            error counts in the window, and the last error
+        """
+        window = window or settings.health_llm_window
+        cutoff = time.time() - window
+        with self._lock:
+            recent = [outcome for outcome in self._outcomes if outcome[0] >= cutoff]
+        if not recent:
+            return {"status": "unknown", "calls": 0, "errors": 0, "last_error": None}
+        errors = [error for _, error in recent if error is not None]
+        last_time, last_error = recent[-1]
+        return {
+            "status": "unreachable" if last_error is not None else "reachable",
+            "calls": len(recent),
+            "errors": len(errors),
+            "last_call_age_seconds": round(time.time() - last_time, 1),
+            "last_error": errors[-1] if errors else None
+        }
+
+
+def loaded_instance(module_name: str, attribute: str) -> Optional[Any]:
+    """
+    A module's global singleton if it has been built, without building it
+    
+    Args:
+        module_name: Module holding the singleton (e.g. "agents.rag_agent.reranker")
+        attribute: Global variable the get_* factory stores it in
+        
+    Returns:
+        The instance, or None if the module is not imported or the instance not built yet
+    """
+    module = sys.modules.get(module_name)
+    return getattr(module, attribute, None) if module is not None else None
+
+
+class HealthMonitor:
+    """
+    Periodically probes components off the event loop and caches the result
+    
+    Probes never construct a component: one that has not been built yet
+    (warm-up still running or disabled) is reported as not_loaded. /health
+    and /ready only read the cached snapshot, so load-balancer probes cost
+    a dictionary lookup.
+    """
+    
+    def __init__(self, interval: float = None):
+        """
+        Initialize monitor
+        
+        Args:
+            interval: Seconds between refreshes (default from settings)
+        """
+        self.interval = interval or settings.health_refresh_interval
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def _probe_vector_store(self) -> Dict[str, Any]:
+        """Document count of the vector store, if it is open"""
+        store = loaded_instance("agents.rag_agent.vector_store", "_vector_store")
+        if store is None:
+            return {"status": "not_loaded"}
+        return {"status": "operational", "document_count": store.get_collection_count()}
+    
+    def _probe_reranker(self) -> Dict[str, Any]:
+        """Whether the cross-encoder is loaded, and on which backend"""
+        reranker = loaded_instance("agents.rag_agent.reranker", "_reranker")
+        if reranker is None:
+            return {"status": "not_loaded"}
+        if not reranker.enabled:
+            return {"status": "error", "error": "model failed to load (neutral scores are used)"}
+        result = {"status": "operational", "backend": reranker.backend.name}
+        workers = reranker.stats().get("workers")
+        if workers is not None:
+            result["workers_alive"] = workers["alive"]
+            if not workers["alive"]:
+                result["status"] = "error"
+        return result
+    
+    def probe(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Check every component (blocking, run off the event loop)
+        
+        Returns:
+            Component name -> state dictionary with at least a status
+        """
+        components = {}
+        for name, check in (
+            ("vector_store", self._probe_vector_store),
+            ("reranker", self._probe_reranker),
+            ("llm", get_llm_call_tracker().status)
+        ):
+            try:
+                components[name] = check()
+            except Exception as e:
+                logger.error(f"Health probe for {name} failed: {e}")
+                components[name] = {"status": "error", "error": str(e)}
+        return components
+    
+    async def refresh(self):
+        """Re-run the probes on a worker thread and swap in the new snapshot"""
+        loop = asyncio.get_running_loop()
+        self.components = await loop.run_in_executor(None, self.probe)
+        self.checked_at = time.time()
+    
+    async def _run(self):
+        """Refresh loop"""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing health status: {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """Start the background refresh task (call from a running event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Health monitor started (refresh every {self.interval:.0f}s)")
+    
+    async def stop(self):
+        """Cancel the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def overall_status(self) -> str:
+        """
+        Service health from the cached component state
+        
+        Returns:
+            "unhealthy" when the vector store probe failed, "degraded" when
+            another component failed, the LLM is unreachable or warm-up
+            finished degraded, otherwise "healthy"
+        """
+        components = self.components
+        if components.get("vector_store", {}).get("status") == "error":
+            return "unhealthy"
+        failing = any(state.get("status") in ("error", "unreachable") for state in components.values())
+        if failing or get_warmup().status()["degraded"]:
+            return "degraded"
+        return "healthy"
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cached readiness state
+        
+        The process is ready once warm-up has finished and the vector store
+        probe has not failed. LLM reachability is reported but does not gate
+        readiness: every worker shares the same endpoint, so pulling them
+        all from rotation would turn degraded answers into an outage.
+        
+        Returns:
+            Dictionary with ready flag, age of the last check, per-component
+            state and warm-up progress
+        """
+        warmup = get_warmup().status()
+        components = self.components
+        vector_store = components.get("vector_store", {}).get("status")
+        return {
+            "ready": warmup["ready"] and vector_store != "error",
+            "checked_seconds_ago": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+            "components": components,
+            "warmup": warmup
+        }
+
+
+# Global instances
+_llm_call_tracker = None
+_llm_call_tracker_lock = threading.Lock()
+_health_monitor = None
+_health_monitor_lock = threading.Lock()
+
+
+def get_llm_call_tracker() -> LLMCallTracker:
+    """Get or create global LLM call tracker (pass it as a callback to chat models, safe to call from worker threads)"""
+    global _llm_call_tracker
+    if _llm_call_tracker is None:
+        with _llm_call_tracker_lock:
+            if _llm_call_tracker is None:
+                _llm_call_tracker = LLMCallTracker()
+    return _llm_call_tracker
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get or create global health monitor (safe to call from worker threads)"""
+    global _health_monitor
+    if _health_monitor is None:
+        with _health_monitor_lock:
+            if _health_monitor is None:
+                _health_monitor = HealthMonitor()
+    return _health_monitor
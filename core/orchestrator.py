@@ -3,9 +3,9 @@ LangGraph Orchestration Module
 Main workflow orchestration using LangGraph with multi-agent coordination
 """
 import logging
+import threading
 import time
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END
+from typing import Dict, Any, Optional
 from langchain_core.documents import Document
 
 from config import settings
@@ -39,8 +39,9 @@ class MedicalAssistantOrchestrator:
             logger.error(f"Error initializing orchestrator: {e}")
             raise
     
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self):
         """Build the LangGraph workflow"""
+        from langgraph.graph import StateGraph, END
         
         # Create workflow
         workflow = StateGraph(GraphState)
@@ -169,7 +170,8 @@ class MedicalAssistantOrchestrator:
             result = self.rag_agent.query(
                 question=state["question"],
                 use_expansion=True,
-                use_reranking=True
+                use_reranking=True,
+                filter=state.get("retrieval_filter")
             )
             
             state["rag_response"] = result.get("response", "")
@@ -363,7 +365,13 @@ class MedicalAssistantOrchestrator:
     
     # Main execution
     
-    def process_query(self, question: str, user_id: str = None, session_id: str = None) -> Dict[str, Any]:
+    def process_query(
+        self,
+        question: str,
+        user_id: str = None,
+        session_id: str = None,
+        retrieval_filter: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Process a user query through the workflow
         
@@ -371,6 +379,7 @@ class MedicalAssistantOrchestrator:
             question: User question
             user_id: Optional user ID
             session_id: Optional session ID
+            retrieval_filter: Optional metadata filter scoping knowledge base retrieval
             
         Returns:
             Complete response dictionary
@@ -383,6 +392,7 @@ class MedicalAssistantOrchestrator:
                 "question": question,
                 "user_id": user_id,
                 "session_id": session_id,
+                "retrieval_filter": retrieval_filter,
                 "input_validated": False,
                 "is_medical": True,
                 "is_emergency": False,
@@ -448,11 +458,14 @@ class MedicalAssistantOrchestrator:
 
 # Global instance
 _orchestrator = None
+_orchestrator_lock = threading.Lock()
 
 
 def get_orchestrator() -> MedicalAssistantOrchestrator:
-    """Get or create global orchestrator instance"""
+    """Get or create global orchestrator instance (safe to call from worker threads)"""
     global _orchestrator
     if _orchestrator is None:
-        _orchestrator = MedicalAssistantOrchestrator()
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = MedicalAssistantOrchestrator()
     return _orchestrator
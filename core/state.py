@@ -14,6 +14,7 @@ class GraphState(TypedDict):
     question: str
     user_id: Optional[str]
     session_id: Optional[str]
+    retrieval_filter: Optional[Dict[str, Any]]
     
     # Processing flags
     input_validated: bool
@@ -0,0 +1,223 @@
+"""
+Warm-Up Module
+Preloads models, clients and the LangGraph workflow at startup and tracks readiness
+"""
+import logging
+import threading
+import time
+from typing import List, Dict, Any, Callable
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_QUERY = "what are the symptoms of type 2 diabetes"
+
+
+class WarmupDegraded(Exception):
+    """Raised by a step whose component loaded in a fallback mode; the step counts as complete"""
+
+
+def _warm_vector_store():
+    """Open Chroma and load the in-memory indexes"""
+    from agents.rag_agent import get_vector_store
+    get_vector_store()
+
+
+def _warm_embeddings():
+    """One embedding round trip (connection pool, auth, DNS)"""
+    from agents.rag_agent import get_vector_store
+    get_vector_store().embeddings.embed_query(WARMUP_QUERY)
+
+
+def _warm_reranker():
+    """Load the cross-encoder and run a forward pass (degraded if the model failed to load)"""
+    from agents.rag_agent import get_reranker
+    reranker = get_reranker()
+    if not reranker.enabled:
+        # Reranking falls back to neutral scores, so this must not keep the service out of rotation
+        raise WarmupDegraded(f"Reranker model {reranker.model_name} failed to load, using neutral scores")
+    reranker.warm_up(timeout=settings.rerank_worker_timeout)
+
+
+def _warm_agents():
+    """Build the LLM clients of the guardrails, RAG, query expansion and web search agents"""
+    from agents.guardrails import get_guardrails
+    from agents.rag_agent import get_rag_agent, get_query_expander
+    from agents.web_search_agent import get_web_search_agent
+    get_guardrails()
+    get_query_expander()
+    get_rag_agent()
+    get_web_search_agent()
+
+
+def _warm_graph():
+    """Build the orchestrator and compile its LangGraph workflow"""
+    from core.orchestrator import get_orchestrator
+    get_orchestrator()
+
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    "vector_store": _warm_vector_store,
+    "embeddings": _warm_embeddings,
+    "reranker": _warm_reranker,
+    "agents": _warm_agents,
+    "graph": _warm_graph
+}
+
+
+class Warmup:
+    """
+    Runs the configured warm-up steps once and reports progress
+    
+    Steps run in order on a background thread so the server can answer
+    /health while the process warms up. The process is ready once every
+    step has succeeded or finished degraded (component running in a
+    fallback mode). Failed steps are retried every WARMUP_RETRY_INTERVAL
+    seconds, up to WARMUP_MAX_RETRIES times; after that the process
+    reports ready but degraded.
+    """
+    
+    def __init__(self, steps: List[str] = None):
+        """
+        Initialize warm-up state
+        
+        Args:
+            steps: Step names to run, in order (default from settings)
+        """
+        steps = settings.warmup_steps_list if steps is None else steps
+        unknown = [step for step in steps if step not in WARMUP_STEPS]
+        if unknown:
+            logger.warning(f"Ignoring unknown warm-up steps: {', '.join(unknown)}")
+        self.steps = [step for step in steps if step in WARMUP_STEPS]
+        self.state: Dict[str, Dict[str, Any]] = {
+            step: {"status": "pending", "seconds": None, "error": None} for step in self.steps
+        }
+        self.started_at = None
+        self.finished_at = None
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+    
+    @property
+    def ready(self) -> bool:
+        """Whether every warm-up step has succeeded"""
+        return self._ready.is_set()
+    
+    def start(self):
+        """Run the warm-up on a background thread (no-op if already started)"""
+        if self._thread is not None:
+            return
+        self.started_at = time.time()
+        if not self.steps:
+            self.finished_at = self.started_at
+            self._ready.set()
+            return
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+    
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Block until the process is ready
+        
+        Args:
+            timeout: Seconds to wait (None = forever)
+            
+        Returns:
+            True if ready
+        """
+        return self._ready.wait(timeout)
+    
+    def _run_step(self, step: str) -> bool:
+        """Run one step, recording its outcome (True if done or degraded)"""
+        with self._lock:
+            self.state[step].update(status="running", error=None)
+        start = time.perf_counter()
+        try:
+            WARMUP_STEPS[step]()
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.state[step].update(status="done", seconds=round(seconds, 3))
+            logger.info(f"Warm-up step '{step}' done in {seconds:.2f}s")
+            return True
+        except WarmupDegraded as e:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.state[step].update(status="degraded", seconds=round(seconds, 3), error=str(e))
+            logger.warning(f"Warm-up step '{step}' degraded after {seconds:.2f}s: {e}")
+            return True
+        except Exception as e:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.state[step].update(status="failed", seconds=round(seconds, 3), error=str(e))
+            logger.error(f"Warm-up step '{step}' failed after {seconds:.2f}s: {e}")
+            return False
+    
+    def _run(self):
+        """Run pending steps in order, retrying failures up to WARMUP_MAX_RETRIES times"""
+        pending = list(self.steps)
+        while True:
+            logger.info(f"Warming up: {', '.join(pending)}")
+            pending = [step for step in pending if not self._run_step(step)]
+            if not pending:
+                break
+            if self.retries >= settings.warmup_max_retries:
+                logger.error(
+                    f"Warm-up steps {', '.join(pending)} still failing after {self.retries} retries, "
+                    "reporting ready but degraded"
+                )
+                break
+            self.retries += 1
+            logger.warning(
+                f"Warm-up incomplete ({', '.join(pending)} failed), "
+                f"retry {self.retries}/{settings.warmup_max_retries} in {settings.warmup_retry_interval:.0f}s"
+            )
+            time.sleep(settings.warmup_retry_interval)
+        self.finished_at = time.time()
+        self._ready.set()
+        degraded = self.degraded_steps()
+        logger.info(
+            f"Warm-up complete in {self.finished_at - self.started_at:.2f}s, ready for traffic"
+            + (f" (degraded: {', '.join(degraded)})" if degraded else "")
+        )
+    
+    def degraded_steps(self) -> List[str]:
+        """Steps that finished degraded or were given up on"""
+        with self._lock:
+            return [step for step, state in self.state.items() if state["status"] in ("degraded", "failed")]
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Warm-up progress
+        
+        Returns:
+            Dictionary with ready and degraded flags, completed/total steps,
+            retries, elapsed seconds and per-step state
+        """
+        with self._lock:
+            steps = {step: dict(state) for step, state in self.state.items()}
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.ready,
+            "degraded": self.ready and any(state["status"] in ("degraded", "failed") for state in steps.values()),
+            "completed": sum(state["status"] in ("done", "degraded") for state in steps.values()),
+            "retries": self.retries,
+            "total": len(steps),
+            "elapsed_seconds": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "steps": steps
+        }
+
+
+# Global instance
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Get or create global warm-up tracker (no steps when warm-up is disabled, safe to call from worker threads)"""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup(None if settings.warmup_enabled else [])
+    return _warmup
@@ -3,8 +3,9 @@ Document Ingestion Script
 Batch process and add documents to the vector store
 """
 import logging
+import time
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 import sys
 
 # Add parent directory to path
@@ -29,10 +30,47 @@ def read_text_file(file_path: Path) -> str:
         return ""
 
 
+def store_file_group(vector_store, group: List[Tuple[str, list]]) -> Tuple[int, List[str]]:
+    """
+    Store the chunks of a group of files in one scheduled embedding run
+    
+    If the group fails, its files are retried one by one so the failure is
+    attributed to the file that caused it and the other files still land.
+    
+    Args:
+        vector_store: Vector store to add to
+        group: (file name, chunks) pairs
+        
+    Returns:
+        Tuple of (chunks stored, names of files that failed)
+    """
+    try:
+        vector_store.add_documents([chunk for _, chunks in group for chunk in chunks])
+        for name, chunks in group:
+            logger.info(f"✅ {name}: {len(chunks)} chunks added")
+        return sum(len(chunks) for _, chunks in group), []
+    except Exception as e:
+        if len(group) == 1:
+            logger.error(f"❌ Error adding {group[0][0]} to vector store: {e}")
+            return 0, [group[0][0]]
+        logger.warning(f"Group of {len(group)} files failed ({e}), retrying file by file")
+    
+    stored, failed = 0, []
+    for item in group:
+        added, errors = store_file_group(vector_store, [item])
+        stored += added
+        failed.extend(errors)
+    return stored, failed
+
+
 def ingest_documents_from_directory(directory: str, file_patterns: List[str] = None):
     """
     Ingest all documents from a directory
     
+    Files are stored in bounded groups: each group holds enough chunks to
+    keep every embedding request slot busy, and is committed before the
+    next one is built, so one bad file only costs its own group a retry.
+    
     Args:
         directory: Path to directory containing documents
         file_patterns: List of file patterns to match (e.g., ["*.txt", "*.md"])
@@ -52,6 +90,12 @@ def ingest_documents_from_directory(directory: str, file_patterns: List[str] = N
     
     total_files = 0
     total_chunks = 0
+    stored_chunks = 0
+    failed_files = []
+    group, group_chunks = [], 0
+    group_limit = settings.embedding_batch_size * settings.embedding_max_concurrency
+    dedup_before = dict(processor.dedup_stats)
+    start_time = time.time()
     
     # Process each file pattern
     for pattern in file_patterns:
@@ -76,23 +120,42 @@ def ingest_documents_from_directory(directory: str, file_patterns: List[str] = N
                 }
                 
                 chunks = processor.process_text(content, metadata)
-                
-                # Add to vector store
-                doc_ids = vector_store.add_documents(chunks)
-                
                 total_files += 1
                 total_chunks += len(chunks)
                 
-                logger.info(f"✅ {file_path.name}: {len(chunks)} chunks added")
-                
             except Exception as e:
                 logger.error(f"❌ Error processing {file_path.name}: {e}")
+                failed_files.append(file_path.name)
+                continue
+            
+            if chunks:
+                group.append((file_path.name, chunks))
+                group_chunks += len(chunks)
+            if group_chunks >= group_limit:
+                added, errors = store_file_group(vector_store, group)
+                stored_chunks += added
+                failed_files.extend(errors)
+                group, group_chunks = [], 0
+    
+    if group:
+        added, errors = store_file_group(vector_store, group)
+        stored_chunks += added
+        failed_files.extend(errors)
+    elapsed = time.time() - start_time
     
     logger.info(f"\n{'='*60}")
     logger.info(f"📊 Ingestion Summary")
     logger.info(f"{'='*60}")
     logger.info(f"Files processed: {total_files}")
     logger.info(f"Total chunks created: {total_chunks}")
+    logger.info(f"Chunks stored: {stored_chunks}")
+    split = processor.dedup_stats["chunks"] - dedup_before["chunks"]
+    duplicates = processor.dedup_stats["duplicates"] - dedup_before["duplicates"]
+    logger.info(f"Near-duplicates: {duplicates} of {split} ({processor.dedup_ratio(split, duplicates):.1%})")
+    if elapsed > 0 and stored_chunks:
+        logger.info(f"Ingestion throughput: {stored_chunks / elapsed:.1f} chunks/s")
+    if failed_files:
+        logger.info(f"Failed files ({len(failed_files)}): {', '.join(failed_files)}")
     logger.info(f"Collection size: {vector_store.get_collection_count()}")
     logger.info(f"{'='*60}\n")
 
@@ -254,6 +317,68 @@ When to seek medical care:
     logger.info(f"{'='*60}")
     logger.info(f"Documents added: {len(sample_docs)}")
     logger.info(f"Total chunks: {total_chunks}")
+    logger.info(
+        f"Dedup ratio: {processor.dedup_ratio(processor.dedup_stats['chunks'], processor.dedup_stats['duplicates']):.1%}"
+    )
+    logger.info(f"Collection size: {vector_store.get_collection_count()}")
+    logger.info(f"{'='*60}\n")
+
+
+def export_ann_snapshot():
+    """Export the collection to the memory-mapped ANN snapshot"""
+    vector_store = get_vector_store()
+    manifest = vector_store.export_ann_snapshot()
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📦 ANN Snapshot Exported")
+    logger.info(f"{'='*60}")
+    logger.info(f"Directory: {settings.ann_snapshot_directory}")
+    logger.info(f"Vectors: {manifest['count']} x {manifest['dimension']} ({manifest['dtype']})")
+    logger.info(f"IVF lists: {manifest['n_lists']}")
+    logger.info(f"{'='*60}\n")
+
+
+def fit_embedding_projection():
+    """Fit the reduced-dimension projection and rebuild the reduced collection"""
+    vector_store = get_vector_store()
+    info = vector_store.fit_projection()
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📐 Embedding Projection Fitted")
+    logger.info(f"{'='*60}")
+    logger.info(f"Method: {info['method']} ({info['input_dimension']} -> {info['dimension']} dimensions)")
+    logger.info(f"Explained variance: {info['explained_variance']:.1%} (fitted on {info['sample']} vectors)")
+    logger.info(f"Reduced vectors indexed: {info['indexed']}")
+    if not settings.reduced_search_enabled:
+        logger.info("Set REDUCED_SEARCH_ENABLED=True to search with it")
+    logger.info(f"{'='*60}\n")
+
+
+def export_collection_dump(directory: str):
+    """Export the collection (with embeddings) for bulk loading on another node"""
+    vector_store = get_vector_store()
+    manifest = vector_store.export_dump(directory)
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📦 Collection Dump Exported")
+    logger.info(f"{'='*60}")
+    logger.info(f"Directory: {directory}")
+    logger.info(f"Records: {manifest['count']} x {manifest['dimension']}")
+    logger.info(f"Embedding model: {manifest['embedding_model']}")
+    logger.info(f"{'='*60}\n")
+
+
+def import_collection_dump(directory: str):
+    """Bulk-load a collection dump without re-embedding"""
+    vector_store = get_vector_store()
+    start_time = time.time()
+    imported = vector_store.import_dump(directory)
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📥 Collection Dump Imported")
+    logger.info(f"{'='*60}")
+    logger.info(f"Records imported: {imported}")
+    logger.info(f"Elapsed: {time.time() - start_time:.1f}s")
     logger.info(f"Collection size: {vector_store.get_collection_count()}")
     logger.info(f"{'='*60}\n")
 
@@ -267,16 +392,36 @@ def main():
     parser.add_argument("--sample", "-s", action="store_true", help="Ingest sample medical data")
     parser.add_argument("--patterns", "-p", nargs="+", default=["*.txt", "*.md"], 
                        help="File patterns to match (e.g., *.txt *.md)")
+    parser.add_argument("--export-snapshot", action="store_true",
+                       help="Export the collection to the memory-mapped ANN snapshot after ingestion")
+    parser.add_argument("--fit-projection", action="store_true",
+                       help="Fit the PCA/Matryoshka projection used for reduced-dimension search")
+    parser.add_argument("--export-dump", metavar="DIR",
+                       help="Export IDs, texts, metadata and embeddings to DIR for new replicas")
+    parser.add_argument("--import-dump", metavar="DIR",
+                       help="Bulk-load a dump from DIR without calling the embedding API")
     
     args = parser.parse_args()
     
+    if args.import_dump:
+        import_collection_dump(args.import_dump)
+    
     if args.sample:
         ingest_sample_medical_data()
     elif args.directory:
         ingest_documents_from_directory(args.directory, args.patterns)
-    else:
-        print("Please specify --directory or --sample")
+    elif not (args.export_snapshot or args.export_dump or args.import_dump or args.fit_projection):
+        print("Please specify --directory, --sample, --import-dump, --export-dump, --fit-projection or --export-snapshot")
         parser.print_help()
+    
+    if args.fit_projection:
+        fit_embedding_projection()
+    
+    if args.export_dump:
+        export_collection_dump(args.export_dump)
+    
+    if args.export_snapshot:
+        export_ann_snapshot()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+"""
+Shared test setup
+Makes the repository importable and provides placeholder credentials so Settings can load
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Settings require these; tests never call the services they point to
+for name in (
+    "OPENAI_API_KEY",
+    "AZURE_ENDPOINT",
+    "EMBEDDING_API_KEY",
+    "EMBEDDING_AZURE_ENDPOINT",
+    "TAVILY_API_KEY",
+    "HUGGINGFACE_TOKEN"
+):
+    os.environ.setdefault(name, "test")
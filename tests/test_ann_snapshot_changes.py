@@ -0,0 +1,70 @@
+"""
+ANN Snapshot Change Tracking Tests
+Deleted and re-written chunks are kept out of snapshot results, and a snapshot too far behind is not served
+"""
+import pytest
+from benchmarks.synthetic import SyntheticCollection, make_corpus
+from config import settings
+from agents.rag_agent.ann_snapshot import AnnSnapshot, export_snapshot, record_added, record_deleted
+from agents.rag_agent.metadata_index import MetadataIndex
+from agents.rag_agent.vector_store import ChromaVectorStore
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    corpus, _ = make_corpus(400, 32, n_clusters=8, n_queries=1)
+    directory = tmp_path / "snapshot"
+    export_snapshot([SyntheticCollection(corpus)], str(directory), dtype="float32", n_lists=8)
+    opened = AnnSnapshot(str(directory))
+    yield opened, corpus
+    opened.close()
+
+
+def _store() -> ChromaVectorStore:
+    """A vector store with only the state _snapshot_search reads"""
+    store = ChromaVectorStore.__new__(ChromaVectorStore)
+    store.metadata_index = MetadataIndex(fields=["source"])
+    return store
+
+
+def _nearest_ids(opened: AnnSnapshot, query, k: int) -> list:
+    """Chunk IDs of the snapshot's k nearest rows (rows are stored in IVF list order)"""
+    return [opened.get_document(row).metadata["chunk_id"] for row, _ in opened.search(query.tolist(), k=k)]
+
+
+def test_changes_are_read_from_the_snapshot_directory(snapshot):
+    opened, _ = snapshot
+    record_deleted(str(opened.directory), ["chunk-1", "chunk-2"])
+    record_added(str(opened.directory), ["chunk-3", "new-chunk"])
+    assert opened.refresh_deleted() == 2
+    assert opened.deleted == {"chunk-1", "chunk-2"}
+    assert opened.added == {"chunk-3", "new-chunk"}
+    assert opened.stale_fraction() == pytest.approx(4 / 400)
+
+
+def test_outdated_rows_are_skipped(snapshot):
+    opened, corpus = snapshot
+    outdated = _nearest_ids(opened, corpus[0], 2)
+    opened.deleted.add(outdated[0])
+    opened.added.add(outdated[1])
+    
+    results, added_ids = _store()._snapshot_search(opened, corpus[0].tolist(), 3, None)
+    chunk_ids = [doc.metadata["chunk_id"] for doc, _ in results]
+    assert len(chunk_ids) == 3
+    assert not set(outdated) & set(chunk_ids)
+    assert added_ids == [outdated[1]]
+
+
+def test_stale_snapshot_is_not_served(snapshot, monkeypatch):
+    opened, corpus = snapshot
+    monkeypatch.setattr(settings, "ann_snapshot_max_stale_fraction", 0.01)
+    opened.deleted.update(f"chunk-{row}" for row in range(5))
+    assert _store()._snapshot_search(opened, corpus[0].tolist(), 3, None) == (None, [])
+
+
+def test_overfetch_is_capped(snapshot, monkeypatch):
+    opened, corpus = snapshot
+    monkeypatch.setattr(settings, "ann_snapshot_tombstone_overfetch", 1)
+    # Every row near the query is deleted: more than k extra rows would be needed
+    opened.deleted.update(_nearest_ids(opened, corpus[0], 10))
+    assert _store()._snapshot_search(opened, corpus[0].tolist(), 3, None) == (None, [])
@@ -0,0 +1,67 @@
+"""
+Near-Duplicate Re-homing Tests
+Deleting the chunk other sources were deduplicated against must not leave dangling links
+"""
+from agents.rag_agent.near_duplicates import NearDuplicateIndex
+from agents.rag_agent.vector_store import rehome_duplicates
+
+TEXT = "Patients with type 2 diabetes should have their HbA1c measured every three to six months."
+
+
+class FakeCollection:
+    """Just enough of a raw Chroma collection for rehome_duplicates"""
+    
+    def __init__(self, records: dict):
+        self.records = records
+    
+    def get(self, where: dict, include: list) -> dict:
+        targets = set(where["duplicate_of"]["$in"])
+        ids = [chunk_id for chunk_id, (_, metadata) in self.records.items() if metadata.get("duplicate_of") in targets]
+        return {
+            "ids": ids,
+            "documents": [self.records[chunk_id][0] for chunk_id in ids],
+            "metadatas": [self.records[chunk_id][1] for chunk_id in ids]
+        }
+    
+    def update(self, ids: list, metadatas: list):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.records[chunk_id] = (self.records[chunk_id][0], metadata)
+
+
+def test_link_mode_duplicates_are_rehomed():
+    index = NearDuplicateIndex()
+    index.add("a-0", index.signature(TEXT), "a.txt")
+    collection = FakeCollection({
+        "a-0": (TEXT, {"source": "a.txt"}),
+        "b-0": (TEXT, {"source": "b.txt", "duplicate_of": "a-0"}),
+        "c-0": (TEXT, {"source": "c.txt", "duplicate_of": "a-0"})
+    })
+    
+    assert rehome_duplicates([collection], ["a-0"], index, page_size=100) == 1
+    index.remove(["a-0"])
+    
+    assert collection.records["b-0"][1]["duplicate_of"] == ""
+    assert collection.records["c-0"][1]["duplicate_of"] == "b-0"
+    assert index.find(index.signature(TEXT), "d.txt") == "b-0"
+
+
+def test_duplicates_deleted_together_are_not_rehomed():
+    index = NearDuplicateIndex()
+    collection = FakeCollection({
+        "a-0": (TEXT, {"source": "a.txt"}),
+        "b-0": (TEXT, {"source": "b.txt", "duplicate_of": "a-0"})
+    })
+    assert rehome_duplicates([collection], ["a-0", "b-0"], index, page_size=1) == 0
+    assert len(index) == 0
+
+
+def test_skip_mode_content_is_stored_again_after_canonical_delete():
+    # Skipped duplicates were never stored; once the canonical chunk is gone,
+    # re-ingesting their source finds no duplicate and keeps the chunk
+    index = NearDuplicateIndex()
+    signature = index.signature(TEXT)
+    index.add("a-0", signature, "a.txt")
+    assert index.find(signature, "b.txt") == "a-0"
+    
+    index.remove(["a-0"])
+    assert index.find(signature, "b.txt") is None
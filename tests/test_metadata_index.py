@@ -0,0 +1,49 @@
+"""
+Metadata Index Tests
+Removals through the reverse map must leave the same bitmaps as a fresh build
+"""
+import random
+from agents.rag_agent.metadata_index import MetadataIndex
+
+FIELDS = ["category", "source"]
+
+
+def _metadata(row: int) -> dict:
+    return {"category": f"c{row % 7}", "source": f"doc-{row // 5}.txt"}
+
+
+def _bitmaps_by_id(index: MetadataIndex) -> dict:
+    """Bitmaps expanded to chunk IDs, so indexes with different row numbers compare equal"""
+    return {
+        field: {value: sorted(index.ids(bitmap)) for value, bitmap in values.items()}
+        for field, values in index.bitmaps.items()
+    }
+
+
+def test_remove_matches_rebuild():
+    ids = [f"chunk-{row}" for row in range(200)]
+    index = MetadataIndex(fields=FIELDS)
+    index.add(ids, [_metadata(row) for row in range(200)])
+    
+    removed = set(random.Random(0).sample(ids, 80))
+    index.remove(list(removed))
+    
+    kept = [row for row, chunk_id in enumerate(ids) if chunk_id not in removed]
+    rebuilt = MetadataIndex(fields=FIELDS)
+    rebuilt.add([ids[row] for row in kept], [_metadata(row) for row in kept])
+    
+    assert _bitmaps_by_id(index) == _bitmaps_by_id(rebuilt)
+    assert sorted(index.ids(index.all_rows)) == sorted(rebuilt.ids(rebuilt.all_rows))
+    assert set(index.values_of) == set(rebuilt.values_of)
+
+
+def test_reverse_map_survives_save_and_load(tmp_path):
+    path = tmp_path / "metadata.pkl"
+    index = MetadataIndex(path, fields=FIELDS)
+    index.add(["a", "b", "c"], [_metadata(0), _metadata(1), _metadata(10)])
+    index.save()
+    
+    loaded = MetadataIndex(path, fields=FIELDS)
+    loaded.remove(["b"])
+    assert loaded.ids(loaded.resolve({"category": "c1"})) == []
+    assert loaded.ids(loaded.resolve({"source": "doc-0.txt"})) == ["a"]
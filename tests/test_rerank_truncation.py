@@ -0,0 +1,64 @@
+"""
+Rerank Truncation Tests
+Pairs built from cached passage tokens must match what the tokenizer produces with truncation=True
+"""
+import threading
+import pytest
+from langchain_core.documents import Document
+from config import settings
+from agents.rag_agent.reranker import DocumentReranker
+from agents.rag_agent.token_cache import ChunkTokenCache
+
+# (query_length, passage_length, budget) -> expected lengths for fast and Python tokenizers
+CASES = [
+    ((5, 8, 20), (5, 8), (5, 8)),
+    ((4, 30, 20), (4, 16), (4, 16)),
+    ((30, 4, 20), (16, 4), (16, 4)),
+    ((12, 14, 19), (9, 10), (10, 9)),
+    ((14, 12, 19), (10, 9), (10, 9)),
+    ((12, 12, 19), (9, 10), (10, 9)),
+    ((12, 14, 20), (10, 10), (10, 10))
+]
+
+QUERY_WORDS = "what are the first line treatments for moderate persistent asthma in adults"
+PASSAGE_WORDS = (
+    "Inhaled corticosteroids are the preferred controller therapy for persistent asthma, "
+    "with long-acting beta agonists added when symptoms remain uncontrolled despite adherence"
+)
+
+
+@pytest.mark.parametrize("lengths, fast_expected, python_expected", CASES)
+def test_truncated_lengths(lengths, fast_expected, python_expected):
+    assert DocumentReranker._truncated_lengths(*lengths, fast=True) == fast_expected
+    assert DocumentReranker._truncated_lengths(*lengths, fast=False) == python_expected
+
+
+def _reranker(tokenizer) -> DocumentReranker:
+    """A reranker with only the tokenizer and token cache, no model"""
+    reranker = DocumentReranker.__new__(DocumentReranker)
+    reranker.tokenizer = tokenizer
+    reranker.max_length = settings.reranker_max_length
+    reranker.token_cache = ChunkTokenCache(100000, len(tokenizer))
+    reranker._tokenizer_lock = threading.Lock()
+    return reranker
+
+
+@pytest.mark.parametrize("use_fast", [True, False])
+@pytest.mark.parametrize("query_words, passage_words", [(4, 40), (40, 4), (12, 13), (13, 12), (12, 12), (25, 25)])
+@pytest.mark.parametrize("max_length", [16, 17, 24])
+def test_cached_encoding_matches_tokenizer(use_fast, query_words, passage_words, max_length):
+    transformers = pytest.importorskip("transformers")
+    try:
+        tokenizer = transformers.AutoTokenizer.from_pretrained(settings.reranker_model, use_fast=use_fast)
+    except Exception as e:
+        pytest.skip(f"Tokenizer {settings.reranker_model} is not available: {e}")
+    if tokenizer.is_fast != use_fast:
+        pytest.skip(f"No {'fast' if use_fast else 'Python'} tokenizer for {settings.reranker_model}")
+    
+    query = " ".join((QUERY_WORDS.split() * 4)[:query_words])
+    passage = " ".join((PASSAGE_WORDS.split() * 4)[:passage_words])
+    reranker = _reranker(tokenizer)
+    
+    cached = reranker._encode(query, [Document(page_content=passage)], max_length)
+    expected = reranker._encode_pairs([[query, passage]], max_length)
+    assert cached == expected
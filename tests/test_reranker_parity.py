@@ -0,0 +1,52 @@
+"""
+Reranker Parity Tests
+ONNX Runtime (fp32 and int8) must score PARITY_PAIRS like eager PyTorch, within tolerance and in the same order
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+
+from config import settings
+from agents.rag_agent.reranker import DocumentReranker, PARITY_PAIRS
+from agents.rag_agent.reranker_backends import TorchCrossEncoder, OnnxCrossEncoder, export_onnx
+from benchmarks.reranker_parity import rank_agreement
+
+
+@pytest.fixture(scope="module")
+def reranker():
+    model = DocumentReranker()
+    if not model.enabled or model.model is None:
+        pytest.skip(f"Reranker model {model.model_name} is not available in this process")
+    return model
+
+
+@pytest.fixture(scope="module")
+def features(reranker):
+    return reranker._collate(reranker._encode_pairs(PARITY_PAIRS))
+
+
+@pytest.fixture(scope="module")
+def reference(reranker, features):
+    return TorchCrossEncoder(reranker.model, reranker.device).forward(features)
+
+
+# int8 weights may swap near-tied pairs, so its order only has to correlate strongly
+@pytest.mark.parametrize("quantize, min_rank_agreement", [(False, 0.999), (True, 0.9)])
+def test_onnx_matches_torch(reranker, features, reference, tmp_path_factory, quantize, min_rank_agreement):
+    path = export_onnx(
+        reranker.model,
+        reranker.tokenizer,
+        reranker.model_name,
+        str(tmp_path_factory.getbasetemp() / "onnx"),
+        quantize=quantize
+    )
+    scores = OnnxCrossEncoder(path, settings.reranker_intra_op_threads).forward(features)
+    
+    assert scores.shape == reference.shape
+    assert np.abs(scores - reference).max() <= settings.reranker_parity_tolerance
+    assert rank_agreement(reference, scores) >= min_rank_agreement
+    if not quantize:
+        assert list(np.argsort(-scores)) == list(np.argsort(-reference))
@@ -0,0 +1,34 @@
+"""
+Startup Tests
+Importing the app must stay cheap: heavy dependencies load only when their component is built
+"""
+import os
+import importlib.util
+import pytest
+from benchmarks.startup_benchmark import HEAVY_MODULES, import_seconds, loaded_heavy_modules
+
+# Packages whose import must not pull in a heavy dependency; "app" also needs FastAPI installed
+LIGHT_MODULES = ["core", "agents.rag_agent", "agents.web_search_agent", "agents.guardrails", "app"]
+IMPORT_BUDGET = float(os.environ.get("STARTUP_IMPORT_BUDGET", "3.0"))
+
+
+def _require_importable(module: str):
+    """Skip when the module's own web framework is not installed"""
+    if module == "app" and importlib.util.find_spec("fastapi") is None:
+        pytest.skip("fastapi is not installed")
+
+
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_import_loads_no_heavy_dependency(module):
+    _require_importable(module)
+    assert loaded_heavy_modules(module) == []
+
+
+def test_required_heavy_modules_are_checked():
+    for name in ("torch", "transformers", "chromadb", "langchain_openai", "langgraph"):
+        assert name in HEAVY_MODULES
+
+
+def test_app_import_within_budget():
+    _require_importable("app")
+    assert import_seconds("app") <= IMPORT_BUDGET
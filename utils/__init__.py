@@ -1,17 +1,22 @@
 """Utils Package"""
 from utils.logger import setup_logging, get_logger
+from utils.lru_cache import LRUCache
+from utils.rw_lock import ReadWriteLock
 from utils.models import (
     ChatRequest, ChatResponse, Source,
-    DocumentUploadResponse, HealthResponse, CollectionInfoResponse
+    DocumentUploadResponse, HealthResponse, ReadyResponse, CollectionInfoResponse
 )
 
 __all__ = [
     'setup_logging',
     'get_logger',
+    'LRUCache',
+    'ReadWriteLock',
     'ChatRequest',
     'ChatResponse',
     'Source',
     'DocumentUploadResponse',
     'HealthResponse',
+    'ReadyResponse',
     'CollectionInfoResponse'
 ]
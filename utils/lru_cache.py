@@ -0,0 +1,96 @@
+"""
+LRU Cache
+Thread-safe bounded cache with optional TTL and hit/miss statistics
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Least-recently-used cache shared across request threads
+    """
+    
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        """
+        Initialize cache
+        
+        Args:
+            max_size: Maximum number of entries
+            ttl: Optional time-to-live in seconds
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a key, refreshing its recency
+        
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+            
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry when full
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: Hashable):
+        """Remove a key if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Remove all entries (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics
+        
+        Returns:
+            Dictionary with size, max_size, hits, misses and hit_ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
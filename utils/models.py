@@ -12,6 +12,8 @@ class ChatRequest(BaseModel):
     session_id: Optional[str] = Field(None, description="Optional session ID")
     use_expansion: bool = Field(True, description="Enable query expansion")
     use_reranking: bool = Field(True, description="Enable document reranking")
+    specialty: Optional[str] = Field(None, description="Restrict retrieval to a specialty (document category)")
+    sources: Optional[List[str]] = Field(None, description="Restrict retrieval to these source documents")
 
 
 class Source(BaseModel):
@@ -51,6 +53,14 @@ class HealthResponse(BaseModel):
     components: Dict[str, str]
 
 
+class ReadyResponse(BaseModel):
+    """Readiness response (cached component state and warm-up progress)"""
+    ready: bool
+    checked_seconds_ago: Optional[float] = None
+    components: Dict[str, Dict[str, Any]]
+    warmup: Dict[str, Any]
+
+
 class CollectionInfoResponse(BaseModel):
     """Vector store collection info"""
     collection_name: str
@@ -0,0 +1,54 @@
+"""
+Read/Write Lock
+Many concurrent readers or one writer, with writers given priority
+"""
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring read/write lock
+    
+    Readers share the lock; a writer waits for active readers to finish and
+    blocks new readers while it waits, so a steady query stream cannot
+    starve ingestion. The lock is not reentrant: code holding it must not
+    acquire it again.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    @contextmanager
+    def read(self):
+        """Hold the lock for reading"""
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+    
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively"""
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()